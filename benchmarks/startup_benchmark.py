@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+StepFly Startup Benchmark
+Checks the startup cost of executor processes against budgets:
+
+- import time of the modules a spawned executor process loads (python -X importtime)
+- modules that must stay deferred until first use (numpy, pandas, ...)
+- optionally, the time from starting an executor process to its first LLM request,
+  measured against the mock LLM server (requires MongoDB)
+
+Exits with status 1 when a budget is exceeded.
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Tuple
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# What a spawned executor process imports before its first LLM call: the process target,
+# the executor stack and the tool registry
+EXECUTOR_STARTUP_CODE = (
+    "import stepfly.tools.schedule_tool\n"
+    "import stepfly.agents.executor\n"
+    "from stepfly.tools.registry import get_tool_classes\n"
+    "get_tool_classes()\n"
+)
+
+# Imported on first use only, never during executor startup
+DEFERRED_MODULES = ["numpy", "pandas", "scipy", "pyarrow", "pymongoarrow"]
+
+DEFAULT_IMPORT_BUDGET_MS = 1500
+DEFAULT_FIRST_LLM_CALL_BUDGET_S = 5.0
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Parse the output of python -X importtime
+
+    Returns:
+        Tuple of (total import time in ms, cumulative ms of every imported module)
+    """
+    total_us = 0
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level and counted in their parent's cumulative time
+        if len(name) - len(name.lstrip()) <= 1:
+            total_us += int(cumulative)
+        modules[name.strip()] = int(cumulative) / 1000
+    return total_us / 1000, modules
+
+
+def measure_imports(repeat: int) -> Tuple[float, Dict[str, float]]:
+    """
+    Measure the executor startup imports in fresh interpreters
+
+    Returns:
+        Tuple of (median total import time in ms, cumulative ms of every module of the median run)
+    """
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", EXECUTOR_STARTUP_CODE],
+            cwd=project_root,
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing the executor stack failed:\n{result.stderr[-2000:]}")
+        runs.append(parse_importtime(result.stderr))
+    runs.sort(key=lambda run: run[0])
+    return runs[len(runs) // 2]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_llm_call(incident_id: str, step_name: str, timeout: float) -> float:
+    """
+    Start an executor process the way the schedule tool does and time its first LLM request
+
+    Args:
+        incident_id: Incident whose TSG is loaded into the benchmark session
+        step_name: PlanDAG node executed by the executor
+        timeout: Seconds to wait for the first request
+
+    Returns:
+        Seconds from starting the process to the first LLM request
+    """
+    from ui.mock_llm_server import MockLLMServer
+    from stepfly.tools.incident_tsg_loader import IncidentTSGLoader
+    from stepfly.tools.schedule_tool import _run_executor
+    from stepfly.utils.memory import Memory
+
+    class FirstRequestServer(MockLLMServer):
+        first_request_at = None
+
+        def handle_completion(self, handler, body):
+            if self.first_request_at is None:
+                self.first_request_at = time.perf_counter()
+            super().handle_completion(handler, body)
+
+    port = _free_port()
+    server = FirstRequestServer({"host": "127.0.0.1", "port": port, "time_to_first_token": 0})
+    threading.Thread(target=server.serve, daemon=True).start()
+
+    # The executor process inherits the environment and talks to the mock server only
+    os.environ["API_BASE"] = f"http://127.0.0.1:{port}/v1"
+    os.environ["API_KEY"] = "mock"
+    os.environ["STEPFLY_LLM_MODE"] = "off"
+
+    session_id = f"startup_benchmark_{uuid.uuid4().hex[:8]}"
+    memory = Memory(session_id=session_id)
+    IncidentTSGLoader(session_id=session_id, memory=memory).execute(incident_id=incident_id)
+
+    process = multiprocessing.get_context("spawn").Process(
+        target=_run_executor,
+        args=({"node": step_name}, str(uuid.uuid4()), session_id, f"Startup benchmark of {step_name}"),
+        daemon=True
+    )
+    start = time.perf_counter()
+    process.start()
+    try:
+        while server.first_request_at is None:
+            if not process.is_alive():
+                raise RuntimeError(f"Executor exited before its first LLM call (exit code {process.exitcode})")
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"No LLM request within {timeout} seconds")
+            time.sleep(0.01)
+        return server.first_request_at - start
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main():
+    """
+    StepFly Startup Benchmark
+    Checks executor import time, deferred modules and time to first LLM call against budgets
+    """
+    parser = argparse.ArgumentParser(description='StepFly Startup Benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='Interpreters started to measure the import time')
+    parser.add_argument('--import-budget-ms', type=float, default=DEFAULT_IMPORT_BUDGET_MS,
+                        help='Budget of the executor startup imports in milliseconds')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports listed')
+    parser.add_argument('--first-llm-call', action='store_true',
+                        help='Also measure the time to the first LLM call of an executor (requires MongoDB)')
+    parser.add_argument('--first-llm-call-budget', type=float, default=DEFAULT_FIRST_LLM_CALL_BUDGET_S,
+                        help='Budget of the time to the first LLM call in seconds')
+    parser.add_argument('--incident-id', type=str, default="700000001", help='Incident loaded for the executor')
+    parser.add_argument('--step', type=str, default="Step1", help='PlanDAG node executed by the executor')
+    args = parser.parse_args()
+
+    failures = []
+
+    # Warm the bytecode cache so that the first run does not count compilation
+    measure_imports(1)
+    total_ms, modules = measure_imports(args.repeat)
+    print(f"Executor startup imports: {total_ms:.0f} ms (budget {args.import_budget_ms:.0f} ms, median of {args.repeat})")
+    for name, cumulative_ms in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+    if total_ms > args.import_budget_ms:
+        failures.append(f"executor startup imports took {total_ms:.0f} ms")
+
+    loaded_deferred = [name for name in DEFERRED_MODULES if name in modules]
+    if loaded_deferred:
+        failures.append(f"deferred modules imported at executor startup: {', '.join(loaded_deferred)}")
+
+    if args.first_llm_call:
+        seconds = measure_first_llm_call(args.incident_id, args.step, timeout=max(30.0, 3 * args.first_llm_call_budget))
+        print(f"Time to first LLM call: {seconds:.2f} s (budget {args.first_llm_call_budget:.2f} s)")
+        if seconds > args.first_llm_call_budget:
+            failures.append(f"time to first LLM call was {seconds:.2f} s")
+
+    if failures:
+        for failure in failures:
+            print(f"Budget exceeded: {failure}")
+        sys.exit(1)
+    print("All startup budgets met.")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,12 @@ from typing import Dict, Any, Optional, List
 from abc import ABC, abstractmethod
 import importlib
 import re
+import string
 
 from stepfly.utils.config_loader import config
 from stepfly.tools.base_tool import BaseTool
 from stepfly.utils.memory import Memory
+from stepfly.utils.sql_engine import DEFAULT_DATABASE_PATH, get_sql_engine
 
 class BasePlugin(ABC):
     """
@@ -60,6 +62,21 @@ class BasePlugin(ABC):
             "language": self.language
         }
     
+    def parameter_names(self) -> List[str]:
+        """
+        Get the names of the parameters filled into the plugin's template
+
+        Returns:
+            Sorted parameter names, empty if the plugin has no template
+        """
+        template = getattr(self, "template", None)
+        if not isinstance(template, str):
+            return []
+        return sorted({
+            re.split(r"[.\[]", field_name)[0]
+            for _, field_name, _, _ in string.Formatter().parse(template) if field_name
+        })
+
     def get_formatted_description(self) -> str:
         """
         Get a human-readable description of this plugin
@@ -88,6 +105,9 @@ class BasePlugin(ABC):
         
         # Create a tool class dynamically
         class PluginTool(BaseTool):
+            # Plugins render their query and run it on the shared SQL engine, so several can run in one turn
+            parallel_safe = True
+
             def __init__(
                 self,
                 session_id: str,
@@ -100,6 +120,10 @@ class BasePlugin(ABC):
                 self.name = tool_name
                 self.description = description
                 self.plugin = plugin
+
+            def prefetch(self) -> None:
+                if self.plugin.language == "sql":
+                    get_sql_engine().warm(DEFAULT_DATABASE_PATH)
                 
             def execute(self, **kwargs) -> str:
                 # Execute the plugin to get the snippet
@@ -109,8 +133,8 @@ class BasePlugin(ABC):
                 if snippet.startswith("Error:") or snippet.startswith("Missing required parameter:"):
                     return snippet
 
-                # Store the formatted query in memory and return the key
-                snippet_id = self.memory.store_code_snippet(
+                # The snippet is written to memory in the background; lookups by its ID wait for the write
+                snippet_id = self.memory.store_code_snippet_async(
                     code=snippet,
                     plugin_id=self.plugin.plugin_id,
                     tsg_name=self.plugin.source_tsg,
@@ -118,8 +142,20 @@ class BasePlugin(ABC):
                     description=f"Query/code generated from TSG {self.plugin.source_tsg}"
                 )
 
-                # Return the snippet ID for later retrieval
-                return f"SQL query snippet stored with ID: {snippet_id}"
+                if self.plugin.language != "sql":
+                    # Return the snippet ID for later retrieval
+                    return f"Code snippet stored with ID: {snippet_id}"
+
+                # Run the query right away instead of reading it back in a separate sql_query_tool call
+                try:
+                    result = get_sql_engine().run_and_store(
+                        self.memory,
+                        snippet,
+                        result_description=f"Result of {self.plugin.plugin_id} from TSG {self.plugin.source_tsg}"
+                    )
+                except Exception as e:
+                    result = f"Error executing SQL query: {str(e)}"
+                return f"SQL query snippet stored with ID: {snippet_id}\n{result}"
 
         return PluginTool(
             session_id=session_id,
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+StepFly Mock LLM Launcher
+Simple launcher script for the mock LLM server
+"""
+
+import sys
+import os
+
+# Add project root to path
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Import and run the mock LLM server
+from ui.mock_llm_server import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+StepFly Executor Worker Launcher
+Simple launcher script for the queue worker daemon
+"""
+
+import sys
+import os
+
+# Add project root to path
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Import and run the worker
+from ui.executor_worker import main
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,20 @@ incident diagnosis in distributed systems.
 __version__ = "0.1.0"
 __author__ = "StepFly Team"
 
-from stepfly.agents.scheduler import Scheduler
-from stepfly.agents.executor import Executor
-from stepfly.utils.memory import Memory
-
 __all__ = ["Scheduler", "Executor", "Memory"]
 
+# The public classes are imported on first access, so that importing a submodule
+# (e.g. in a spawned executor process) does not load the whole package
+_LAZY_IMPORTS = {
+    "Scheduler": "stepfly.agents.scheduler",
+    "Executor": "stepfly.agents.executor",
+    "Memory": "stepfly.utils.memory",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
@@ -1,16 +1,18 @@
+import asyncio
 import json
 from typing import Dict, Any, List, Optional, Callable, Tuple
 import re
-import os
-import importlib
-import pkgutil
+import threading
 from rich.console import Console
 from rich.panel import Panel
 import datetime
 from stepfly.utils.config_loader import config
 from stepfly.utils.llm_client import LLMClient
 
+from stepfly.utils.experience_store import get_experience_store
+from stepfly.utils.json_stream import StreamingActionParser
 from stepfly.utils.memory import Memory
+from stepfly.utils.token_usage import append_usage_event
 from stepfly.utils.trace_logger import save_agent_trace
 
 class BaseAgent:
@@ -30,7 +32,7 @@ class BaseAgent:
         self.agent_id = None  # Will be set
         self.name = "base_agent"
         self.console = Console()
-        self.llm_client = LLMClient()
+        self.llm_client = LLMClient(session_id=session_id)
         self.memory = memory
 
         # Initialize token usage tracking with timing info
@@ -39,6 +41,12 @@ class BaseAgent:
             "total_output_tokens": 0,
             "total_tokens": 0,
             "llm_calls_count": 0,
+            "llm_seconds": 0,
+            "llm_cache_hits": 0,
+            "llm_cache_misses": 0,
+            "llm_cache_saved_tokens": 0,
+            "llm_hedges": 0,
+            "llm_hedge_estimated_tokens": 0,
             "start_time": datetime.datetime.now().isoformat(),
             "end_time": None,
             "duration_seconds": 0,
@@ -66,46 +74,25 @@ class BaseAgent:
         
     def _load_tools(self, session_id: str, memory: Memory) -> Dict[str, Any]:
         """
-        Load all available tools using dynamic loading
-        Sets self.tools as a dictionary mapping tool names to tool instances.
+        Load the tools allowed for the agent's role
+        Sets self.tools as a dictionary mapping tool names to tools, which are created on first use.
         Also sets self.tools_description (string) for compatibility.
         
         Returns:
-            Dictionary of tool instances
+            Dictionary of tools
         """
-        from stepfly.tools.base_tool import BaseTool
-        
-        tools_list = []
-        
-        # Try to import and load tools dynamically
-        # Import the tools package
-        import stepfly.tools as tools_package
+        from stepfly.tools.registry import get_tool_classes, LazyTool
 
-        # Get all modules in the tools package
-        for _, name, is_pkg in pkgutil.iter_modules(tools_package.__path__):
-            if name != "base_tool" and not is_pkg:
-                # Import the module
-                module = importlib.import_module(f"stepfly.tools.{name}")
+        # The tool classes are collected once per process
+        tool_classes = get_tool_classes()
+        self.console.print("[green]Loaded tool:[/green]", ", ".join(tool_classes))
 
-                # Find classes that inherit from BaseTool
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-                    if (isinstance(attr, type) and
-                            issubclass(attr, BaseTool) and
-                            attr is not BaseTool):
-                        # Create an instance of the tool
-                        tool = attr(session_id=session_id, memory=memory)
-                        tools_list.append(tool)
-        self.console.print("[green]Loaded tool:[/green]", ", ".join([tool.name for tool in tools_list]))
-
-        # Set up unified dictionary structure
-        tools_dict = {}
-        for tool in tools_list:
-            # Use the tool's actual name as the key
-            tools_dict[tool.name] = tool
-        
-        # Filter tools based on agent role configuration
-        filtered_tools = self._filter_tools_by_role(tools_dict)
+        # Filter tools based on agent role configuration before creating any of them
+        filtered_classes = self._filter_tools_by_role(tool_classes)
+        filtered_tools = {
+            name: LazyTool(tool_class, session_id=session_id, memory=memory)
+            for name, tool_class in filtered_classes.items()
+        }
         
         # Set the unified tools dictionary
         self.tools = filtered_tools
@@ -168,104 +155,31 @@ class BaseAgent:
         self.token_usage["total_output_tokens"] += usage_info.get("output_tokens", 0) 
         self.token_usage["total_tokens"] += usage_info.get("total_tokens", 0)
         self.token_usage["llm_calls_count"] += 1
+        self.token_usage["llm_seconds"] += usage_info.get("llm_seconds", 0)
+        if "cache_hit" in usage_info:
+            self.token_usage["llm_cache_hits" if usage_info["cache_hit"] else "llm_cache_misses"] += 1
+            self.token_usage["llm_cache_saved_tokens"] += usage_info.get("cache_saved_tokens", 0)
+        self.token_usage["llm_hedges"] += usage_info.get("hedges", 0)
+        self.token_usage["llm_hedge_estimated_tokens"] += usage_info.get("hedge_estimated_tokens", 0)
         self.token_usage["last_updated"] = datetime.datetime.now().isoformat()
         
-        # Auto-save token usage after each LLM call
-        self._save_token_usage()
+        # Append the call to the usage log; totals are aggregated on demand
+        self._save_token_usage(usage_info)
     
-    def _save_token_usage(self) -> None:
+    def _save_token_usage(self, usage_info: Dict[str, Any]) -> None:
         """
-        Save token usage statistics to trace file
+        Append the usage of an LLM call to this agent's usage log in the trace directory
+
+        Args:
+            usage_info: Usage returned by the LLM client
         """
         session_id = self.session_state.get("session_id")
         if not session_id:
             print("Warning: session_id not set, cannot save token usage")
             return
-            
-        # Use the same trace directory structure as save_agent_trace
-        trace_dir = os.path.join(os.getcwd(), "trace", session_id)
-        os.makedirs(trace_dir, exist_ok=True)
-        
-        token_usage_file = os.path.join(trace_dir, "token_time_usage.json")
-        
-        # Load existing data if file exists
-        existing_data = {}
-        if os.path.exists(token_usage_file):
-            with open(token_usage_file, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-        
-        # Update with current agent's token usage including timing
+
         agent_key = f"{self.role}_{self.agent_id}" if self.agent_id else self.role
-        current_usage = self.token_usage.copy()
-        
-        # Update end time and duration
-        current_usage["end_time"] = datetime.datetime.now().isoformat()
-        if current_usage.get("start_time"):
-            start = datetime.datetime.fromisoformat(current_usage["start_time"])
-            end = datetime.datetime.fromisoformat(current_usage["end_time"])
-            duration = (end - start).total_seconds()
-            current_usage["duration_seconds"] = duration
-        
-        existing_data[agent_key] = current_usage
-        
-        # Calculate session totals
-        session_totals = {
-            "session_total_input_tokens": sum(agent_data.get("total_input_tokens", 0) for key, agent_data in existing_data.items() if isinstance(agent_data, dict) and key != "session_totals"),
-            "session_total_output_tokens": sum(agent_data.get("total_output_tokens", 0) for key, agent_data in existing_data.items() if isinstance(agent_data, dict) and key != "session_totals"),
-            "session_total_tokens": sum(agent_data.get("total_tokens", 0) for key, agent_data in existing_data.items() if isinstance(agent_data, dict) and key != "session_totals"),
-            "session_total_llm_calls": sum(agent_data.get("llm_calls_count", 0) for key, agent_data in existing_data.items() if isinstance(agent_data, dict) and key != "session_totals"),
-            "last_updated": datetime.datetime.now().isoformat()
-        }
-        
-        # Calculate simple metrics for all executors and code_generator (excluding scheduler)
-        executor_agents = [(key, agent_data) for key, agent_data in existing_data.items() 
-                          if isinstance(agent_data, dict) and (key.startswith("Executor_") or key == "code_generator") and key != "session_totals"]
-        
-        if executor_agents:
-            # Calculate totals for all executors and code_generator
-            session_totals["total_executor_input_tokens"] = sum(
-                agent_data.get("total_input_tokens", 0) for _, agent_data in executor_agents
-            )
-            session_totals["total_executor_output_tokens"] = sum(
-                agent_data.get("total_output_tokens", 0) for _, agent_data in executor_agents
-            )
-            session_totals["total_executor_total_tokens"] = sum(
-                agent_data.get("total_tokens", 0) for _, agent_data in executor_agents
-            )
-            session_totals["total_executor_llm_calls"] = sum(
-                agent_data.get("llm_calls_count", 0) for _, agent_data in executor_agents
-            )
-            
-            # Calculate total executor duration (from earliest start to latest end)
-            try:
-                start_times = [agent_data.get("start_time") for _, agent_data in executor_agents if agent_data.get("start_time")]
-                end_times = [agent_data.get("end_time") for _, agent_data in executor_agents if agent_data.get("end_time")]
-                
-                if start_times and end_times:
-                    earliest_start = min(start_times)
-                    latest_end = max(end_times)
-                    
-                    first_start = datetime.datetime.fromisoformat(earliest_start)
-                    last_end = datetime.datetime.fromisoformat(latest_end)
-                    duration = (last_end - first_start).total_seconds()
-                    
-                    session_totals["total_executor_duration_seconds"] = duration
-                    session_totals["total_executor_duration_formatted"] = f"{int(duration//60)}m {int(duration%60)}s"
-            except Exception:
-                pass
-        
-        # Create ordered data with session_totals first
-        ordered_data = {"session_totals": session_totals}
-        # Add agent data in sorted order
-        for key in sorted(existing_data.keys()):
-            if key != "session_totals":  # Skip session_totals since we already added it
-                ordered_data[key] = existing_data[key]
-        
-        # Save updated data with immediate flush
-        with open(token_usage_file, 'w', encoding='utf-8') as f:
-            json.dump(ordered_data, f, indent=2, ensure_ascii=False)
-            f.flush()  # Ensure data is written to disk immediately
-            os.fsync(f.fileno())  # Force write to disk
+        append_usage_event(session_id, agent_key, self.token_usage["start_time"], usage_info)
 
     def call_llm(self, messages: List[Dict[str, str]], stream: bool = True, json_response: bool = True) -> str:
         """
@@ -284,24 +198,31 @@ class BaseAgent:
         """
         Stream LLM call with real-time output to console
         
+        JSON responses are validated as they stream in: the stream is stopped at the closing
+        brace of the action, or as soon as the action is malformed.
+        
         Args:
             messages: List of message dictionaries
             
         Returns:
-            The full response text
+            The full response text, see _parsed_response for JSON responses
         """
         # Stream the response
         full_response = ""
+        parser = self._new_action_parser() if json_response else None
         
         def stream_callback(content_chunk: str):
             nonlocal full_response
             full_response += content_chunk
             self.console.print(content_chunk, end="")
+            if parser:
+                parser.feed(content_chunk)
         
         response_text, usage_info = self.llm_client.stream_completion(
             messages=messages,
             callback=stream_callback,
-            json_response=json_response
+            json_response=json_response,
+            should_stop=(lambda: parser.done) if parser else None
         )
         
         # Update token usage
@@ -310,7 +231,76 @@ class BaseAgent:
         # Extra newline for better formatting
         self.console.print()
         
+        return self._parsed_response(parser, response_text)
+    
+    async def acall_llm(self, messages: List[Dict[str, str]], json_response: bool = True) -> str:
+        """
+        Asyncio variant of call_llm, used by the asyncio executor runtime.
+        Chunks are not streamed to the console since many agents share it; the full response is printed instead.
+        
+        Args:
+            messages: List of message dictionaries with role and content
+            
+        Returns:
+            The full response text
+        """
+        parser = self._new_action_parser() if json_response else None
+        response_text, usage_info = await self.llm_client.astream_completion(
+            messages=messages,
+            callback=parser.feed if parser else None,
+            json_response=json_response,
+            should_stop=(lambda: parser.done) if parser else None
+        )
+        
+        # Token usage is saved to the trace file, keep the file I/O off the event loop
+        await asyncio.to_thread(self._update_token_usage, usage_info)
+        
+        self.console.print(f"[dim]{self.name}:[/dim] {response_text}")
+        
+        return self._parsed_response(parser, response_text)
+
+    def _new_action_parser(self) -> Optional[StreamingActionParser]:
+        """
+        Create the validator of a streamed action, None if streaming validation is disabled
+
+        Tools are prefetched as soon as their name has been streamed.
+        """
+        if not config.get("llm.streaming_parser.enabled", True):
+            return None
+        on_action = self._prefetch_tool if config.get("llm.streaming_parser.prefetch_tools", True) else None
+        return StreamingActionParser(on_action=on_action)
+
+    def _parsed_response(self, parser: Optional[StreamingActionParser], response_text: str) -> str:
+        """
+        Response to decode after a streamed action
+
+        Returns:
+            The JSON object without fences or trailing text once it is complete, the text up to
+            the first structural error otherwise, so that callers retry
+        """
+        if parser is None:
+            return response_text
+        if parser.complete:
+            return parser.json_text()
+        if parser.error:
+            self.console.print(f"[yellow]Stopped a malformed response: {parser.error}[/yellow]")
+            return parser.text
         return response_text
+
+    def _prefetch_tool(self, tool_name: str) -> None:
+        """Let a tool prepare its resources in the background while its parameters are streamed"""
+        tool = (getattr(self, "tools", None) or {}).get(tool_name)
+        if tool is None:
+            return
+
+        def prefetch():
+            try:
+                tool.prefetch()
+            except Exception:
+                # The tool call itself reports the problem
+                pass
+
+        threading.Thread(target=prefetch, daemon=True).start()
     
     def _record_response(self, response: str, prefix: Optional[str] = "") -> None:
         # Add to conversation history
@@ -443,32 +433,10 @@ class BaseAgent:
         # Sanitize TSG name
         sanitized_tsg_name = self._sanitize_filename(tsg_name)
         
-        # Path to the summarized experiences file
-        exp_dir = os.path.join(os.getcwd(), "experience", sanitized_tsg_name)
-        exp_file = os.path.join(exp_dir, "summarized_experiences.json")
-        
-        if not os.path.exists(exp_file):
-            return ""
-            
         try:
-            with open(exp_file, 'r', encoding='utf-8') as f:
-                experiences = json.load(f)
-                
-            # Get the topk most recent experiences
+            # Get the topk most recent experiences of this step from the per-process store
             topk = config.get("experience.topk", 3)
-            
-            if not isinstance(experiences, list):
-                experiences = [experiences]
-                
-            # Sort by timestamp (most recent first)
-            experiences.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-            
-            # Take top k experiences
-            relevant_experiences = []
-            for exp in experiences[:topk]:
-                step_key = f"step-{step}"
-                if step_key in exp:
-                    relevant_experiences.append(exp[step_key])
+            relevant_experiences = get_experience_store().get_step_experiences(sanitized_tsg_name, step, topk)
             
             if not relevant_experiences:
                 return ""
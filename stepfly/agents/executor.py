@@ -1,6 +1,8 @@
+import asyncio
+import concurrent.futures
 import datetime
 import json
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from stepfly.agents.base_agent import BaseAgent
 from stepfly.utils.memory import Memory
@@ -28,6 +30,9 @@ class Executor(BaseAgent):
         self.agent_id = memory.register_agent(agent_name=self.name, agent_id=agent_id)
         # Load tools
         self._load_tools(session_id=self.session_state["session_id"], memory=self.memory)
+        if "code_interpreter" in self.tools:
+            # Code generation only needs the TSG section of this step
+            self.tools["code_interpreter"].step_name = step_name
         # Load TSG plugins
         self._preload_plugins_for_executor()
         
@@ -136,6 +141,72 @@ class Executor(BaseAgent):
             return error_message
 
     def execute_step(self, context: str, max_retry_number: int = 3) -> Dict[str, Any]:
+        self._begin_step(context, max_retry_number)
+
+        max_iterations = config.get("executor.max_iterations", 10)
+        outcome = None
+        current_inter = 1 # Track current iteration for incremental trace saving
+
+        while current_inter < max_iterations:
+            # **INCREMENTAL TRACE SAVE**: Save trace after each iteration
+            # Update execution state with iteration info
+            self.execution_state.update({"current_iteration": current_inter})
+
+            # Get agent's next action
+            if self.step_name.lower() == "end":
+                json_data, response = self._end_step_action(current_inter)
+            else:
+                self.console.print(f"[blue]Iteration {current_inter} - Calling LLM for next action...[/blue]")
+                json_data, response = None, ""
+                for retry in range(max_retry_number):
+                    json_data, response = self._decode_action(self.call_llm(self.conversation_history),
+                                                              is_last_attempt=retry == max_retry_number - 1)
+                    if json_data is not None:
+                        break
+
+            outcome = self._take_action(json_data, response)
+            if outcome is not None:
+                break
+
+            current_inter += 1
+
+        return self._complete_step(context, outcome)
+
+    async def aexecute_step(self, context: str, max_retry_number: int = 3) -> Dict[str, Any]:
+        """
+        Asyncio variant of execute_step for the asyncio executor runtime.
+        LLM calls are awaited on the event loop, tool execution and memory/trace I/O run in worker threads.
+        """
+        await asyncio.to_thread(self._begin_step, context, max_retry_number)
+
+        max_iterations = config.get("executor.max_iterations", 10)
+        outcome = None
+        current_inter = 1
+
+        while current_inter < max_iterations:
+            self.execution_state.update({"current_iteration": current_inter})
+
+            if self.step_name.lower() == "end":
+                json_data, response = self._end_step_action(current_inter)
+            else:
+                self.console.print(f"[blue]{self.step_name} iteration {current_inter} - Calling LLM for next action...[/blue]")
+                json_data, response = None, ""
+                for retry in range(max_retry_number):
+                    json_data, response = self._decode_action(await self.acall_llm(self.conversation_history),
+                                                              is_last_attempt=retry == max_retry_number - 1)
+                    if json_data is not None:
+                        break
+
+            outcome = await asyncio.to_thread(self._take_action, json_data, response)
+            if outcome is not None:
+                break
+
+            current_inter += 1
+
+        return await asyncio.to_thread(self._complete_step, context, outcome)
+
+    def _begin_step(self, context: str, max_retry_number: int) -> None:
+        """Set up the execution state and conversation of the step"""
         # Create step node structure
         self.execution_state = {
             "step_name": self.step_name,
@@ -173,110 +244,148 @@ class Executor(BaseAgent):
                 "status": "initialized"
             }
         )
-    
-        max_iterations = config.get("executor.max_iterations", 10)
-        step_result = None
-        step_status = "running"
-        set_edge_status = {}  # Store edge status updates
-        current_inter = 1 # Track current iteration for incremental trace saving
-
-        while current_inter < max_iterations:
-            # **INCREMENTAL TRACE SAVE**: Save trace after each iteration
-            # Update execution state with iteration info
-            self.execution_state.update({"current_iteration": current_inter})
 
-            # Get agent's next action
-            if self.step_name.lower() == "end":
-                self.console.print(f"[blue]Iteration {current_inter} - Ending step execution as step is 'end'[/blue]")
-                json_data = {
-                    "thought": "No further actions required. Ending step execution.",
-                    "action": "finish_step",
-                    "parameters": {
-                        "result": "The full TSG execution completed",
-                        "status": "completed",
-                        "set_edge_status": {}
-                    }
+    def _end_step_action(self, current_inter: int) -> Tuple[Dict[str, Any], str]:
+        """The end node finishes without calling the LLM"""
+        self.console.print(f"[blue]Iteration {current_inter} - Ending step execution as step is 'end'[/blue]")
+        json_data = {
+            "thought": "No further actions required. Ending step execution.",
+            "action": "finish_step",
+            "parameters": {
+                "result": "The full TSG execution completed",
+                "status": "completed",
+                "set_edge_status": {}
+            }
+        }
+        return json_data, json.dumps(json_data)
+
+    def _decode_action(self, response: str, is_last_attempt: bool) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Parse an LLM response to extract thought, action, and parameters
+
+        Returns:
+            Tuple of (parsed action or None to retry, response to record). After the last
+            failed attempt a failing finish_step is returned instead.
+        """
+        if response.startswith("```json"):
+            response = response[7:]
+        if response.endswith("```"):
+            response = response[:-3]
+        try:
+            return json.loads(response), response
+        except json.JSONDecodeError as e:
+            self.console.print(f"[red]Error decoding JSON response from LLM: {response}[/red]")
+            if not is_last_attempt:
+                return None, response
+            json_data = {
+                "thought": "Failed to decode LLM response after multiple attempts.",
+                "action": "finish_step",
+                "parameters": {
+                    "result": "LLM response decoding failed",
+                    "status": "failed",
+                    "set_edge_status": {}
                 }
-                response = json.dumps(json_data)
+            }
+            return json_data, json.dumps(json_data)
+
+    def _take_action(self, json_data: Dict[str, Any], response: str) -> Optional[Tuple[Any, str, Any]]:
+        """
+        Record the response and execute its action, or its list of independent actions
+
+        Returns:
+            (result, status, set_edge_status) when the step finished, otherwise None
+        """
+        thought = json_data.get("thought", "")
+        actions = json_data.get("actions")
+        action = json_data.get("action", "")
+        parameters = json_data.get("parameters", {})
+        self._record_response(response, prefix=self.step_name)
+
+        if isinstance(actions, list):
+            if len(actions) == 1 and isinstance(actions[0], dict):
+                # A single action in list form is executed like a plain one
+                action = actions[0].get("action", "")
+                parameters = actions[0].get("parameters", {})
             else:
-                self.console.print(f"[blue]Iteration {current_inter} - Calling LLM for next action...[/blue]")
-                retry_count = 0
-                response = ""  
-                for retry in range(max_retry_number):
-                    try:
-                        response = self.call_llm(self.conversation_history)
-                        # Parse response to extract thought, action, and parameters
-                        if response.startswith("```json"):
-                            response = response[7:]
-                        if response.endswith("```"):
-                            response = response[:-3]
-                        json_data = json.loads(response)
-                        break
-                    except json.JSONDecodeError as e:
-                        self.console.print(f"[red]Error decoding JSON response from LLM: {response}[/red]")
-                        retry_count += 1
-                        if retry_count >= max_retry_number:
-                            json_data = {
-                                "thought": "Failed to decode LLM response after multiple attempts.",
-                                "action": "finish_step",
-                                "parameters": {
-                                    "result": "LLM response decoding failed",
-                                    "status": "failed",
-                                    "set_edge_status": {}
-                                }
-                            }
-                            response = json.dumps(json_data)
-                            break
-                    
-
-            thought = json_data.get("thought", "")
-            action = json_data.get("action", "")
-            parameters = json_data.get("parameters", {})
-            self._record_response(response, prefix=self.step_name)
-
-            # Check for completion - finish_step action
-            if action == "finish_step":
-                self.console.print(f"[green]Calling `finish_step` detected for step execution[/green]")
-
-                step_result = parameters.get("result", "Step completed")
-                step_status = parameters.get("status", "completed")
-                set_edge_status = parameters.get("set_edge_status", {})
-                self.console.print(f"[green]Parsed finish_step action with {len(set_edge_status)} edge updates[/green]")
+                observation = self._execute_actions(actions)
+                self._record_observation(observation, prefix=self.step_name)
+                return None
 
-                break
-            
-            self.console.print(f"[blue]Executing action:[/blue] {action} with parameters: {parameters}")
-            observation = self._execute_action(action, parameters)
-            self._record_observation(observation, prefix=self.step_name)
-
-            # If the action is to call a plugin, run the sql_query_tool directly
-            if action.startswith("plugin_"):
-                snippet_id = observation.split("SQL query snippet stored with ID: ")[-1].strip()
-                self.console.print(f"[blue]Will call SQL plugin directly with snippet ID: {snippet_id}[/blue]")
-                # Call the plugin directly with the snippet ID
-                sql_action = "sql_query_tool"
-                sql_parameters = {
-                    "snippet_id": snippet_id,
-                    "result_description": f"Result of {self.step_name} step execution"
-                }
-                self._record_response(
-                    json.dumps(
-                        {
-                            "thought": f"I will execute the SQL query using the plugin with the provided snippet ID: {snippet_id}",
-                            "action": sql_action,
-                            "parameters": sql_parameters
-                        }
-                    ),
-                    prefix=self.step_name
-                )
-                self.console.print(f"[blue]Executing SQL action directly:[/blue] {sql_action} with parameters: {sql_parameters}")
-                sql_observation = self._execute_action(sql_action, sql_parameters)
-                self._record_observation(sql_observation, prefix=self.step_name)
+        # Check for completion - finish_step action
+        if action == "finish_step":
+            self.console.print(f"[green]Calling `finish_step` detected for step execution[/green]")
 
-            current_inter += 1
+            step_result = parameters.get("result", "Step completed")
+            step_status = parameters.get("status", "completed")
+            set_edge_status = parameters.get("set_edge_status", {})
+            self.console.print(f"[green]Parsed finish_step action with {len(set_edge_status)} edge updates[/green]")
+
+            return step_result, step_status, set_edge_status
+        
+        self.console.print(f"[blue]Executing action:[/blue] {action} with parameters: {parameters}")
+        observation = self._execute_action(action, parameters)
+        self._record_observation(observation, prefix=self.step_name)
+
+        return None
+
+    def _execute_actions(self, actions: List[Any]) -> str:
+        """
+        Execute the independent actions of one turn
+
+        Actions of parallel-safe tools run concurrently in a thread pool, the others run one after
+        another in this thread. The observations are returned together in the order of the actions.
+
+        Args:
+            actions: List of {"action": ..., "parameters": {...}}
+
+        Returns:
+            Combined observation of all actions
+        """
+        observations = [None] * len(actions)
+        parallel, sequential = [], []
+        for index, item in enumerate(actions):
+            if not isinstance(item, dict) or not item.get("action"):
+                observations[index] = "Error: Each entry of \"actions\" must be an object with \"action\" and \"parameters\"."
+            elif item["action"] == "finish_step":
+                observations[index] = ("Error: finish_step cannot be combined with other actions. "
+                                       "Call it alone once the results of this turn are analyzed.")
+            elif item["action"] in self.tools and self.tools[item["action"]].runs_in_parallel(item.get("parameters") or {}):
+                parallel.append(index)
+            else:
+                sequential.append(index)
+
+        self.console.print(f"[blue]Executing {len(actions)} actions:[/blue] "
+                           f"{len(parallel)} in parallel, {len(sequential)} sequentially")
+        max_workers = min(len(parallel), config.get("executor.max_parallel_actions", 4)) if parallel else 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {
+                index: pool.submit(self._run_action, actions[index]["action"], actions[index].get("parameters", {}))
+                for index in parallel
+            }
+            for index in sequential:
+                observations[index] = self._run_action(actions[index]["action"], actions[index].get("parameters", {}))
+            for index, future in futures.items():
+                observations[index] = future.result()
+
+        return "\n\n".join(
+            f"[{index + 1}] {item.get('action') if isinstance(item, dict) else item}: {observation}"
+            for index, (item, observation) in enumerate(zip(actions, observations))
+        )
+
+    def _run_action(self, action: str, parameters: Dict[str, Any]) -> str:
+        """Execute one action of a multi-action turn"""
+        self.console.print(f"[blue]Executing action:[/blue] {action} with parameters: {parameters}")
+        return self._execute_action(action, parameters)
+
+    def _complete_step(self, context: str, outcome: Optional[Tuple[Any, str, Any]]) -> Dict[str, Any]:
+        """Build the final step output and save the final trace"""
+        for tool in self.tools.values():
+            # Tools that were never used have no step state
+            if getattr(tool, "instantiated", True):
+                tool.end_step()
 
         # If no result was found, generate a default result
-        if step_result is None:
+        if outcome is None:
             # Fallback if no finish_step action was found
             self.console.print("[yellow]No finish_step action found. Generating default conclusion.[/yellow]")
             
@@ -284,6 +393,8 @@ class Executor(BaseAgent):
             step_result = f"Step {self.step_name} was executed, but no finish_step action was provided."
             step_status = "failed"
             set_edge_status = None  # No edge updates in this case
+        else:
+            step_result, step_status, set_edge_status = outcome
 
         # Create final structured output
         final_output = {
@@ -1,5 +1,6 @@
 import json
 import os
+from datetime import datetime
 from typing import Dict, Any, Optional
 
 from rich.console import Console
@@ -7,6 +8,8 @@ from rich.console import Console
 from stepfly.agents.base_agent import BaseAgent
 from stepfly.utils.memory import Memory
 from stepfly.utils.config_loader import config
+from stepfly.utils.token_usage import write_token_usage_summary
+from stepfly.utils.trace_logger import flush_traces, compact_session_traces
 from stepfly.prompts import Prompts
 
 
@@ -17,17 +20,31 @@ class Scheduler(BaseAgent):
     troubleshooting workflow.
     """
     
-    def __init__(self, session_id: str, memory: Memory):
-        """Initialize the scheduler agent"""
+    def __init__(self, session_id: str, memory: Memory, resume: bool = False, use_node_cache: Optional[bool] = None):
+        """
+        Initialize the scheduler agent
+
+        Args:
+            session_id: Session ID
+            memory: Memory of the session
+            resume: Re-use the scheduler agent of an interrupted session, see resume_session()
+            use_node_cache: Reuse cached node results (defaults to scheduler.node_cache.enabled)
+        """
         super().__init__(session_id=session_id, memory=memory)
         self.name = "scheduler"
         self.role = "Scheduler"
         # create a unique session ID for this session
 
         self.console = Console()
-        self.agent_id = memory.register_agent(self.name)
+        checkpoint = memory.get_data_by_key("scheduler_checkpoint") if resume else None
+        if checkpoint:
+            self.agent_id = checkpoint["agent_id"]
+        else:
+            self.agent_id = memory.register_agent(self.name)
 
         self._load_tools(session_id=self.session_state["session_id"], memory=self.memory)
+        if use_node_cache is not None and "schedule_tool" in self.tools:
+            self.tools["schedule_tool"].use_node_cache = use_node_cache
         
         # Log to memory
         self.memory.add_data(
@@ -81,11 +98,138 @@ class Scheduler(BaseAgent):
         # Register conversation
         for message in self.conversation_history:
             self.register_conversation_message(self.agent_id, message)
+        self._save_checkpoint()
 
         # Start REACT loop
         self._react_loop()
+
+    def resume_session(self) -> None:
+        """
+        Resume an interrupted session from its last checkpoint.
+        Finished nodes keep their results; nodes whose executors died are run again.
+        """
+        self._restore_checkpoint()
+        self.display_message(
+            f"Resuming troubleshooting session {self.session_state['session_id']} "
+            f"after {self.session_state['steps_executed']} scheduler steps.",
+            title="TSG Scheduler"
+        )
+
+        if self.session_state["complete"]:
+            self.console.print("[green]Session is already complete, nothing to resume.[/green]")
+            return
+
+        # The process stopped between recording an action and its observation: run the action again
+        last_message = self.conversation_history[-1] if self.conversation_history else None
+        if last_message and last_message["role"] == "assistant":
+            json_data = self._parse_response(last_message["content"])
+            self._act_and_observe(json_data.get("action", ""), json_data.get("parameters", {}))
+
+        self._react_loop(start_step=self.session_state["steps_executed"])
+
+    def rerun_from_node(self, node_name: str) -> None:
+        """
+        Re-run a node and all nodes downstream of it, reusing the results of upstream nodes,
+        then let the scheduler continue the session with the new results
+
+        Args:
+            node_name: Name of the PlanDAG node to re-run from
+        """
+        self._restore_checkpoint()
+
+        schedule_tool = self.tools.get("schedule_tool")
+        if not schedule_tool:
+            raise ValueError("schedule_tool is not available for the scheduler")
+
+        # Re-use the parameters of the last schedule_tool call
+        schedule_parameters = None
+        for message in reversed(self.conversation_history):
+            if message["role"] != "assistant":
+                continue
+            json_data = self._parse_response(message["content"])
+            if json_data.get("action") == "schedule_tool":
+                schedule_parameters = json_data.get("parameters", {})
+                break
+        if schedule_parameters is None:
+            raise ValueError("schedule_tool has not been called in this session yet, nothing to re-run")
+
+        reset_nodes = schedule_tool.reset_from_node(node_name)
+
+        self.session_state["complete"] = False
+        self.session_state["execution_status"] = "running"
+        self.conversation_history.append(
+            {"role": "user", "content": f"The following steps were reset and will be executed again: {', '.join(reset_nodes)}. "
+                                        "Results of the other steps are kept."}
+        )
+        self.register_conversation_message(self.agent_id, self.conversation_history[-1])
+
+        self._record_response(
+            json.dumps({
+                "thought": f"I will re-run the workflow from {node_name} with the schedule tool.",
+                "action": "schedule_tool",
+                "parameters": schedule_parameters
+            }),
+            prefix="scheduler"
+        )
+        self._save_checkpoint()
+        self._act_and_observe("schedule_tool", schedule_parameters)
+
+        self._react_loop(start_step=self.session_state["steps_executed"])
+
+    def _save_checkpoint(self) -> None:
+        """Persist the ReAct state so that the session can be resumed by another process"""
+        self.memory.update_data_by_key(
+            key="scheduler_checkpoint",
+            data={
+                "agent_id": self.agent_id,
+                "conversation_history": self.conversation_history,
+                "session_state": self.session_state,
+                "timestamp": datetime.now().isoformat()
+            },
+            data_type="scheduler_checkpoint",
+            description=f"Scheduler {self.agent_id} checkpoint"
+        )
+
+    def _restore_checkpoint(self) -> None:
+        checkpoint = self.memory.get_data_by_key("scheduler_checkpoint")
+        if not checkpoint:
+            raise ValueError(f"No scheduler checkpoint found for session {self.session_state['session_id']}")
+
+        self.conversation_history = checkpoint["conversation_history"]
+        self.session_state.update(checkpoint["session_state"])
+
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """Parse a structured JSON response of the scheduler"""
+        if response.startswith("```json"):
+            response = response[7:]
+        if response.endswith("```"):
+            response = response[:-3]
+        return json.loads(response)
+
+    def _act_and_observe(self, action: str, parameters: Dict[str, Any]) -> None:
+        """Execute an action, record its observation and persist the updated state"""
+        observation = self._execute_action(action, parameters)
+        self._record_observation(observation, prefix="scheduler")
+
+        # Update session state
+        self.session_state["steps_executed"] += 1
+
+        # Check if session is complete
+        if action.lower() == "finish":
+            self.session_state["complete"] = True
+            self.session_state["execution_status"] = "completed"
+
+        # Update session state to memory
+        self.memory.add_data(
+            data=self.session_state,
+            data_type="scheduler_state",
+            agent_id=self.agent_id,
+            description=f"Updated scheduler {self.agent_id} state",
+            metadata={"key": f"scheduler_{self.agent_id}_state"}
+        )
+        self._save_checkpoint()
     
-    def _react_loop(self) -> None:
+    def _react_loop(self, start_step: int = 0) -> None:
         """Execute the REACT loop (Reason, Act, Observe)"""
         
         # Get max steps from config
@@ -93,7 +237,7 @@ class Scheduler(BaseAgent):
         single_step_retry_limit = config.get("single_step_retry_limit", 3)
         attempt = 1
         # Execute steps
-        for step in range(max_steps):
+        for step in range(start_step, max_steps):
 
             while attempt < single_step_retry_limit:
                 try:
@@ -130,31 +274,21 @@ class Scheduler(BaseAgent):
 
             # Record response
             self._record_response(response, prefix="scheduler")
+            self._save_checkpoint()
 
-            # Execute the action
-            observation = self._execute_action(action, parameters)
-            self._record_observation(observation, prefix="scheduler")
-            
-            # Update session state
-            self.session_state["steps_executed"] += 1
-
-            # Check if session is complete
-            if action.lower() == "finish":
-                self.session_state["complete"] = True
-                self.session_state["execution_status"] = "completed"
-            
-            # Update session state to memory
-            self.memory.add_data(
-                data=self.session_state,
-                data_type="scheduler_state",
-                agent_id=self.agent_id,
-                description=f"Updated scheduler {self.agent_id} state",
-                metadata={"key": f"scheduler_{self.agent_id}_state"}
-            )
+            # Execute the action and record the observation
+            self._act_and_observe(action, parameters)
 
             if self.session_state["complete"]:
                 break
 
+        # Aggregate the usage logs of all agents of the session
+        write_token_usage_summary(self.session_state["session_id"])
+        if config.get("trace.compact_on_finish", True):
+            # JSON view of every agent trace for the web UI and offline analysis
+            flush_traces()
+            compact_session_traces(self.session_state["session_id"])
+
     def _execute_action(self, action: str, parameters: Dict[str, Any]) -> str:
         """
         Execute the specified action with the given parameters
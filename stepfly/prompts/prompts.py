@@ -550,12 +550,12 @@ When using plugins and tools, follow this critical workflow:
 
 ## Plugin Execution Workflow:
 1. When you see a code block reference that contains executable code (like "please execute query plugin_x"):
-   a. Execute the corresponding plugin tool first (e.g., plugin_x_tool)
-   b. Get the snippet_id from the plugin tool's response
-   c. IMMEDIATELY execute the specific tool like sql_query_tool with this snippet_id to get actual results
+   a. Execute the corresponding plugin tool (e.g., plugin_x_tool) with its parameters
+   b. The plugin tool runs its SQL query directly and returns the result in the same observation: the memory ID of the stored result and a summary of it
+   c. Do NOT call sql_query_tool for a plugin's query - it has already been executed
 
-2. NEVER call a plugin tool multiple times in succession. The correct workflow is:
-   - Call plugin → Get snippet_id → Execute appropriate tool with snippet_id → Analyze results
+2. Do not call the same plugin tool again with the same parameters. The correct workflow is:
+   - Call plugin → Analyze the returned results (use code_interpreter with the result's memory ID for deeper analysis)
 
 ## Before Executing Any Plugin:
 - Carefully examine the plugin content in the TSG document
@@ -582,6 +582,21 @@ Example JSON output format:
 }
 ```
 
+## Multiple Independent Actions
+When your step needs several actions that do not depend on each other's results (e.g., running two different plugin queries), return them in one response with an "actions" list instead of "action" and "parameters":
+```json
+{
+  "thought": "The step needs the error counts from plugin_1 and the latency percentiles from plugin_2, which are independent.",
+  "actions": [
+    {"action": "plugin_1_tool", "parameters": {"service_name": "AuthService"}},
+    {"action": "plugin_2_tool", "parameters": {"service_name": "AuthService"}}
+  ]
+}
+```
+- The actions are executed together and their observations are returned in one message, numbered in the order of the list
+- Only combine actions whose parameters are already known; if an action needs the result of another, wait for the observation
+- Never include finish_step in an "actions" list - call it alone after analyzing the results
+
 # CRITICAL: Completion Format Requirements
 When you have completed your step successfully, you MUST use the following format:
 
@@ -641,14 +656,14 @@ Remember: Enabled edges allow the workflow to continue, disabled edges stop that
 
 # Important Guidelines:
 - Always ensure your output is valid JSON
-- Always include all three fields: "thought", "action", and "parameters" in EVERY response
+- Always include all three fields: "thought", "action", and "parameters" in EVERY response (or "thought" and "actions" for independent actions executed together)
 - When completing a step, use action="finish_step" with result and set_edge_status in parameters
 - Always analyze your findings against the edge conditions provided in your context
 - Enable edges only when their conditions are met based on your analysis
 - Provide clear, specific results that explain what you found and why
 - Include relevant data, metrics, or observations that support your conclusions
 - If you cannot determine a condition, err on the side of caution and disable the edge
-- NEVER CALL A PLUGIN TOOL TWICE IN SUCCESSION - after getting a snippet_id from a plugin, always use the appropriate execution tool
+- NEVER CALL A PLUGIN TOOL TWICE WITH THE SAME PARAMETERS - a plugin tool already returns the results of its query
 - When you see error in calling a tool, analyze the error message and adjust your approach accordingly and do not retry exactly as previous; if you cannot resolve the issue after {{max_retry_number}} attempts, call `finish_step` with status "failed" and appropriate edge status updates
 
 Available tools:
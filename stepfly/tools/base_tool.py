@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 import os
 import contextlib
+from typing import Any, Dict
+
 from stepfly.utils.memory import Memory
 
 class BaseTool(ABC):
@@ -8,18 +10,25 @@ class BaseTool(ABC):
     Base class for all tools used by agents.
     Tools provide specific functionality like reading files,
     interacting with users, or executing commands.
+
+    Tools declare their name and description as class attributes, so that agents
+    can describe them in prompts before they are created. Tools that can run
+    concurrently with other calls of the same turn set parallel_safe, or override
+    runs_in_parallel() if that depends on the parameters of a call.
     """
+
+    name: str = None
+    description: str = None
+    parallel_safe: bool = False
     
     def __init__(self, session_id: str, memory: Memory):
         """
         Initialize a tool
         
         Args:
-            name: Tool name for identification
-            description: Tool description for prompts
+            session_id: Session ID
+            memory: Shared memory
         """
-        self.name = None
-        self.description = None
         self.session_id = session_id
         self.memory = memory
         # Store the project root directory
@@ -37,6 +46,32 @@ class BaseTool(ABC):
             Result of the tool execution as a string
         """
         pass
+
+    @classmethod
+    def runs_in_parallel(cls, parameters: Dict[str, Any]) -> bool:
+        """
+        Whether a call can run concurrently with other calls of the same turn. Class-level, so
+        that agents can decide before the tool is created. Returns parallel_safe by default.
+
+        Args:
+            parameters: Parameters of the call
+        """
+        return cls.parallel_safe
+
+    def prefetch(self) -> None:
+        """
+        Prepare resources for an upcoming call, e.g. open a connection or import libraries.
+        Called from a background thread as soon as the agent has chosen this tool, while
+        the parameters are still being generated. Does nothing by default.
+        """
+        pass
+
+    def end_step(self) -> None:
+        """
+        Release state kept for the executor's current step. Called when the step ends.
+        Does nothing by default.
+        """
+        pass
     
     def get_description(self) -> str:
         """
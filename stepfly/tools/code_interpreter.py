@@ -4,24 +4,69 @@ import importlib
 import io
 import json
 import re
+import sys
+import threading
 import traceback
 import types
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
-import numpy as np
-import pandas as pd
-import pymongo
-import pymongoarrow as pma
-import scipy
 from rich.console import Console
 from rich.panel import Panel
 
 from stepfly.agents.base_agent import BaseAgent
-from stepfly.utils.memory import Memory
+from stepfly.utils.code_cache import code_cache_key, data_schema, get_code_cache, uncacheable_reason, value_digest
+from stepfly.utils.memory import Memory, is_dataframe
+from stepfly.utils.python_kernel import MEGABYTE, PythonKernel, environment_names, execution_environment
 from stepfly.utils.config_loader import config
 from stepfly.prompts import Prompts
 from stepfly.tools.base_tool import BaseTool
+from stepfly.tools.code_sandbox import SandboxError, SandboxSession, get_sandbox_pool
 from stepfly.utils.trace_logger import save_agent_trace  # Add trace logger import
+from stepfly.utils.tsg_sections import get_step_section
+
+
+class _ThreadLocalStream:
+    """
+    Replacement for sys.stdout/sys.stderr that sends writes of threads capturing output to their
+    own buffer. contextlib.redirect_stdout swaps the process-wide stream, which mixes output of
+    executors running code concurrently in threads of the asyncio runtime.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, "target", None) or self._stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+_stream_install_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _capture_output(stdout_capture: io.StringIO, stderr_capture: io.StringIO):
+    """Capture stdout/stderr written by the current thread"""
+    with _stream_install_lock:
+        if not isinstance(sys.stdout, _ThreadLocalStream):
+            sys.stdout = _ThreadLocalStream(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadLocalStream):
+            sys.stderr = _ThreadLocalStream(sys.stderr)
+    stdout, stderr = sys.stdout, sys.stderr
+
+    stdout._local.target, stderr._local.target = stdout_capture, stderr_capture
+    try:
+        yield
+    finally:
+        stdout._local.target, stderr._local.target = None, None
 
 
 def _format_success_response(code: str, result: str, include_code: bool = False) -> str:
@@ -59,56 +104,58 @@ def _format_error_response(code: str, error: str, attempts: int) -> str:
 
 class CodeInterpreter(BaseTool):
     """Tool for writing and executing Python code to analyze data and perform computations"""
+
+    name = "code_interpreter"
+    description = (
+        "Write and execute Python code to analyze data and perform computations. "
+        "Supports stateful execution and memory data integration.\n\n"
+
+        "## Required Parameters\n"
+        "- **task** (string): Description of the task to accomplish\n\n"
+        "- **input_type**: Type of input data, can be either (cannot mix both types in one call):\n"
+        "  • `memory_data`: Data stored in memory, referenced by GUIDs\n"
+        "  • `direct_data`: Direct data provided as a dictionary\n\n"
+        "- **input_data**: Data to process, can be either:\n"
+        "  • Dictionary mapping exact memory data_ids (GUIDs) to descriptions when data is stored in memory\n"
+        "  • Dictionary of direct data (e.g., lists, dictionaries) where keys are variable names and values are the data. In this case, be more specific about the variable names. Do not use names like `data`, `df`, etc. The value should be simple data types like lists, dictionaries, or strings in JSON format which will be parsed into Python objects.\n\n"
+
+        "## Usage Examples\n"
+        "**With memory data as input where the keys are data GUIDs:**\n"
+        "```json\n"
+        "{\n"
+        "  \"task\": \"Compare metrics across environments\",\n"
+        "  \"input_type\": \"memory_data\",\n"
+        "  \"input_data\": {\n"
+        "    \"88f7e390-af9a-4cf8-a6e1-a3b609913ac9\": \"Production metrics\",\n"
+        "    \"54321abc-def0-1234-5678-abcdef123456\": \"Staging metrics\"\n"
+        "  }\n"
+        "}\n"
+        "```\n\n"
+        "**With direct data as input:**\n"
+        "```json\n"
+        "{\n"
+        "  \"task\": \"Calculate average response time for API calls\",\n"
+        "  \"input_type\": \"direct_data\",\n"
+        "  \"input_data\": {\"response_time_list\": [100, 200, 150, 300, 250]}\n"
+        "}\n"
+        "```\n\n"
+
+        "## Output\n"
+        "- Executed code\n"
+        "- Printed output from code execution\n"
+        "- Error messages with debugging information if execution fails\n\n"
+
+        "## Notes\n"
+        "- **Output Requirement**: Use print() statements for all output - only printed text is visible\n"
+        "- **Visualization**: No visualization libraries (matplotlib) - provide textual summaries\n"
+        "- **DataFrame Access**: DataFrames from memory are pre-loaded and ready to use\n"
+        "- **State**: Variables computed by earlier calls in the same step stay available to later calls\n"
+        "- **Allowed Modules**: pandas, numpy, scipy, datetime, re, json, math, statistics"
+    )
     
 
     def __init__(self, session_id: str, memory: Memory):
         super().__init__(session_id, memory)
-        self.name="code_interpreter"
-        self.description=(
-            "Write and execute Python code to analyze data and perform computations. "
-            "Supports stateful execution and memory data integration.\n\n"
-
-            "## Required Parameters\n"
-            "- **task** (string): Description of the task to accomplish\n\n"
-            "- **input_type**: Type of input data, can be either (cannot mix both types in one call):\n"
-            "  • `memory_data`: Data stored in memory, referenced by GUIDs\n"
-            "  • `direct_data`: Direct data provided as a dictionary\n\n"
-            "- **input_data**: Data to process, can be either:\n"
-            "  • Dictionary mapping exact memory data_ids (GUIDs) to descriptions when data is stored in memory\n"
-            "  • Dictionary of direct data (e.g., lists, dictionaries) where keys are variable names and values are the data. In this case, be more specific about the variable names. Do not use names like `data`, `df`, etc. The value should be simple data types like lists, dictionaries, or strings in JSON format which will be parsed into Python objects.\n\n"
-
-            "## Usage Examples\n"
-            "**With memory data as input where the keys are data GUIDs:**\n"
-            "```json\n"
-            "{\n"
-            "  \"task\": \"Compare metrics across environments\",\n"
-            "  \"input_type\": \"memory_data\",\n"
-            "  \"input_data\": {\n"
-            "    \"88f7e390-af9a-4cf8-a6e1-a3b609913ac9\": \"Production metrics\",\n"
-            "    \"54321abc-def0-1234-5678-abcdef123456\": \"Staging metrics\"\n"
-            "  }\n"
-            "}\n"
-            "```\n\n"
-            "**With direct data as input:**\n"
-            "```json\n"
-            "{\n"
-            "  \"task\": \"Calculate average response time for API calls\",\n"
-            "  \"input_type\": \"direct_data\",\n"
-            "  \"input_data\": {\"response_time_list\": [100, 200, 150, 300, 250]}\n"
-            "}\n"
-            "```\n\n"
-
-            "## Output\n"
-            "- Executed code\n"
-            "- Printed output from code execution\n"
-            "- Error messages with debugging information if execution fails\n\n"
-
-            "## Notes\n"
-            "- **Output Requirement**: Use print() statements for all output - only printed text is visible\n"
-            "- **Visualization**: No visualization libraries (matplotlib) - provide textual summaries\n"
-            "- **DataFrame Access**: DataFrames from memory are pre-loaded and ready to use\n"
-            "- **Allowed Modules**: pandas, numpy, scipy, datetime, re, json, math, statistics"
-        )
         # Safe modules that can be imported by default
         self.allowed_modules = config.get("tools.code_interpreter.allowed_modules", [
             "pandas", "numpy", "scipy", "datetime", "re", "json", 
@@ -121,6 +168,54 @@ class CodeInterpreter(BaseTool):
         
         # Create a mini LLM agent for code generation
         self.code_agent = CodeGeneratorAgent(session_id=session_id)
+
+        # PlanDAG node of the executor using this tool, set by the executor
+        self.step_name = None
+
+        # Variables kept between executions of the executor's step
+        self.kernel_enabled = config.get("tools.code_interpreter.kernel.enabled", True)
+        self.kernel = PythonKernel(
+            max_bytes=int(config.get("tools.code_interpreter.kernel.max_megabytes", 1024) * MEGABYTE),
+            max_variable_bytes=int(config.get("tools.code_interpreter.kernel.max_variable_megabytes", 512) * MEGABYTE)
+        )
+        # Info of the memory data loaded into the kernel, by variable name
+        self._kernel_data_info: Dict[str, Dict[str, Any]] = {}
+
+        # Generated code runs in pooled worker processes with resource limits instead of this process
+        self.sandbox = None
+        if config.get("tools.code_interpreter.sandbox.enabled", False):
+            pool = get_sandbox_pool(
+                size=config.get("tools.code_interpreter.sandbox.pool_size", 2),
+                memory_megabytes=config.get("tools.code_interpreter.sandbox.memory_megabytes", 4096)
+            )
+            self.sandbox = SandboxSession(pool, session_id, limits={
+                "cpu_seconds": config.get("tools.code_interpreter.sandbox.cpu_seconds", 60),
+                "wall_seconds": config.get("tools.code_interpreter.sandbox.wall_seconds", 90),
+                "kernel_limits": (self.kernel.max_bytes, self.kernel.max_variable_bytes)
+            })
+
+    def prefetch(self) -> None:
+        if self.sandbox:
+            # Workers preload the data libraries themselves
+            self.sandbox.warm()
+            return
+        # Importing the data libraries takes a while the first time
+        for module_name in ("numpy", "pandas", "scipy"):
+            importlib.import_module(module_name)
+
+    def end_step(self) -> None:
+        self.kernel.reset()
+        self._kernel_data_info.clear()
+        if self.sandbox:
+            self.sandbox.close()
+
+    def _kernel_variables(self) -> Dict[str, str]:
+        """Variables kept from earlier executions of this step, mapped to their types"""
+        if not self.kernel_enabled:
+            return {}
+        if self.sandbox:
+            return self.sandbox.variables
+        return self.kernel.describe()
     
     def execute(self, task: str, input_type: str, input_data: Any = None) -> str:
         """
@@ -161,14 +256,21 @@ class CodeInterpreter(BaseTool):
         data_info = {}
         data_values = {}
         
+        kernel_variables = self._kernel_variables()
+
         # Process input_data depending on its type
         if input_type == "memory_data":
             # First type: Dictionary mapping data_ids to descriptions
             for data_id, description in input_data.items():
+                # Create a valid Python variable name from GUID
+                var_name = f"data_{data_id.replace('-', '_')}"
+                if var_name in kernel_variables and var_name in self._kernel_data_info:
+                    # Loaded by an earlier execution of this step and still in the kernel
+                    data_info[var_name] = dict(self._kernel_data_info[var_name], description=description)
+                    continue
+
                 data = self.memory.get_data(data_id)
-                if data is not None and isinstance(data, pd.DataFrame):
-                    # Create a valid Python variable name from GUID
-                    var_name = f"data_{data_id.replace('-', '_')}"
+                if data is not None and is_dataframe(data):
 
                     # Store DataFrame for execution environment
                     data_values[var_name] = data
@@ -180,12 +282,11 @@ class CodeInterpreter(BaseTool):
                         "data_type": "dataframe",
                         "shape": list(data.shape),
                         "columns": list(data.columns),
-                        "samples": data.head(5).to_dict(orient='records')
+                        "samples": data.head(5).to_dict(orient='records'),
+                        "schema": data_schema(data)
                     }
                 elif data is not None:
                     # For non-DataFrame data
-                    var_name = f"data_{data_id.replace('-', '_')}"
-
                     # Store for execution environment
                     data_values[var_name] = data
 
@@ -193,12 +294,16 @@ class CodeInterpreter(BaseTool):
                         "data_id": data_id,
                         "description": description,
                         "data_type": "other",
-                        "data_preview": str(data)[:1000] + "..." if isinstance(data, str) and len(str(data)) > 1000 else str(data)
+                        "data_preview": str(data)[:1000] + "..." if isinstance(data, str) and len(str(data)) > 1000 else str(data),
+                        "schema": data_schema(data)
                     }
                 else:
                     raise ValueError(
                         f"Data with ID '{data_id}' not found in memory. Please check the data_id."
                     )
+            if self.kernel_enabled:
+                # Later executions of this step find the data in the kernel
+                self._kernel_data_info.update({var_name: data_info[var_name] for var_name in data_values})
         elif input_type == "direct_data":
             for var_name, value in input_data.items():
                 data_values[var_name] = value
@@ -206,45 +311,70 @@ class CodeInterpreter(BaseTool):
                 data_info[var_name] = {
                     "data_type": type(value).__name__,
                     "description": f"Directly provided data for variable '{var_name}'",
-                    "data_preview": str(value)[:1000] + "..." if isinstance(value, str) and len(str(value)) > 1000 else str(value)
+                    "data_preview": str(value)[:1000] + "..." if isinstance(value, str) and len(str(value)) > 1000 else str(value),
+                    # Generated code may use the values shown in the preview, so they are part of the cache key
+                    "schema": dict(data_schema(value), value=value_digest(value))
                 }
         else:
             raise ValueError("Invalid input_type. Must be either 'memory_data' or 'direct_data'.")
 
         
+        # Code that succeeded before for the same task and input schemas runs without generating code
+        code_cache = get_code_cache() if config.get("tools.code_interpreter.code_cache.enabled", False) else None
+        bindings = [(var_name, info.get("data_id")) for var_name, info in data_info.items()]
+        cached_code = None
+        if code_cache:
+            cache_key = code_cache_key(task, [(binding, data_info[binding[0]]["schema"]) for binding in bindings])
+            cached_code = code_cache.get(cache_key, bindings)
+        execution_state["code_cache"] = "off" if code_cache is None else "hit" if cached_code else "miss"
+
         attempt = 0
         last_error = None
         last_llm_context = None
         previous_code = None
         code = None
+        tsg_content = None
         
         while attempt < self.max_attempts:
-            attempt += 1
-            
-            # Create attempt record
-            attempt_record = {
-                "attempt_number": attempt,
-                "start_time": datetime.datetime.now().isoformat()
-            }
-            
-            # 1. Generate code using the code agent
-            # Get TSG content from memory for context
-            tsg_content = self.memory.get_data_by_key("tsg_content")
-            code_args = {
-                "task": task,
-                "input_data": input_data,
-                "data_info": data_info,
-                "attempt_number": attempt,
-                "tsg_content": tsg_content,
-                "previous_code": previous_code  # Pass previous code for context
-            }
-            
-            if last_error:
-                code_args["error"] = last_error
-                
-            code_result = self.code_agent.generate_code(**code_args)
+            if cached_code is not None:
+                # Not counted as an attempt, the LLM is only called if the cached code fails
+                code_result = {"code": cached_code, "llm_context": None}
+                cached_code = None
+                attempt_record = {
+                    "attempt_number": 0,
+                    "code_cache_hit": True,
+                    "start_time": datetime.datetime.now().isoformat()
+                }
+            else:
+                attempt += 1
+
+                # Create attempt record
+                attempt_record = {
+                    "attempt_number": attempt,
+                    "start_time": datetime.datetime.now().isoformat()
+                }
+
+                if tsg_content is None:
+                    tsg_content = self._tsg_context()
+
+                # 1. Generate code using the code agent
+                code_args = {
+                    "task": task,
+                    "input_data": input_data,
+                    "data_info": data_info,
+                    "attempt_number": attempt,
+                    "tsg_content": tsg_content,
+                    "previous_code": previous_code,  # Pass previous code for context
+                    "kernel_variables": {name: description for name, description in self._kernel_variables().items()
+                                         if name not in data_info}
+                }
+
+                if last_error:
+                    code_args["error"] = last_error
+
+                code_result = self.code_agent.generate_code(**code_args)
+                previous_code = code_result["code"]  # Save for next iteration
             code = code_result["code"]
-            previous_code = code  # Save for next iteration
             attempt_record["generated_code"] = code
             attempt_record["llm_context"] = code_result["llm_context"]
             last_llm_context = code_result["llm_context"]  # Save for final trace
@@ -265,6 +395,7 @@ class CodeInterpreter(BaseTool):
             )
             
             # 2. Execute the code with pre-loaded data if available
+            kernel_names = set(self._kernel_variables()) - set(data_info)
             result, error = self._execute_code(code, self.allowed_modules, preloaded_data=data_values)
 
             # Update attempt record with results
@@ -289,6 +420,15 @@ class CodeInterpreter(BaseTool):
             
             # 3. If successful, return the result
             if not error:
+                if code_cache and not attempt_record.get("code_cache_hit"):
+                    # Code that depends on more than its inputs would give wrong results elsewhere
+                    reason = uncacheable_reason(code, set(data_info), environment_names(self.allowed_modules),
+                                                kernel_names, self._data_previews(data_info))
+                    if reason:
+                        execution_state["code_cache_skipped"] = reason
+                    else:
+                        code_cache.put(cache_key, task, code, bindings)
+
                 # Format successful response
                 formatted_result = _format_success_response(code, result)
                 
@@ -311,8 +451,8 @@ class CodeInterpreter(BaseTool):
                 
                 return formatted_result
             
-            # 4. Otherwise, store the error and try again
-            last_error = error
+            # 4. Otherwise, store the error and try again; failed cached code is not shown to the code generator
+            last_error = None if attempt_record.get("code_cache_hit") else error
         
         # All attempts failed - format error response
         error_response = _format_error_response(code, last_error, attempt)
@@ -335,6 +475,29 @@ class CodeInterpreter(BaseTool):
         )
         
         return error_response
+
+    @staticmethod
+    def _data_previews(data_info: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Previews of the memory data shown to the code generator, as text"""
+        previews = []
+        for info in data_info.values():
+            if not info.get("data_id"):
+                continue
+            if "samples" in info:
+                # Values only, column names are part of the schema
+                previews.append(json.dumps([list(record.values()) for record in info["samples"]], default=str))
+            if "data_preview" in info:
+                previews.append(info["data_preview"])
+        return previews
+
+    def _tsg_context(self) -> Optional[str]:
+        """TSG context for code generation: only the section of the executor's step when available"""
+        tsg_content = None
+        if config.get("executor.tsg_step_sections", True):
+            tsg_content = get_step_section(self.memory.get_data_by_key("tsg_sections"), self.step_name)
+        if tsg_content is None:
+            tsg_content = self.memory.get_data_by_key("tsg_content")
+        return tsg_content
     
     def _execute_code(self, code: str, allowed_modules: List[str], preloaded_data: Dict[str, Any] = None) -> tuple:
         """
@@ -348,53 +511,23 @@ class CodeInterpreter(BaseTool):
         Returns:
             Tuple of (result, error_message)
         """
-        # Create string IO for capturing output
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
-        
-        # Try to load previous state
-        session_vars = {}
-        
-        # Prepare the execution environment
-        exec_globals = {
-            "pd": pd,
-            "np": np,
-            "scipy": scipy,
-            "re": re,
-            "datetime": datetime,
-            "json": json,
-            "pymongo": pymongo,
-            "pma": pma,  # PyMongoArrow
-            "memory": self.memory,  # Provide access to the memory system
-            "__builtins__": __builtins__,
-            "print": lambda *args, **kwargs: print(*args, **kwargs, file=stdout_capture),
-            # Add previous session variables to environment
-            **session_vars
-        }
-        
-        # Add data frames from memory if available
-        if preloaded_data:
-            exec_globals.update(preloaded_data)
-        
-        # Import allowed modules
-        for module_name in allowed_modules:
-            if module_name not in ["pd", "np", "scipy", "re", "datetime", "json", "pymongo", "pma"]:  # Already imported
-                exec_globals[module_name] = importlib.import_module(module_name)
-        
         try:
-            # Capture all output
-            with contextlib.redirect_stdout(stdout_capture), contextlib.redirect_stderr(stderr_capture):
-                # Execute the code
-                exec(code, exec_globals)
-                
-                # Save state for next execution
-                # Filter out modules, functions, and special variables
-                reserved_vars = ['pd', 'np', 're', 'datetime', 'json', 'pymongo', 'pma', 'memory', 'print']
-                if preloaded_data:
-                    reserved_vars.extend(list(preloaded_data.keys()))
-                
-            # Get the output
-            stdout = stdout_capture.getvalue()
+            if self.sandbox:
+                stdout, evicted = self.sandbox.run(code, allowed_modules, preloaded_data, keep_variables=self.kernel_enabled)
+            else:
+                stdout, evicted = self._run_in_process(code, allowed_modules, preloaded_data)
+        except SandboxError as e:
+            # Raised in the worker, or a limit of the sandbox
+            error_type, error_msg, tb = e.error_type, e.message, e.details
+        except Exception as e:
+            # Get the error details
+            error_type = type(e).__name__
+            error_msg = str(e)
+            tb = traceback.format_exc()
+        else:
+            if evicted:
+                stdout += ("\nNot kept for later code of this step (memory limit): " +
+                           ", ".join(f"{name} ({size / MEGABYTE:.1f} MB)" for name, size in evicted) + "\n")
             
             # Print the output prominently to terminal with rich formatting
             if stdout.strip():
@@ -411,24 +544,42 @@ class CodeInterpreter(BaseTool):
             # Return the result
             return stdout, None
             
-        except Exception as e:
-            # Get the error details
-            error_type = type(e).__name__
-            error_msg = str(e)
-            tb = traceback.format_exc()
-            
-            # Print the error prominently to terminal with rich formatting
-            console = Console()
-            console.print("\n")
-            console.print(Panel(
-                f"[bold red]{error_type}:[/bold red] {error_msg}\n\n{tb}",
-                title="[bold red]CODE EXECUTION ERROR[/bold red]",
-                border_style="red",
-                expand=False
-            ))
-            console.print("\n")
-            
-            return None, f"{error_type}: {error_msg}\n\n{tb}"
+        # Print the error prominently to terminal with rich formatting
+        console = Console()
+        console.print("\n")
+        console.print(Panel(
+            f"[bold red]{error_type}:[/bold red] {error_msg}\n\n{tb}",
+            title="[bold red]CODE EXECUTION ERROR[/bold red]",
+            border_style="red",
+            expand=False
+        ))
+        console.print("\n")
+        
+        return None, f"{error_type}: {error_msg}\n\n{tb}"
+
+    def _run_in_process(self, code: str, allowed_modules: List[str],
+                        preloaded_data: Optional[Dict[str, Any]]) -> Tuple[str, List[Tuple[str, int]]]:
+        """
+        Execute code in this process
+
+        Returns:
+            Tuple of (captured output, variables evicted by the kernel)
+        """
+        # Create string IO for capturing output
+        stdout_capture = io.StringIO()
+        stderr_capture = io.StringIO()
+        
+        # Prepare the execution environment; variables of earlier executions are kept in the kernel
+        kernel = self.kernel
+        if not self.kernel_enabled:
+            kernel = PythonKernel(max_bytes=kernel.max_bytes, max_variable_bytes=kernel.max_variable_bytes)
+        exec_globals = execution_environment(self.memory, stdout_capture, allowed_modules)
+        
+        # Capture all output
+        with _capture_output(stdout_capture, stderr_capture):
+            # Execute the code with the data frames from memory
+            evicted = kernel.run(code, exec_globals, data=preloaded_data)
+        return stdout_capture.getvalue(), evicted
 
 
 class CodeGeneratorAgent(BaseAgent):
@@ -445,7 +596,7 @@ class CodeGeneratorAgent(BaseAgent):
     def generate_code(self, task: str, input_data: Any = None, 
                      data_info: Dict = None, error: Optional[str] = None, 
                      attempt_number: int = 1, tsg_content: str = None,
-                      previous_code: str = None) -> Dict[str, Any]:
+                      previous_code: str = None, kernel_variables: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """
         Generate Python code based on the given task
         
@@ -457,6 +608,7 @@ class CodeGeneratorAgent(BaseAgent):
             attempt_number: Current attempt number
             tsg_content: TSG document content for context (optional)
             previous_code: Code from the previous attempt (if any)
+            kernel_variables: Variables kept from earlier code of the step, mapped to their types
             
         Returns:
             Dictionary containing generated code and the LLM context
@@ -526,6 +678,15 @@ class CodeGeneratorAgent(BaseAgent):
             user_message += f"Data type: {type(input_data).__name__}\n\n"
             user_message += "This data is accessible as 'input_data' in your code.\n\n"
         
+        # Variables of earlier executions in this step
+        if kernel_variables:
+            user_message += "# Variables from earlier code in this step:\n\n"
+            user_message += ("These variables are still defined. Reuse them instead of reloading or "
+                             "recomputing the same results.\n\n")
+            for var_name, description in kernel_variables.items():
+                user_message += f"- `{var_name}`: {description}\n"
+            user_message += "\n"
+        
         # Add information about MongoDB memory access
         # TODO: remove unnecessary memory methods?
         user_message += "\n## Data Storage:\n"
@@ -559,6 +720,12 @@ class CodeGeneratorAgent(BaseAgent):
                 user_message += "1. Data is PRE-LOADED into variables - use them directly\n"
                 user_message += "2. DO NOT use memory.get_data() for pre-loaded data\n"
                 user_message += "3. Check the variable names provided above\n\n"
+
+            elif any(limit in error for limit in ("SandboxTimeout", "SandboxCPULimit", "SandboxMemoryLimit")):
+                user_message += "⚠️ The code exceeded the time or memory limit of the sandbox. Please:\n"
+                user_message += "1. Use vectorized pandas/numpy operations instead of loops such as iterrows()\n"
+                user_message += "2. Filter and aggregate before merging large DataFrames\n"
+                user_message += "3. Select only the columns you need\n\n"
             
             user_message += "Please fix the issues and provide corrected complete code.\n"
         
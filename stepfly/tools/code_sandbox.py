@@ -0,0 +1,335 @@
+import atexit
+import contextlib
+import importlib
+import io
+import multiprocessing
+import os
+import threading
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+# Imported by every worker before it reports ready, so that generated code does not pay for them
+PRELOADED_MODULES = ["numpy", "pandas", "scipy"]
+
+# Seconds a worker may take to start and preload its modules
+WORKER_START_TIMEOUT = 120
+
+
+class SandboxError(Exception):
+    """Failure of generated code in a sandbox worker, or of the worker itself"""
+
+    def __init__(self, error_type: str, message: str, details: str = ""):
+        super().__init__(message)
+        self.error_type = error_type
+        self.message = message
+        self.details = details
+
+
+class CPULimitExceeded(BaseException):
+    """Raised in a worker on SIGXCPU; not an Exception, so generated code cannot catch it by accident"""
+
+
+def _raise_cpu_limit(signum, frame):
+    raise CPULimitExceeded()
+
+
+def _set_cpu_limit(seconds: Optional[float]) -> None:
+    """Limit the CPU time of the next request, or lift the limit with None"""
+    import resource
+
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, memory_bytes: Optional[int]) -> None:
+    """
+    Sandbox worker process: preloads the data libraries, then executes requests until the
+    parent closes the pipe. Each request runs in a PythonKernel, kept until a reset request.
+    """
+    import resource
+    import signal
+
+    # One analysis per worker, the numeric libraries need no thread pools of their own
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, "1")
+    for module_name in PRELOADED_MODULES:
+        importlib.import_module(module_name)
+
+    from stepfly.utils.python_kernel import PythonKernel, execution_environment
+
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+
+    kernel = None
+    memories = {}
+    conn.send({"ready": True})
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+
+        if request["op"] == "reset":
+            if kernel is not None:
+                kernel.reset()
+            conn.send({"ok": True})
+            continue
+
+        if kernel is None or (kernel.max_bytes, kernel.max_variable_bytes) != request["kernel_limits"]:
+            kernel = PythonKernel(*request["kernel_limits"])
+        if not request["keep_variables"]:
+            kernel.reset()
+
+        stdout = io.StringIO()
+        response = {"stdout": "", "error": None, "evicted": []}
+        try:
+            session_id = request["session_id"]
+            if session_id not in memories:
+                from stepfly.utils.memory import Memory
+                memories[session_id] = Memory(session_id=session_id)
+            environment = execution_environment(memories[session_id], stdout, request["allowed_modules"])
+            _set_cpu_limit(request["cpu_seconds"])
+            try:
+                with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+                    response["evicted"] = kernel.run(request["code"], environment, data=request["data"])
+            finally:
+                _set_cpu_limit(None)
+        except CPULimitExceeded:
+            response["error"] = ("SandboxCPULimit", f"Code execution exceeded the CPU time limit of {request['cpu_seconds']} s", "")
+        except MemoryError:
+            response["error"] = ("SandboxMemoryLimit", "Code execution exceeded the memory limit of the sandbox", traceback.format_exc())
+        except Exception as e:
+            response["error"] = (type(e).__name__, str(e), traceback.format_exc())
+        response["stdout"] = stdout.getvalue()
+        response["variables"] = kernel.describe() if request["keep_variables"] else {}
+        try:
+            conn.send(response)
+        except Exception as e:
+            # The result could not be pickled
+            conn.send({"stdout": response["stdout"], "error": (type(e).__name__, str(e), ""), "evicted": [], "variables": {}})
+
+
+class _Worker:
+    """A sandbox worker process and the parent end of its pipe"""
+
+    def __init__(self, memory_bytes: Optional[int]):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=_worker_main, args=(child_conn, memory_bytes), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self) -> None:
+        if self.ready:
+            return
+        if not self.conn.poll(WORKER_START_TIMEOUT):
+            raise SandboxError("SandboxUnavailable", "Sandbox worker did not start in time")
+        self.conn.recv()
+        self.ready = True
+
+    def request(self, message: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        """
+        Send a request and wait for its response
+
+        Raises:
+            SandboxError: The worker did not respond in time or exited
+        """
+        try:
+            self.wait_ready()
+            self.conn.send(message)
+            if not self.conn.poll(timeout):
+                raise SandboxError("SandboxTimeout", f"Code execution exceeded the time limit of {timeout} s")
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(1)
+            raise SandboxError("SandboxCrashed",
+                               f"Sandbox worker exited unexpectedly (exit code {self.process.exitcode})")
+
+    def terminate(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Pool of warm sandbox worker processes shared by the code interpreters of a process.
+
+    Workers are spawned with the data libraries preloaded and their address space limited.
+    A worker serves one executor step at a time, so the variables of the step stay in it.
+
+    Only a process that runs many executors (the async executor runtime) keeps idle workers
+    warm and replaces workers that timed out or crashed in the background. A process that runs
+    a single executor would kill such workers unused on exit, so it only starts the worker of
+    its step ahead of time.
+    """
+
+    def __init__(self, size: int, memory_megabytes: Optional[int], keep_warm: bool = False):
+        """
+        Args:
+            size: Number of idle workers kept warm
+            memory_megabytes: Address space limit of every worker, None for no limit
+            keep_warm: Keep size idle workers, for processes that outlive their executors
+        """
+        self.size = size
+        self.memory_bytes = int(memory_megabytes * 1024 * 1024) if memory_megabytes else None
+        self.keep_warm = keep_warm
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warm(self) -> None:
+        """Start idle workers in the background, up to the pool size or one if the pool is not kept warm"""
+        threading.Thread(target=self._replenish, daemon=True).start()
+
+    def _replenish(self) -> None:
+        with self._lock:
+            target = self.size if self.keep_warm else 1
+            missing = target - len(self._idle) if not self._closed else 0
+            workers = [_Worker(self.memory_bytes) for _ in range(missing)]
+            self._idle.extend(workers)
+
+    def acquire(self) -> _Worker:
+        """Take an idle worker, starting one if none is idle"""
+        with self._lock:
+            worker = self._idle.pop(0) if self._idle else None
+        if worker is None or not worker.process.is_alive():
+            worker = _Worker(self.memory_bytes)
+        if self.keep_warm:
+            self.warm()
+        return worker
+
+    def release(self, worker: _Worker) -> None:
+        """Return a worker after its step ended, dropping its variables"""
+        try:
+            worker.request({"op": "reset"}, timeout=10)
+        except SandboxError:
+            self.discard(worker)
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+        worker.terminate()
+
+    def discard(self, worker: _Worker) -> None:
+        """Kill a worker that timed out or crashed and start a replacement if the pool is kept warm"""
+        worker.terminate()
+        if self.keep_warm:
+            self.warm()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.terminate()
+
+
+class SandboxSession:
+    """
+    Sandbox execution for the steps of one code interpreter.
+
+    A worker is taken from the pool on the first execution of a step and returned when the
+    step ends. If the worker has to be killed, the variables of the step are lost.
+    """
+
+    def __init__(self, pool: SandboxPool, session_id: str, limits: Dict[str, Any]):
+        """
+        Args:
+            pool: Pool the workers are taken from
+            session_id: Session whose memory is available to the code
+            limits: cpu_seconds and wall_seconds of one execution, kernel_limits as (max bytes, max variable bytes)
+        """
+        self.pool = pool
+        self.session_id = session_id
+        self.limits = limits
+        self.variables: Dict[str, str] = {}
+        self._worker: Optional[_Worker] = None
+
+    def warm(self) -> None:
+        """Start a worker ahead of the first execution, unless the step already has one"""
+        if self._worker is None:
+            self.pool.warm()
+
+    def run(self, code: str, allowed_modules: List[str], data: Optional[Dict[str, Any]],
+            keep_variables: bool) -> Tuple[str, List[Tuple[str, int]]]:
+        """
+        Execute code in the step's worker
+
+        Returns:
+            Tuple of (captured output, variables evicted by the kernel)
+
+        Raises:
+            SandboxError: The code failed or exceeded a limit
+        """
+        if self._worker is None:
+            self._worker = self.pool.acquire()
+        request = {
+            "op": "run",
+            "code": code,
+            "data": data or {},
+            "allowed_modules": allowed_modules,
+            "session_id": self.session_id,
+            "cpu_seconds": self.limits["cpu_seconds"],
+            "kernel_limits": self.limits["kernel_limits"],
+            "keep_variables": keep_variables
+        }
+        try:
+            response = self._worker.request(request, timeout=self.limits["wall_seconds"])
+        except SandboxError as e:
+            # The worker is stuck or gone, and with it the variables of the step
+            self.pool.discard(self._worker)
+            self._worker = None
+            self.variables = {}
+            e.message += ". The sandbox was restarted; variables from earlier code in this step are no longer defined"
+            raise
+
+        self.variables = response["variables"]
+        if response["error"]:
+            error_type, message, details = response["error"]
+            raise SandboxError(error_type, message, details)
+        return response["stdout"], response["evicted"]
+
+    def close(self) -> None:
+        """Return the worker to the pool at the end of the step"""
+        worker, self._worker = self._worker, None
+        self.variables = {}
+        if worker is not None:
+            self.pool.release(worker)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_long_lived = False
+
+
+def mark_long_lived() -> None:
+    """Declare that this process runs many executors, so that its sandbox pool is kept warm"""
+    global _long_lived
+    with _pool_lock:
+        _long_lived = True
+        if _pool is not None:
+            _pool.keep_warm = True
+
+
+def get_sandbox_pool(size: int, memory_megabytes: Optional[int]) -> SandboxPool:
+    """Get the sandbox pool of this process, created with the given settings on first call"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool(size, memory_megabytes, keep_warm=_long_lived)
+            atexit.register(_pool.shutdown)
+        return _pool
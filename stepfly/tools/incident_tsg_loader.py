@@ -8,19 +8,21 @@ from stepfly.utils.memory import Memory
 from stepfly.utils.config_loader import config
 from stepfly.tools.base_tool import BaseTool
 from stepfly.utils.file_utils import FileUtils
+from stepfly.utils.tsg_sections import parse_tsg_sections
 
 
 class IncidentTSGLoader(BaseTool):
     """Tool for loading incident information, corresponding TSG document, and PlanDAG in one operation"""
+
+    name = "incident_tsg_loader"
+    description = (
+        "Load incident information, the corresponding TSG document, and its PlanDAG.\n\n"
+        "Required Parameters:\n"
+        "- incident_id: The incident ID number (e.g., \"642017861\")"
+    )
     
     def __init__(self, session_id: str, memory: Memory):
         super().__init__(session_id, memory)
-        self.name = "incident_tsg_loader"
-        self.description = (
-            "Load incident information, the corresponding TSG document, and its PlanDAG.\n\n"
-            "Required Parameters:\n"
-            "- incident_id: The incident ID number (e.g., \"642017861\")"
-        )
         
         # Load configuration for incident_info functionality
         sql_config = config.get_section("database.sql")
@@ -165,6 +167,14 @@ class IncidentTSGLoader(BaseTool):
                 description=f"TSG document content for {tsg_name}",
                 metadata={"key": "tsg_content", "tsg_name": tsg_name, "path": path}
             )
+
+            # Store the TSG split into step sections, so that executors only get the part they need
+            self.memory.add_data(
+                data=parse_tsg_sections(processed_content),
+                data_type="tsg_sections",
+                description=f"TSG step sections for {tsg_name}",
+                metadata={"key": "tsg_sections", "tsg_name": tsg_name}
+            )
             
             return processed_content
             
@@ -1,30 +1,30 @@
 import json
 
-import pandas as pd
-
-from stepfly.utils.memory import Memory
+from stepfly.utils.memory import Memory, is_dataframe
 from stepfly.tools.base_tool import BaseTool
 
 
 class MemoryTool(BaseTool):
     """Read-only tool for accessing information from the shared memory used by multiple agents."""
+
+    name = "memory_tool"
+    parallel_safe = True
+    description = (
+        "Read-only tool for accessing information from the shared memory used by multiple agents.\n\n"
+        "Required Parameters:\n"
+        "- action: Action to perform (get_data, list_data, get_data_summary, get_data_section, search_data, get_code_snippet)\n\n"
+        "Optional Parameters (action-specific):\n"
+        "- data_id: UUID of the data to access\n"
+        "- data_type: Filter by data type\n"
+        "- agent_id: Filter by agent ID\n"
+        "- start_line: Starting line/row (default: 0)\n"
+        "- num_lines: Number of lines/rows (default: 20)\n"
+        "- search_term: Text to search for\n"
+        "- snippet_id: ID of the code snippet"
+    )
     
     def __init__(self, session_id: str, memory: Memory):
         super().__init__(session_id, memory)
-        self.name="memory_tool"
-        self.description=(
-            "Read-only tool for accessing information from the shared memory used by multiple agents.\n\n"
-            "Required Parameters:\n"
-            "- action: Action to perform (get_data, list_data, get_data_summary, get_data_section, search_data, get_code_snippet)\n\n"
-            "Optional Parameters (action-specific):\n"
-            "- data_id: UUID of the data to access\n"
-            "- data_type: Filter by data type\n"
-            "- agent_id: Filter by agent ID\n"
-            "- start_line: Starting line/row (default: 0)\n"
-            "- num_lines: Number of lines/rows (default: 20)\n"
-            "- search_term: Text to search for\n"
-            "- snippet_id: ID of the code snippet"
-        )
     
     def execute(self, action: str, **kwargs) -> str:
         """
@@ -52,7 +52,7 @@ class MemoryTool(BaseTool):
                         return f"No data found with ID: {data_id}"
                     
                     # Special handling for DataFrames
-                    if isinstance(data, pd.DataFrame):
+                    if is_dataframe(data):
                         # For large DataFrames, return a summary view
                         if data.shape[0] > 10:
                             result = f"DataFrame with shape {data.shape}, columns: {list(data.columns)}\n\n"
@@ -0,0 +1,116 @@
+import importlib
+import pkgutil
+import threading
+from typing import Dict, Any, Type
+
+from stepfly.tools.base_tool import BaseTool
+from stepfly.utils.memory import Memory
+
+_tool_classes = None
+_registry_lock = threading.Lock()
+
+
+def get_tool_classes() -> Dict[str, Type[BaseTool]]:
+    """
+    Get the tool classes of the stepfly.tools package
+
+    The package is scanned once per process; tools are identified by their
+    class-level name, so nothing is instantiated here.
+
+    Returns:
+        Dictionary mapping tool names to tool classes
+    """
+    global _tool_classes
+    with _registry_lock:
+        if _tool_classes is None:
+            import stepfly.tools as tools_package
+
+            classes = {}
+            for _, name, is_pkg in pkgutil.iter_modules(tools_package.__path__):
+                if name in ("base_tool", "registry") or is_pkg:
+                    continue
+                module = importlib.import_module(f"stepfly.tools.{name}")
+                for attr in vars(module).values():
+                    if (isinstance(attr, type) and
+                            issubclass(attr, BaseTool) and
+                            attr is not BaseTool and
+                            attr.__module__ == module.__name__ and
+                            attr.name):
+                        classes[attr.name] = attr
+            _tool_classes = classes
+        return _tool_classes
+
+
+class LazyTool:
+    """
+    Stand-in for a tool that is created on first use.
+
+    The name and description come from the tool class, so building prompts does not
+    create the tool. Attributes set before the tool exists (e.g. step_name) are kept
+    and applied to the tool when it is created.
+    """
+
+    def __init__(self, tool_class: Type[BaseTool], session_id: str, memory: Memory):
+        object.__setattr__(self, "_tool_class", tool_class)
+        object.__setattr__(self, "_session_id", session_id)
+        object.__setattr__(self, "_memory", memory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_pending", {})
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    @property
+    def name(self) -> str:
+        return self._tool_class.name
+
+    @property
+    def description(self) -> str:
+        return self._tool_class.description
+
+    @property
+    def parallel_safe(self) -> bool:
+        return self._tool_class.parallel_safe
+
+    def runs_in_parallel(self, parameters: Dict[str, Any]) -> bool:
+        return self._tool_class.runs_in_parallel(parameters)
+
+    def get_description(self) -> str:
+        return f"{self.name}: \n{self.description}"
+
+    @property
+    def instantiated(self) -> bool:
+        return self._instance is not None
+
+    def get_instance(self) -> BaseTool:
+        """
+        Get the tool, creating it on first call
+
+        Returns:
+            Tool instance
+        """
+        with self._lock:
+            if self._instance is None:
+                instance = self._tool_class(session_id=self._session_id, memory=self._memory)
+                for key, value in self._pending.items():
+                    setattr(instance, key, value)
+                self._pending.clear()
+                object.__setattr__(self, "_instance", instance)
+            return self._instance
+
+    def __getattr__(self, item: str) -> Any:
+        # Only called for attributes not found on the proxy itself
+        pending = object.__getattribute__(self, "_pending")
+        if item in pending:
+            return pending[item]
+        return getattr(self.get_instance(), item)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        with self._lock:
+            if self._instance is None:
+                self._pending[key] = value
+                return
+        setattr(self._instance, key, value)
+
+    def __repr__(self) -> str:
+        state = "created" if self.instantiated else "not created"
+        return f"<LazyTool {self.name} ({state})>"
+
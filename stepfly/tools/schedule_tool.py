@@ -1,19 +1,28 @@
 import json
 import multiprocessing
+import os
+import re
 multiprocessing.set_start_method('spawn', force=True)
 import threading
 import time
 import uuid
 from datetime import datetime
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from rich.console import Console
-from rich.table import Table
 
-from stepfly.agents.executor import Executor
-from stepfly.utils.memory import Memory
+from stepfly.utils.memory import Memory, flush_memory_writes
 from stepfly.tools.base_tool import BaseTool
 from stepfly.utils.config_loader import config
+from stepfly.utils.context_budget import ContextBudgeter
+from stepfly.utils.tsg_sections import build_step_tsg
+from stepfly.utils.node_result_cache import (
+    NodeResultCache, extract_incident_parameters, referenced_ids, replace_ids, tsg_parameter_names
+)
+from stepfly.utils.perf_stats import flush_perf_stats
+from stepfly.utils.trace_logger import flush_traces
+from stepfly.utils.work_queue import WorkQueue, QueuedExecutorHandle
+from stepfly.utils.async_runtime import AsyncExecutorRuntime
 
 
 def _set_all_output_edges_disabled(node: Dict[str, Any], edge_status: List[Dict[str, Any]]) -> None:
@@ -106,6 +115,9 @@ def _run_executor(
         node_context: str,
         max_retry_number: int = 3,
 ) -> None:
+    # Imported here so that only executor processes load the executor stack
+    from stepfly.agents.executor import Executor
+
     node_name = node["node"]
     print(f"[blue]Starting executor {executor_agent_id} for node: {node_name}[/blue]")
 
@@ -120,7 +132,12 @@ def _run_executor(
 
     # Execute the step
     print(f"[blue]Executor {executor_agent_id} executing node: {node_name}[/blue]")
-    step_result = executor.execute_step(node_context, max_retry_number=max_retry_number)
+    try:
+        step_result = executor.execute_step(node_context, max_retry_number=max_retry_number)
+    finally:
+        # Executor processes exit without running atexit handlers
+        flush_traces()
+        flush_memory_writes()
 
     # Update step result in memory
     print(f"[blue]Executor {executor_agent_id} finished node: {node_name} with result: {step_result}[/blue]")
@@ -135,6 +152,72 @@ def _run_executor(
         description=f"Store execution result for node {node_name}",
         metadata={"key": f"{executor_agent_id}_step_result"}
     )
+    flush_perf_stats(session_id, f"{node_name}_{executor_agent_id}")
+
+
+def _get_downstream_nodes(node_name: str, node_status: List[Dict[str, Any]]) -> List[str]:
+    """Get the node and all nodes reachable from it through output edges, in Node_Status order"""
+    nodes_by_input_edge = {}
+    for node in node_status:
+        for edge_info in node.get("input_edges", []):
+            nodes_by_input_edge.setdefault(edge_info.get("edge"), []).append(node["node"])
+
+    node_by_name = {node["node"]: node for node in node_status}
+    if node_name not in node_by_name:
+        raise ValueError(f"Node '{node_name}' not found in Node_Status")
+
+    reachable = {node_name}
+    frontier = [node_name]
+    while frontier:
+        current = node_by_name[frontier.pop()]
+        for edge_info in current.get("output_edges", []):
+            for target in nodes_by_input_edge.get(edge_info.get("edge"), []):
+                if target not in reachable:
+                    reachable.add(target)
+                    frontier.append(target)
+
+    return [node["node"] for node in node_status if node["node"] in reachable]
+
+
+def _reset_nodes_from(node_name: str, node_status: List[Dict[str, Any]], edge_status: List[Dict[str, Any]]) -> List[str]:
+    """
+    Reset a node and everything downstream of it to pending, keeping upstream results
+
+    Returns:
+        Names of the reset nodes
+    """
+    reset_nodes = _get_downstream_nodes(node_name, node_status)
+    reset_edges = set()
+    for node in node_status:
+        if node["node"] in reset_nodes:
+            node["status"] = "pending"
+            node["result"] = None
+            node["executor_id"] = None
+            # A re-run must execute the node again rather than reuse a cached result
+            node.pop("cache_hit", None)
+            node["skip_cache"] = True
+            reset_edges.update(edge_info.get("edge") for edge_info in node.get("output_edges", []))
+
+    for edge in edge_status:
+        if edge["edge"] in reset_edges:
+            edge["status"] = "pending"
+
+    return reset_nodes
+
+
+class _DetachedExecutorHandle:
+    """Handle for an executor started by a previous scheduler process whose result is already stored"""
+
+    exitcode = None
+
+    def is_alive(self) -> bool:
+        return False
+
+    def terminate(self) -> None:
+        return None
+
+    def join(self, timeout: float = None) -> None:
+        return None
 
 
 def _is_execution_complete(all_node_status: Dict[str, Any], all_edge_status: Dict[str, Any]) -> bool:
@@ -154,31 +237,71 @@ def _is_execution_complete(all_node_status: Dict[str, Any], all_edge_status: Dic
     return not any_pending_edges and not any_unfinished_nodes
 
 
+def _conversation_actions(conversation: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Actions called in the assistant messages of an executor conversation"""
+    actions = []
+    for message in conversation:
+        if message.get("role") != "assistant":
+            continue
+        try:
+            message_obj = json.loads(message.get("content", ""))
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if not isinstance(message_obj, dict):
+            continue
+        # A turn has one action or a list of independent actions
+        items = message_obj.get("actions")
+        if not isinstance(items, list):
+            items = [message_obj]
+        actions.extend(item for item in items if isinstance(item, dict))
+    return actions
+
+
 def format_assistant_message(message: str) -> str:
     message_obj = json.loads(message)
-    action = message_obj.get("action", "")
-    parameters = message_obj.get("parameters", "{}")
-    return f"Action: tool `{action}` is called with parameters: {parameters}"
+    # A turn has one action or a list of independent actions
+    actions = message_obj.get("actions")
+    if not isinstance(actions, list):
+        actions = [message_obj]
+    lines = []
+    for item in actions:
+        if not isinstance(item, dict):
+            continue
+        action = item.get("action", "")
+        parameters = item.get("parameters", "{}")
+        lines.append(f"Action: tool `{action}` is called with parameters: {parameters}")
+    return "\n".join(lines)
 
 
 class ScheduleTool(BaseTool):
     """Tool for monitoring edge status and deploying executors asynchronously"""
+
+    name = "schedule_tool"
+    description = (
+        "Monitor edge status and deploy executors for workflow nodes based on PlanDAG structure.\n\n"
+        "Required Parameters:\n"
+        "- incident_id: The incident ID for context\n"
+        "- tsg_path: Path to the TSG document"
+    )
     
     def __init__(self, session_id: str, memory: Memory):
         super().__init__(session_id, memory)
         self.tsg_path = None
         self.incident_id = None
-        self.name="schedule_tool"
-        self.description=(
-            "Monitor edge status and deploy executors for workflow nodes based on PlanDAG structure.\n\n"
-            "Required Parameters:\n"
-            "- incident_id: The incident ID for context\n"
-            "- tsg_path: Path to the TSG document"
-        )
         self.console = Console()
         self.running_nodes = {}  # Set to track currently running nodes
         self.monitoring_thread = None
         self.running = False
+        # "process" runs executors as local child processes, "async" as coroutines in this process,
+        # "queue" dispatches them to worker daemons
+        self.dispatch_mode = config.get("scheduler.dispatch_mode", "process")
+        self._work_queue = None
+        # Reuse results of identical nodes from earlier sessions, can be switched off per session
+        self.use_node_cache = config.get("scheduler.node_cache.enabled", False)
+        self._node_cache = None
+        self._incident_parameter_names = None
+        # Rendered context blocks of finished nodes, keyed by executor ID
+        self._context_blocks = {}
         
     def execute(self, incident_id: str, tsg_path: str) -> str:
         """
@@ -195,6 +318,9 @@ class ScheduleTool(BaseTool):
             # Store parameters for use in monitoring thread
             self.incident_id = incident_id
             self.tsg_path = tsg_path
+
+            # Pick up nodes left running by a previous scheduler process
+            self._reconcile_running_nodes()
             
             # Start monitoring thread
             self.running = True
@@ -253,8 +379,10 @@ class ScheduleTool(BaseTool):
                 if not process_status:
                     self.running_nodes[executor_id]["process"].join(timeout=1)
                 else:
-                    process_start_time = self.running_nodes[executor_id]["start_time"]
-                    if (datetime.now() - process_start_time).total_seconds() > executor_timeout:
+                    # Queued executors only start their clock once a worker claimed them
+                    process_start_time = getattr(self.running_nodes[executor_id]["process"], "started_at",
+                                                 self.running_nodes[executor_id]["start_time"])
+                    if process_start_time and (datetime.now() - process_start_time).total_seconds() > executor_timeout:
                         self.console.print(f"[red]Executor {executor_id} timed out, terminating it.[/red]")
                         self.running_nodes[executor_id]["process"].terminate()
                         self.running_nodes[executor_id]["process"].join(timeout=1)
@@ -275,6 +403,19 @@ class ScheduleTool(BaseTool):
                 else:
                     executor_result = self.memory.get_data_by_key(f"{executor_id}_step_result")
 
+                if not executor_result and not process_status:
+                    # The executor exited (or its queued task failed) without storing a result
+                    exitcode = self.running_nodes[executor_id]["process"].exitcode
+                    self.console.print(f"[red]Executor {executor_id} exited without result (exit code {exitcode}).[/red]")
+                    executor_result = {
+                        "node_name": self.running_nodes[executor_id]["node_name"],
+                        "executor_id": executor_id,
+                        "result": {
+                            "status": "failed",
+                            "error": f"Executor exited without result (exit code {exitcode})"
+                        }
+                    }
+
                 if not executor_result:
                     continue
 
@@ -294,6 +435,8 @@ class ScheduleTool(BaseTool):
                             # Update edge status based on set_edge_status
                             print(f"[green]Node {node_name} finished, updating output edges {set_edge_status}[/green]")
                             _update_output_edges(all_edge_status, set_edge_status)
+                            self._store_node_cache(node, all_node_status, executor_result["result"])
+                            self._store_context_block(node)
                         else:
                             # If node is not finished, disable all output edges
                             print(f"[yellow]Node {node_name} failed, disabling all output edges[/yellow]")
@@ -340,27 +483,23 @@ class ScheduleTool(BaseTool):
             for node in nodes_to_run:
                 if is_end_triggered and node["node"].lower() not in ["end"]:
                     continue    # If end node is triggered, do not start any other nodes except end node
+
+                # Finish the node right away if an identical run is cached
+                if self._apply_node_cache(node, all_node_status, all_edge_status):
+                    continue
                 
                 # Update status to running and assign executor ID
                 node_name = node["node"]
                 node["status"] = "running"
                 node["executor_id"] = str(uuid.uuid4())  # Assign a new executor ID for this node
                 self.console.print(f"[blue]Assigned executor ID {node['executor_id']} to node: {node_name}[/blue]")
-                # Deploy executor asynchronously with snapshot of current edge and node status\
-                # Start executor in a separate thread
-                executor_process = multiprocessing.Process(
-                    target=_run_executor,
-                    args=(
-                        node,
-                        node["executor_id"],
-                        self.session_id,
-                        self._build_executor_context(node, all_node_status),
-                        3,  # Max retry number for executor
-                    )
+                # Deploy executor asynchronously with snapshot of current edge and node status
+                executor_process = self._dispatch_executor(
+                    node,
+                    node["executor_id"],
+                    self._build_executor_context(node, all_node_status),
+                    3,  # Max retry number for executor
                 )
-                executor_process.daemon = True
-                self.console.print(f"[blue]Starting executor process for node: {node_name} with executor ID: {node['executor_id']}[/blue]")
-                executor_process.start()
 
                 self.running_nodes[node["executor_id"]] = {
                     "start_time": datetime.now(),
@@ -406,27 +545,381 @@ class ScheduleTool(BaseTool):
                 self.running_nodes[executor_id]["process"].join(timeout=1)
 
 
+    def _get_node_cache(self):
+        if not self.use_node_cache:
+            return None
+        if self._node_cache is None:
+            self._node_cache = NodeResultCache()
+        return self._node_cache
+
+    def _get_incident_parameter_names(self) -> List[str]:
+        """Names of the incident parameters used by the TSG steps and plugins"""
+        if self._incident_parameter_names is None:
+            from plugins.base_plugin import BasePlugin
+
+            tsg_content = self.memory.get_data_by_key("tsg_content") or ""
+            names = set(tsg_parameter_names(tsg_content))
+            plugin_marker = re.search(r'<!-- TSG_PLUGINS:([^\s]+) -->', tsg_content)
+            if plugin_marker:
+                for plugin in BasePlugin.get_plugins_for_tsg(plugin_marker.group(1)):
+                    names.update(plugin.parameter_names())
+            self._incident_parameter_names = sorted(names)
+        return self._incident_parameter_names
+
+    def _get_plugin_calls(self, conversation: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Collect the parameters of the plugin calls of an executor from its conversation"""
+        return [
+            item["parameters"] for item in _conversation_actions(conversation)
+            if (item.get("action") or "").startswith("plugin_") and isinstance(item.get("parameters"), dict)
+        ]
+
+    def _node_cache_key(self, node: Dict[str, Any], node_status: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the cache key of a node from the TSG version, the node name and its parameters.
+
+        Nodes right after the start node read the incident itself and are keyed by the incident
+        information. All other nodes are keyed by the incident parameters their upstream nodes
+        extracted (the values passed to plugins or stated in their results) and the edge
+        decisions of the upstream nodes, so that duplicate incidents of one outage, which differ
+        in IDs and timestamps only, share entries. If no parameters were extracted, the node is
+        keyed by the incident information and the results of its predecessors.
+        """
+        tsg_content = self.memory.get_data_by_key("tsg_content") or ""
+        nodes_by_output_edge = {}
+        for status_node in node_status:
+            for edge_info in status_node.get("output_edges", []):
+                nodes_by_output_edge[edge_info.get("edge")] = status_node
+
+        # Finished upstream nodes, direct predecessors first
+        upstream_nodes = []
+        pending_edges = [edge_info.get("edge") for edge_info in node.get("input_edges", [])]
+        seen = set()
+        while pending_edges:
+            status_node = nodes_by_output_edge.get(pending_edges.pop(0))
+            if status_node is None or status_node["node"] in seen or status_node["node"].lower() == "start":
+                continue
+            seen.add(status_node["node"])
+            if status_node["status"] == "finished" and status_node.get("result"):
+                upstream_nodes.append(status_node)
+            pending_edges.extend(edge_info.get("edge") for edge_info in status_node.get("input_edges", []))
+
+        incident_info = self.memory.get_data_by_key("incident_info") or ""
+        incident_parameters = {}
+        if upstream_nodes:
+            results, plugin_calls = [], []
+            for status_node in upstream_nodes:
+                results.append(str(json.loads(status_node["result"]).get("result", "")))
+                if status_node.get("executor_id"):
+                    conversation = self.memory.get_agent_context(status_node["executor_id"], message_only=True) or []
+                    plugin_calls.extend(self._get_plugin_calls(conversation))
+            incident_parameters = extract_incident_parameters(self._get_incident_parameter_names(), results, plugin_calls)
+
+        if incident_parameters:
+            parameters = {
+                "incident_parameters": incident_parameters,
+                "upstream_decisions": {
+                    status_node["node"]: json.loads(status_node["result"]).get("set_edge_status")
+                    for status_node in upstream_nodes
+                }
+            }
+        else:
+            direct_inputs = set(edge_info.get("edge") for edge_info in node.get("input_edges", []))
+            parameters = {
+                "incident_info": incident_info,
+                "upstream": {
+                    status_node["node"]: {
+                        "result": json.loads(status_node["result"]).get("result"),
+                        "set_edge_status": json.loads(status_node["result"]).get("set_edge_status")
+                    }
+                    for status_node in upstream_nodes
+                    if direct_inputs & set(edge_info.get("edge") for edge_info in status_node.get("output_edges", []))
+                }
+            }
+        tsg_version = NodeResultCache.tsg_version(tsg_content)
+        return NodeResultCache.build_key(tsg_version, node["node"], parameters), parameters
+
+    def _get_node_data_sources(self, conversation: List[Dict[str, Any]]) -> List[str]:
+        """Collect the databases queried by an executor from its conversation"""
+        from stepfly.utils.sql_engine import DEFAULT_DATABASE_PATH
+
+        data_sources = []
+        for item in _conversation_actions(conversation):
+            action = item.get("action", "") or ""
+            parameters = item.get("parameters", {}) or {}
+            if action == "sql_query_tool":
+                data_sources.append(parameters.get("database_path") or DEFAULT_DATABASE_PATH)
+            elif action.startswith("plugin_"):
+                data_sources.append(DEFAULT_DATABASE_PATH)
+        return data_sources
+
+    def _export_node_documents(self, result: Dict[str, Any],
+                               conversation: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Export the memory documents a node result and conversation refer to
+
+        Returns:
+            Exported documents with their original "id", or None if the node refers to keyed
+            session state (e.g. incident_info), which a cache entry cannot carry
+        """
+        documents = []
+        for document_id in referenced_ids([result, conversation]):
+            # IDs of agents and executors are not memory documents and stay as they are
+            exported = self.memory.export_document(document_id)
+            if exported is None:
+                continue
+            if (exported["document"].get("metadata") or {}).get("key"):
+                return None
+            documents.append(dict(exported, id=document_id))
+        return documents
+
+    def _store_node_cache(self, node: Dict[str, Any], node_status: List[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        node_cache = self._get_node_cache()
+        if not node_cache or node["node"].lower() == "end" or node.get("cache_hit"):
+            return
+
+        try:
+            key, parameters = self._node_cache_key(node, node_status)
+            conversation = self.memory.get_agent_context(node["executor_id"], message_only=True)
+            documents = self._export_node_documents(result, conversation)
+            if documents is None:
+                self.console.print(f"[yellow]Not caching result of node {node['node']}: it refers to session state[/yellow]")
+                return
+            tsg_content = self.memory.get_data_by_key("tsg_content") or ""
+            node_cache.store(
+                key=key,
+                tsg_name=os.path.basename(self.tsg_path or "").split('.')[0],
+                tsg_version=NodeResultCache.tsg_version(tsg_content),
+                node_name=node["node"],
+                parameters=parameters,
+                result=result,
+                conversation=conversation,
+                data_sources=self._get_node_data_sources(conversation),
+                documents=documents
+            )
+        except Exception as e:
+            self.console.print(f"[yellow]Could not cache result of node {node['node']}: {str(e)}[/yellow]")
+
+    def _apply_node_cache(self, node: Dict[str, Any], node_status: List[Dict[str, Any]],
+                          edge_status: List[Dict[str, Any]]) -> bool:
+        """
+        Finish a node with a cached result if available
+
+        Returns:
+            True if the node was finished from the cache
+        """
+        node_cache = self._get_node_cache()
+        if not node_cache or node["node"].lower() == "end" or node.get("skip_cache"):
+            return False
+
+        try:
+            key, _ = self._node_cache_key(node, node_status)
+            entry = node_cache.lookup(key)
+        except Exception as e:
+            self.console.print(f"[yellow]Node cache lookup failed for {node['node']}: {str(e)}[/yellow]")
+            return False
+
+        if not entry:
+            return False
+
+        # Replay the cached conversation under a new executor ID so that context building and the UI work as usual
+        executor_id = str(uuid.uuid4())
+        self.memory.register_agent(agent_name=f"executor_{node['node']}", agent_id=executor_id)
+
+        # Data and snippets of the entry are copied into this session and referred to by their new IDs
+        try:
+            id_mapping = {
+                document["id"]: self.memory.import_document(document, agent_id=executor_id)
+                for document in entry["documents"]
+            }
+        except Exception as e:
+            self.console.print(f"[yellow]Could not import cached data of node {node['node']}: {str(e)}[/yellow]")
+            return False
+        entry["result"] = replace_ids(entry["result"], id_mapping)
+        entry["conversation"] = replace_ids(entry.get("conversation", []), id_mapping)
+
+        for i, message in enumerate(entry.get("conversation", [])):
+            self.memory.add_agent_context(
+                agent_id=executor_id,
+                key=f"message_{i}",
+                value=message,
+                description="message replayed from node result cache"
+            )
+        self.memory.add_data(
+            data={
+                "node_name": node["node"],
+                "executor_id": executor_id,
+                "result": entry["result"]
+            },
+            data_type="executor_result",
+            agent_id=executor_id,
+            description=f"Cached execution result for node {node['node']}",
+            metadata={"key": f"{executor_id}_step_result"}
+        )
+
+        node["status"] = "finished"
+        node["executor_id"] = executor_id
+        node["result"] = json.dumps(entry["result"])
+        node["cache_hit"] = True
+        set_edge_status = entry["result"].get("set_edge_status", {}) or {}
+        _update_output_edges(edge_status, set_edge_status)
+        self._store_context_block(node)
+
+        self.console.print(f"[green]Node {node['node']} finished from cache (created {entry.get('created_at')})[/green]")
+        return True
+
+    def _reconcile_running_nodes(self) -> None:
+        """
+        Reconcile nodes marked running in memory that this tool instance is not tracking,
+        e.g. after the scheduler process was restarted mid-DAG. Nodes whose executor stored a
+        result are processed normally, queued executors still alive are re-attached, and
+        nodes whose executor died are reset to pending so they are run again.
+        """
+        node_status = self.memory.get_data_by_key("Node_Status")
+        if not node_status:
+            return
+
+        changed = False
+        for node in node_status:
+            executor_id = node.get("executor_id")
+            if node["status"] != "running" or executor_id in self.running_nodes:
+                continue
+
+            handle = None
+            if executor_id and self.memory.get_data_by_key(f"{executor_id}_step_result"):
+                handle = _DetachedExecutorHandle()
+            elif executor_id and self.dispatch_mode == "queue":
+                if self._work_queue is None:
+                    self._work_queue = WorkQueue()
+                queued = QueuedExecutorHandle(self._work_queue, executor_id)
+                if queued.is_alive():
+                    handle = queued
+
+            if handle is not None:
+                self.console.print(f"[cyan]Re-attached executor {executor_id} for node: {node['node']}[/cyan]")
+                self.running_nodes[executor_id] = {
+                    "start_time": datetime.now(),
+                    "node_name": node["node"],
+                    "process": handle
+                }
+            else:
+                self.console.print(f"[yellow]Executor for node {node['node']} is gone, resetting node to pending[/yellow]")
+                node["status"] = "pending"
+                node["executor_id"] = None
+                changed = True
+
+        if changed:
+            self.memory.update_data_by_key(
+                key="Node_Status",
+                data=node_status,
+                data_type="node_status",
+                description="Reconciled node status after scheduler restart"
+            )
+
+    def reset_from_node(self, node_name: str) -> List[str]:
+        """
+        Reset a node and all its downstream nodes so they are executed again by the next
+        schedule_tool call, while upstream results are reused
+
+        Args:
+            node_name: Name of the node to re-run from
+
+        Returns:
+            Names of the reset nodes
+        """
+        if self.running:
+            raise RuntimeError("Cannot reset nodes while the schedule tool is running")
+
+        node_status = self.memory.get_data_by_key("Node_Status")
+        edge_status = self.memory.get_data_by_key("Edge_Status")
+        if not node_status or not edge_status:
+            raise ValueError("Node_Status and Edge_Status not found in memory. Please load the TSG first.")
+
+        reset_nodes = _reset_nodes_from(node_name, node_status, edge_status)
+
+        self.memory.update_data_by_key(
+            key="Node_Status",
+            data=node_status,
+            data_type="node_status",
+            description=f"Reset node status from {node_name} for re-run"
+        )
+        self.memory.update_data_by_key(
+            key="Edge_Status",
+            data=edge_status,
+            data_type="edge_status",
+            description=f"Reset edge status from {node_name} for re-run"
+        )
+
+        self.console.print(f"[cyan]Reset nodes for re-run:[/cyan] {', '.join(reset_nodes)}")
+        return reset_nodes
+
+    def _dispatch_executor(self, node: Dict[str, Any], executor_id: str, node_context: str, max_retry_number: int):
+        """
+        Start an executor for the node according to the configured dispatch mode
+
+        Returns:
+            A handle exposing is_alive(), terminate(), join() and exitcode
+        """
+        if self.dispatch_mode == "queue":
+            if self._work_queue is None:
+                self._work_queue = WorkQueue()
+            task_id = self._work_queue.enqueue(
+                payload={
+                    "node": node,
+                    "executor_id": executor_id,
+                    "session_id": self.session_id,
+                    "node_context": node_context,
+                    "max_retry_number": max_retry_number
+                },
+                session_id=self.session_id,
+                task_id=executor_id
+            )
+            self.console.print(f"[blue]Enqueued executor task for node: {node['node']} with executor ID: {executor_id}[/blue]")
+            return QueuedExecutorHandle(self._work_queue, task_id)
+
+        if self.dispatch_mode == "async":
+            self.console.print(f"[blue]Starting executor coroutine for node: {node['node']} with executor ID: {executor_id}[/blue]")
+            return AsyncExecutorRuntime.get().submit(node, executor_id, self.session_id, node_context, max_retry_number)
+
+        # Start executor in a separate process
+        executor_process = multiprocessing.Process(
+            target=_run_executor,
+            args=(
+                node,
+                executor_id,
+                self.session_id,
+                node_context,
+                max_retry_number,
+            )
+        )
+        executor_process.daemon = True
+        self.console.print(f"[blue]Starting executor process for node: {node['node']} with executor ID: {executor_id}[/blue]")
+        executor_process.start()
+        return executor_process
+
     def _build_executor_context(self, node: Dict[str, Any], node_status: List[Dict[str, Any]]) -> str:
         # todo: replace with the actual node name
         node_real_name = node.get("node")
         context = f"# Context for {node_real_name} execution\n\n"
+        budgeter = ContextBudgeter()
 
         # Add incident information
         incident_info = self.memory.get_data_by_key("incident_info")
         if incident_info:
             context += "## Incident Information\n"
-            context += f"{incident_info}\n\n"
+            context += f"{budgeter.fit_text('incident_info', str(incident_info))}\n\n"
             context += "<!-- INCIDENT INFO END -->\n\n"
 
-        # Add TSG content
+        # Add TSG content, restricted to the preamble, this step and its plugins when the TSG has a section for it
         tsg_content = self.memory.get_data_by_key("tsg_content")
+        if config.get("executor.tsg_step_sections", True):
+            tsg_content = build_step_tsg(self.memory.get_data_by_key("tsg_sections"), node_real_name) or tsg_content
         if tsg_content:
             context += "## TSG Document\n"
-            context += f"{tsg_content}\n\n"
+            context += f"{budgeter.fit_text('tsg_document', str(tsg_content))}\n\n"
             context += "<!-- TSG DOCUMENT END -->\n\n"
 
         # Add predecessor/completed node information based on configuration
-        node_context_info = self._get_node_context_info(node, node_status)
+        node_context_info = self._get_node_context_info(node, node_status, budgeter=budgeter)
         if node_context_info:
             context += "## Previous Steps that have been completed\n"
             context += node_context_info
@@ -494,7 +987,10 @@ class ScheduleTool(BaseTool):
 
         return context
 
-    def _get_node_context_info(self, node: Dict[str, Any], node_status: List[Dict[str, Any]], include_conversation: bool = True) -> str:
+    def _get_node_context_info(self, node: Dict[str, Any], node_status: List[Dict[str, Any]], include_conversation: bool = True,
+                               budgeter: ContextBudgeter = None) -> str:
+        budgeter = budgeter or ContextBudgeter()
+
         # Determine which nodes to include in context
         target_nodes = set()
 
@@ -511,49 +1007,122 @@ class ScheduleTool(BaseTool):
             last_node_name = status_node["node"]
         print("[DEBUG] Adding ordered step context:", [node for node in target_nodes], "to current step:", current_step_number)
         
-        # Collect information from target nodes, ordered by their position in node_status
+        # Collect context items from target nodes, ordered by their position in node_status.
+        # Structured results and edge decisions take precedence over conversation excerpts.
+        items = []
+        conversation_counts = {}
+        target_node_infos = [node_info for node_info in node_status if node_info["node"] in target_nodes]
+        for recency, node_info in enumerate(target_node_infos):
+            block = self._get_context_block(node_info)
+
+            items.append({"id": f"{node_info['node']} result", "node": node_info["node"], "kind": "summary",
+                          "text": block["summary"], "priority": 0, "recency": recency})
+
+            if include_conversation and block["messages"] is not None:
+                conversation_counts[node_info["node"]] = len(block["messages"])
+                for i, message in enumerate(block["messages"], start=2):
+                    items.append({"id": f"{node_info['node']} message {i}", "node": node_info["node"],
+                                  "kind": "conversation", "text": f"- {budgeter.excerpt(message)}",
+                                  "priority": 1, "recency": recency})
+
+        selected = budgeter.select("previous_steps", items)
+
         results = []
-        for node_info in node_status:
-            # Only process nodes that are in target_nodes and have finished status
-            if node_info["node"] not in target_nodes:
+        for node_info in target_node_infos:
+            node_items = [item for item in selected if item["node"] == node_info["node"]]
+            context_parts = [item["text"] for item in node_items if item["kind"] == "summary"]
+            if not context_parts:
                 continue
 
-            # Include full node context
-            context_parts = [f"### {node_info['node']} Context", f"**Status**: {node_info['status']}",
-                             f"**Description**: {node_info.get('description', 'N/A')}"]
-
-            if node_info.get("result"):
-                node_result = json.loads(node_info["result"])
-                context_parts.append(f"**Result**: {node_result['result']}")
-                edge_updates = "; ".join([f"{edge}->{status}" for edge, status in node_result.get("set_edge_status", {}).items()])
-                context_parts.append(f"**Edge Status Updates**: {edge_updates if edge_updates else 'None'}")
-
-            # Add conversation history if executor_id is available
-            if include_conversation:
-                executor_id = node_info.get("executor_id")
-                if executor_id:
-                    conversation_history = self.memory.get_agent_context(executor_id, message_only=True)
-                    if conversation_history:
-                        context_parts.append("**Conversation History**:")
-                        # Process each message with appropriate handling, skip first system and user messages to avoid duplication
-                        conversation_history_length = len(conversation_history)
-                        for i, msg in enumerate(conversation_history):
-                            # Skip the first system message and first user message to avoid duplication
-                            if i < 2:
-                                continue
-                            role = msg.get("role", "")
-                            content = msg.get("content", "")
-
-                            if role == "assistant":
-                                context_parts.append(f"- " + format_assistant_message(content))
-                            elif role == "user":
-                                context_parts.append(f"- {content}")
-
+            if node_info["node"] in conversation_counts:
+                context_parts.append("**Conversation History**:")
+                context_parts.extend(item["text"] for item in node_items if item["kind"] == "conversation")
+                omitted = conversation_counts[node_info["node"]] - sum(1 for item in node_items if item["kind"] == "conversation")
+                if omitted:
+                    context_parts.append(f"- ({omitted} messages omitted to fit the context budget)")
 
             results.append("\n".join(context_parts) + "\n")
+
+        dropped_summary = budgeter.dropped_summary("previous_steps")
+        if dropped_summary:
+            self.console.print(f"[yellow]Context budget for {current_step_number}: {dropped_summary}[/yellow]")
+            omitted_nodes = sorted({item["node"] for item in items if item["kind"] == "summary"} -
+                                   {item["node"] for item in selected if item["kind"] == "summary"})
+            if omitted_nodes:
+                results.append(f"Context of {', '.join(omitted_nodes)} was omitted to fit the context budget.\n")
         
         return "\n".join(results) if results else ""
 
+    def _render_context_block(self, node_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Render the context block of a finished node
+
+        Returns:
+            Dictionary with the node's "summary" (status, description, result and edge decisions)
+            and its conversation "messages" (None if the node has no executor conversation)
+        """
+        summary_parts = [f"### {node_info['node']} Context", f"**Status**: {node_info['status']}",
+                         f"**Description**: {node_info.get('description', 'N/A')}"]
+
+        if node_info.get("result"):
+            node_result = json.loads(node_info["result"])
+            summary_parts.append(f"**Result**: {node_result['result']}")
+            edge_updates = "; ".join([f"{edge}->{status}" for edge, status in node_result.get("set_edge_status", {}).items()])
+            summary_parts.append(f"**Edge Status Updates**: {edge_updates if edge_updates else 'None'}")
+
+        messages = None
+        executor_id = node_info.get("executor_id")
+        if executor_id:
+            conversation_history = self.memory.get_agent_context(executor_id, message_only=True)
+            if conversation_history:
+                messages = []
+                # Skip the first system message and first user message to avoid duplication
+                for msg in conversation_history[2:]:
+                    role = msg.get("role", "")
+                    content = msg.get("content", "")
+
+                    if role == "assistant":
+                        messages.append(format_assistant_message(content))
+                    elif role == "user":
+                        messages.append(content)
+
+        return {"node": node_info["node"], "summary": "\n".join(summary_parts), "messages": messages}
+
+    def _store_context_block(self, node_info: Dict[str, Any]) -> None:
+        """Render the context block of a node once it finished and keep it for later executors"""
+        executor_id = node_info.get("executor_id")
+        if not executor_id:
+            return
+
+        try:
+            block = self._render_context_block(node_info)
+            self._context_blocks[executor_id] = block
+            # Persist it so that a resumed scheduler process does not rebuild it
+            self.memory.update_data_by_key(
+                key=f"{executor_id}_context_block",
+                data=block,
+                data_type="context_block",
+                description=f"Rendered context of node {node_info['node']}"
+            )
+        except Exception as e:
+            self.console.print(f"[yellow]Could not store context block of node {node_info['node']}: {str(e)}[/yellow]")
+
+    def _get_context_block(self, node_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the rendered context block of a finished node, rendering it on a miss"""
+        executor_id = node_info.get("executor_id")
+        if not executor_id:
+            return self._render_context_block(node_info)
+
+        block = self._context_blocks.get(executor_id)
+        if block is None:
+            block = self.memory.get_data_by_key(f"{executor_id}_context_block")
+            if block is None:
+                self._store_context_block(node_info)
+                block = self._context_blocks.get(executor_id) or self._render_context_block(node_info)
+            else:
+                self._context_blocks[executor_id] = block
+        return block
+
     def _display_status_table(self) -> None:
         """Display a table with the current status of all nodes and edges"""
         node_status = self.memory.get_data_by_key("Node_Status")
@@ -561,6 +1130,8 @@ class ScheduleTool(BaseTool):
         
         if not node_status or not edge_status:
             return
+
+        from rich.table import Table
         
         # Node status table
         node_table = Table(title="Node Execution Status")
@@ -1,38 +1,78 @@
-import os
-import sqlite3
-from typing import Optional
-
-import pandas as pd
+import re
+from typing import Any, Dict, Optional
 
 from stepfly.tools.base_tool import BaseTool
 from stepfly.utils.memory import Memory
+from stepfly.utils.sql_engine import DEFAULT_DATABASE_PATH, get_sql_engine
+
+
+_SQL_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_SQL_WRITE_KEYWORDS = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER|ATTACH|DETACH|VACUUM|REINDEX)\b", re.IGNORECASE)
+# Pragmas that take an argument and only read; other pragmas with an argument may change settings
+_READ_ONLY_PRAGMAS = {
+    "table_info", "table_xinfo", "table_list", "index_list", "index_info", "index_xinfo",
+    "foreign_key_list", "database_list"
+}
+
+
+def is_read_only_query(sql_query: str) -> bool:
+    """
+    Whether a query is a single statement that only reads: SELECT, WITH or EXPLAIN without
+    write keywords, or a PRAGMA that reads. Conservative, queries that merely mention a
+    write keyword count as writes.
+    """
+    statement = _SQL_COMMENTS.sub(" ", sql_query).strip().rstrip(";").strip()
+    if not statement or ";" in statement:
+        return False
+    keyword = re.match(r"\w+", statement.lstrip("( \t\r\n"))
+    keyword = keyword.group(0).upper() if keyword else ""
+    if keyword in ("SELECT", "WITH", "EXPLAIN"):
+        return not _SQL_WRITE_KEYWORDS.search(statement)
+    if keyword == "PRAGMA":
+        pragma = re.match(r"PRAGMA\s+(?:\w+\.)?(\w+)\s*(\(|=)?", statement, re.IGNORECASE)
+        if not pragma or pragma.group(2) == "=":
+            return False
+        return pragma.group(2) is None or pragma.group(1).lower() in _READ_ONLY_PRAGMAS
+    return False
 
 
 class SQLQueryTool(BaseTool):
     """Tool for executing SQL queries against a database"""
+
+    name = "sql_query_tool"
+    parallel_safe = True
+    description = (
+        "Execute SQL queries against a database.\n\n"
+        "This tool allows you to:\n"
+        "- Execute SQL queries directly against a SQLite database\n"
+        "- Run stored SQL query snippets by their ID\n\n"
+        "Required Parameters (choose one):\n"
+        "- query_string: Full SQL query to execute directly\n"
+        "- snippet_id: ID of a stored SQL query snippet in memory\n\n"
+        "Optional Parameters:\n"
+        "- database_path: Path to SQLite database file (defaults to 'demo.db')\n"
+        "- result_description: Description for the stored result\n\n"
+        "Example queries:\n"
+        "- SELECT * FROM users WHERE created_date > '2024-01-01'\n"
+        "- SELECT COUNT(*) as total_orders FROM orders\n"
+        "- PRAGMA table_info(users)"
+    )
     
     def __init__(self, session_id: str, memory: Memory):
         super().__init__(session_id, memory)
-        self.name = "sql_query_tool"
-        self.description = (
-            "Execute SQL queries against a database.\n\n"
-            "This tool allows you to:\n"
-            "- Execute SQL queries directly against a SQLite database\n"
-            "- Run stored SQL query snippets by their ID\n\n"
-            "Required Parameters (choose one):\n"
-            "- query_string: Full SQL query to execute directly\n"
-            "- snippet_id: ID of a stored SQL query snippet in memory\n\n"
-            "Optional Parameters:\n"
-            "- database_path: Path to SQLite database file (defaults to 'demo.db')\n"
-            "- result_description: Description for the stored result\n\n"
-            "Example queries:\n"
-            "- SELECT * FROM users WHERE created_date > '2024-01-01'\n"
-            "- SELECT COUNT(*) as total_orders FROM orders\n"
-            "- PRAGMA table_info(users)"
-        )
         
         # Default database path
-        self.default_database = "./demo_data/distributed_system.db"
+        self.default_database = DEFAULT_DATABASE_PATH
+
+    @classmethod
+    def runs_in_parallel(cls, parameters: Dict[str, Any]) -> bool:
+        # Statements that write are committed by the engine; run them in the order of the turn,
+        # and so do stored snippets, whose statement is only known once read from memory
+        query_string = parameters.get("query_string")
+        return isinstance(query_string, str) and not parameters.get("snippet_id") and is_read_only_query(query_string)
+
+    def prefetch(self) -> None:
+        get_sql_engine().warm(self.default_database)
         
     def execute(self, 
                 query_string: Optional[str] = None,
@@ -63,69 +103,13 @@ class SQLQueryTool(BaseTool):
             else:
                 return "Error: Please provide either 'query_string' or 'snippet_id'."
             
-            # Set database path
-            db_path = database_path or self.default_database
-            
-            # Create demo database if it doesn't exist
-            if not os.path.exists(db_path):
-                raise FileNotFoundError(f"Database file not found at path: {db_path}")
-            
-            # Execute query
-            result_df = self._execute_sql_query(sql_query, db_path)
-            
-            if result_df is None:
-                return "Query executed successfully (no results returned)."
-            
-            if len(result_df) == 0:
-                return "Query executed successfully but returned no rows."
-            
-            # Always store results in memory for analysis
-            result_id = self.memory.add_data(
-                data=result_df,
-                data_type="sql_result",
-                metadata={
-                    "query": sql_query,
-                    "database": db_path,
-                    "row_count": len(result_df),
-                    "column_count": len(result_df.columns),
-                    "columns": list(result_df.columns)
-                },
-                description=result_description or "SQL query result"
+            # Execute query on the shared engine and store the result
+            return get_sql_engine().run_and_store(
+                self.memory,
+                sql_query,
+                database_path=database_path or self.default_database,
+                result_description=result_description
             )
             
-            # Get data summary for context
-            summary = self.memory.get_data_summary(result_id)
-            
-            # Return summary with memory reference
-            return (f"Query has been successfully executed. The query results are stored in memory with ID: {result_id}\n"
-                   "The description of the result is as follows:\n"
-                   f"Summary:\n{summary}\n\n")
-            
         except Exception as e:
             return f"Error executing SQL query: {str(e)}"
-    
-    def _execute_sql_query(self, query: str, db_path: str) -> Optional[pd.DataFrame]:
-        """Execute SQL query against SQLite database"""
-        conn = None
-        try:
-            conn = sqlite3.connect(db_path)
-            
-            # For SELECT queries, return DataFrame  
-            if (query.strip().upper().startswith('SELECT') or 
-                query.strip().upper().startswith('PRAGMA') or 
-                query.strip().upper().startswith('WITH')):
-                df = pd.read_sql_query(query, conn)
-                return df
-            else:
-                # For other queries (INSERT, UPDATE, DELETE, etc.), execute and return None
-                cursor = conn.cursor()
-                cursor.execute(query)
-                conn.commit()
-                return None
-                
-        except Exception as e:
-            raise e
-        finally:
-            if conn:
-                conn.close()
-    
\ No newline at end of file
@@ -8,18 +8,19 @@ from stepfly.tools.base_tool import BaseTool
 
 class UserInteraction(BaseTool):
     """Tool for interacting with users"""
+
+    name = "user_interaction"
+    description = (
+        "Interact with the user to gather information, provide updates, or get user choices.\n\n"
+        "Required Parameters:\n"
+        "- message: Text to display to the user\n\n"
+        "Optional Parameters:\n"
+        "- type: Type of interaction (\"info\", \"question\", or \"options\", default: \"info\")\n"
+        "- options: List of options for type=\"options\""
+    )
     
     def __init__(self, session_id: str, memory: Memory):
         super().__init__(session_id, memory)
-        self.name="user_interaction"
-        self.description=(
-            "Interact with the user to gather information, provide updates, or get user choices.\n\n"
-            "Required Parameters:\n"
-            "- message: Text to display to the user\n\n"
-            "Optional Parameters:\n"
-            "- type: Type of interaction (\"info\", \"question\", or \"options\", default: \"info\")\n"
-            "- options: List of options for type=\"options\""
-        )
         self.console = Console()
     
     def execute(self, message: str, type: str = "info", options: Optional[list] = None) -> str:
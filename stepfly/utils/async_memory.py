@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any
+
+from stepfly.utils.memory import Memory
+
+
+class AsyncMemory:
+    """
+    Asyncio facade over Memory for the asyncio executor runtime.
+
+    Every public Memory method is available as a coroutine that runs the blocking MongoDB
+    call in the event loop's thread pool; attributes are passed through unchanged.
+    The wrapped Memory (and its MongoDB connection pool) can be shared by many coroutines.
+    """
+
+    def __init__(self, memory: Memory):
+        self.memory = memory
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.memory, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attr, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = getattr(attr, "__doc__", None)
+        return call
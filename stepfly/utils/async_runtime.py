@@ -0,0 +1,152 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from stepfly.tools.code_sandbox import mark_long_lived
+from stepfly.utils.async_memory import AsyncMemory
+from stepfly.utils.config_loader import config
+from stepfly.utils.memory import Memory
+
+
+class AsyncExecutorHandle:
+    """Handle of an executor coroutine with the interface of multiprocessing.Process used by ScheduleTool"""
+
+    def __init__(self):
+        self._future = None  # Set by AsyncExecutorRuntime.submit
+        self._started_at = None
+
+    def _mark_started(self) -> None:
+        self._started_at = datetime.now()
+
+    @property
+    def started_at(self) -> Optional[datetime]:
+        """Time the executor got a runtime slot, None while waiting for one"""
+        return self._started_at
+
+    def is_alive(self) -> bool:
+        return not self._future.done()
+
+    @property
+    def exitcode(self) -> Optional[int]:
+        if not self._future.done():
+            return None
+        if self._future.cancelled() or self._future.exception() is not None:
+            return 1
+        return 0
+
+    def terminate(self) -> None:
+        # Cancellation takes effect at the next await; work already running in a thread finishes first
+        self._future.cancel()
+
+    def join(self, timeout: float = None) -> None:
+        concurrent.futures.wait([self._future], timeout=timeout)
+
+
+class AsyncExecutorRuntime:
+    """
+    Runs executors as coroutines on one event loop in a background thread.
+
+    LLM calls are awaited on the loop; tool execution (code execution, SQLite queries) and
+    MongoDB/trace I/O run in the loop's thread pool. Many nodes, also of different sessions,
+    share one process, one LLM client pool and one MongoDB connection pool per session.
+    One runtime exists per process, created on first use.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_concurrency: Optional[int] = None, thread_pool_size: Optional[int] = None):
+        runtime_config = config.get_section("scheduler.async_runtime")
+        self.max_concurrency = max_concurrency or runtime_config.get("max_concurrency", 32)
+        self.thread_pool_size = thread_pool_size or runtime_config.get("thread_pool_size", 16)
+
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(
+            concurrent.futures.ThreadPoolExecutor(max_workers=self.thread_pool_size, thread_name_prefix="stepfly-executor")
+        )
+        self._semaphore = None
+        self._memories = {}
+        self._memories_lock = threading.Lock()
+        # Executors come and go while this process lives, so idle sandbox workers get used
+        mark_long_lived()
+
+        self._thread = threading.Thread(target=self._run_loop, name="stepfly-async-runtime", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "AsyncExecutorRuntime":
+        """Get the runtime of this process"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _get_memory(self, session_id: str) -> Memory:
+        with self._memories_lock:
+            if session_id not in self._memories:
+                self._memories[session_id] = Memory(session_id=session_id)
+            return self._memories[session_id]
+
+    def submit(self, node: Dict[str, Any], executor_agent_id: str, session_id: str,
+               node_context: str, max_retry_number: int = 3) -> AsyncExecutorHandle:
+        """
+        Schedule an executor for a node
+
+        Returns:
+            Handle of the executor coroutine
+        """
+        handle = AsyncExecutorHandle()
+        handle._future = asyncio.run_coroutine_threadsafe(
+            self._run_executor(node, executor_agent_id, session_id, node_context, max_retry_number, handle),
+            self.loop
+        )
+        return handle
+
+    async def _run_executor(self, node: Dict[str, Any], executor_agent_id: str, session_id: str,
+                            node_context: str, max_retry_number: int, handle: AsyncExecutorHandle) -> None:
+        """Coroutine counterpart of schedule_tool._run_executor"""
+        from stepfly.agents.executor import Executor
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            handle._mark_started()
+
+            node_name = node["node"]
+            print(f"[blue]Starting executor coroutine {executor_agent_id} for node: {node_name}[/blue]")
+
+            memory = self._get_memory(session_id)
+            try:
+                # Tool loading and plugin preloading do blocking I/O
+                executor = await asyncio.to_thread(
+                    Executor,
+                    step_name=node_name,
+                    session_id=session_id,
+                    memory=memory,
+                    agent_id=executor_agent_id
+                )
+                step_result = await executor.aexecute_step(node_context, max_retry_number=max_retry_number)
+            except Exception:
+                logging.exception(f"Executor {executor_agent_id} for node {node_name} failed")
+                raise
+
+            print(f"[blue]Executor {executor_agent_id} finished node: {node_name} with result: {step_result}[/blue]")
+            await AsyncMemory(memory).add_data(
+                data={
+                    "node_name": node_name,
+                    "executor_id": executor_agent_id,
+                    "result": step_result
+                },
+                data_type="executor_result",
+                agent_id=executor_agent_id,
+                description=f"Store execution result for node {node_name}",
+                metadata={"key": f"{executor_agent_id}_step_result"}
+            )
@@ -0,0 +1,304 @@
+import argparse
+import ast
+import builtins
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from stepfly.utils.config_loader import config
+
+# Part of every key; bump it when changes to the code generation invalidate cached code
+CODE_CACHE_VERSION = 2
+
+# An input of a code interpreter call: variable name and memory data ID (None for direct data)
+Binding = Tuple[str, Optional[str]]
+
+
+def data_schema(value: Any) -> Dict[str, Any]:
+    """
+    Schema of an input variable: column names and dtypes of DataFrames, the type otherwise
+
+    Returns:
+        JSON-serializable schema
+    """
+    dtypes = getattr(value, "dtypes", None)
+    if dtypes is not None and hasattr(value, "columns"):
+        return {"type": "dataframe", "columns": {str(column): str(dtype) for column, dtype in dtypes.items()}}
+    schema = {"type": type(value).__name__}
+    if isinstance(value, dict):
+        schema["keys"] = sorted(str(key) for key in value)
+    elif isinstance(value, (list, tuple)) and value:
+        schema["items"] = type(value[0]).__name__
+    return schema
+
+
+def value_digest(value: Any) -> str:
+    """Digest of the value of a direct data variable, which the agent passes as parameters of the call"""
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _code_names(tree: ast.AST) -> Tuple[Set[str], Set[str]]:
+    """Names read and names bound anywhere in parsed code"""
+    loaded, bound = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            (loaded if isinstance(node.ctx, ast.Load) else bound).add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, ast.alias):
+            bound.add((node.asname or node.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+    return loaded, bound
+
+
+def _copied_literals(tree: ast.AST, previews: List[str]) -> List[str]:
+    """Constants of the code that also appear in the data previews shown to the code generator"""
+    copied = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Constant) or isinstance(node.value, bool):
+            continue
+        value = node.value
+        if isinstance(value, str):
+            # Short strings such as separators or single words match by chance
+            if len(value.strip()) >= 4 and any(value in preview for preview in previews):
+                copied.append(value)
+        elif isinstance(value, (int, float)):
+            # Small integers are indexes and counts rather than data
+            if isinstance(value, int) and abs(value) <= 10:
+                continue
+            pattern = rf"(?<![\w.]){re.escape(repr(value))}(?![\w.])"
+            if any(re.search(pattern, preview) for preview in previews):
+                copied.append(repr(value))
+    return copied
+
+
+def uncacheable_reason(code: str, input_names: Set[str], environment_names: Set[str],
+                       kernel_names: Set[str], previews: List[str]) -> Optional[str]:
+    """
+    Check whether code depends on more than the task and the schemas of its inputs
+
+    Cached code is replayed for other steps and incidents. Code that reads variables kept
+    from earlier code of the step, reads memory directly or copies values from the data
+    previews would run there without error and give wrong results, so it is not cached.
+
+    Args:
+        code: Code that executed successfully
+        input_names: Input variables of the call
+        environment_names: Modules and helpers provided to every execution
+        kernel_names: Variables kept from earlier code of the step, other than the inputs
+        previews: Data previews shown to the code generator for memory data
+
+    Returns:
+        Why the code cannot be cached, or None if it can
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return f"code does not parse: {e}"
+    loaded, bound = _code_names(tree)
+
+    kernel_reads = loaded & kernel_names
+    if kernel_reads:
+        return f"reads variables of earlier code: {', '.join(sorted(kernel_reads))}"
+    if "memory" in loaded:
+        return "reads session memory directly"
+    unknown = loaded - bound - input_names - environment_names - set(dir(builtins))
+    if unknown:
+        return f"reads names that are not inputs: {', '.join(sorted(unknown))}"
+    copied = _copied_literals(tree, previews)
+    if copied:
+        return f"contains values of the data preview: {', '.join(copied[:5])}"
+    return None
+
+
+def normalize_task(task: str, bindings: List[Binding]) -> str:
+    """Task text compared by the cache: lower case, collapsed whitespace, data IDs replaced by placeholders"""
+    for index, (var_name, data_id) in enumerate(bindings):
+        if data_id:
+            task = task.replace(var_name, f"__input_{index}__").replace(data_id, f"__input_{index}_id__")
+    return re.sub(r"\s+", " ", task).strip().rstrip(".").lower()
+
+
+def code_cache_key(task: str, inputs: List[Tuple[Binding, Dict[str, Any]]]) -> str:
+    """
+    Build the cache key of a code interpreter call
+
+    Memory data variables are derived from data IDs that differ between incidents, so they are
+    identified by position and schema. Direct data variables are named by the agent and keep their
+    name; their schema should include their value_digest(), as code may use the values directly.
+
+    Args:
+        task: Task of the call
+        inputs: Binding and schema of every input variable, in input order
+
+    Returns:
+        Hex digest identifying the call
+    """
+    bindings = [binding for binding, _ in inputs]
+    key_material = json.dumps(
+        {
+            "version": CODE_CACHE_VERSION,
+            "task": normalize_task(task, bindings),
+            "inputs": [
+                {"name": None if data_id else var_name, "schema": schema}
+                for (var_name, data_id), schema in inputs
+            ]
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+def generalize_code(code: str, bindings: List[Binding]) -> str:
+    """Replace the memory data variables and IDs of a call in its code by placeholders"""
+    for index, (var_name, data_id) in enumerate(bindings):
+        if data_id:
+            code = re.sub(rf"\b{re.escape(var_name)}\b", f"__input_{index}__", code)
+            code = code.replace(data_id, f"__input_{index}_id__")
+    return code
+
+
+def bind_code(code: str, bindings: List[Binding]) -> str:
+    """Replace the placeholders of cached code by the memory data variables and IDs of a call"""
+    for index, (var_name, data_id) in enumerate(bindings):
+        if data_id:
+            code = code.replace(f"__input_{index}_id__", data_id).replace(f"__input_{index}__", var_name)
+    return code
+
+
+class GeneratedCodeCache:
+    """
+    Cache of code interpreter code that executed successfully, shared across sessions.
+
+    Entries are keyed by the normalized task and the schemas of the input variables, so that
+    repeat incidents of a TSG reuse the code instead of generating it again. Entries live in a
+    SQLite database shared by all processes of a host; beyond max_entries the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            path: Path of the cache database (defaults to tools.code_interpreter.code_cache.path)
+            max_entries: Maximum number of cached entries (defaults to tools.code_interpreter.code_cache.max_entries)
+        """
+        cache_config = config.get_section("tools.code_interpreter.code_cache")
+        self.path = path or cache_config.get("path", "./.cache/generated_code.sqlite")
+        self.max_entries = max_entries or cache_config.get("max_entries", 5000)
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS code ("
+                "key TEXT PRIMARY KEY, task TEXT, code TEXT, hits INTEGER, created_at REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS code_last_access ON code (last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, bindings: List[Binding]) -> Optional[str]:
+        """
+        Look up cached code
+
+        Args:
+            key: Key from code_cache_key()
+            bindings: Input variables and data IDs of the call, in input order
+
+        Returns:
+            The code bound to the inputs of the call, or None on a miss
+        """
+        with self._connection() as conn:
+            row = conn.execute("SELECT code FROM code WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE code SET hits = hits + 1, last_access = ? WHERE key = ?", (time.time(), key))
+        return bind_code(row[0], bindings)
+
+    def put(self, key: str, task: str, code: str, bindings: List[Binding]) -> None:
+        """
+        Store code that executed successfully and evict least recently used entries beyond the limit.
+        Callers check the code with uncacheable_reason() first.
+
+        Args:
+            key: Key from code_cache_key()
+            task: Task of the call, kept for inspection
+            code: Executed code
+            bindings: Input variables and data IDs of the call, in input order
+        """
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO code (key, task, code, hits, created_at, last_access) VALUES (?, ?, ?, 0, ?, ?)",
+                (key, task, generalize_code(code, bindings), now, now)
+            )
+            conn.execute(
+                "DELETE FROM code WHERE key IN (SELECT key FROM code ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def remove(self, key: str) -> None:
+        """Remove an entry"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM code WHERE key = ?", (key,))
+
+    def clear(self) -> int:
+        """
+        Remove all cached code
+
+        Returns:
+            Number of removed entries
+        """
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM code").rowcount
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_code_cache() -> GeneratedCodeCache:
+    """Get the generated code cache of this process"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeneratedCodeCache()
+        return _cache
+
+
+def main():
+    """Command line entry point for explicit cache invalidation"""
+    parser = argparse.ArgumentParser(description='StepFly generated code cache')
+    parser.add_argument('--clear', action='store_true', help='Remove all cached code')
+
+    args = parser.parse_args()
+
+    if not args.clear:
+        parser.print_help()
+        return
+
+    removed = get_code_cache().clear()
+    print(f"Removed {removed} cached code entries")
+
+
+if __name__ == "__main__":
+    main()
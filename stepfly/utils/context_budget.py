@@ -0,0 +1,110 @@
+import math
+from typing import List, Dict, Any, Optional
+
+from stepfly.utils.config_loader import config
+
+# Rough token estimate for English text and JSON, good enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "... [truncated]") -> str:
+    """
+    Truncate a text to roughly max_tokens tokens
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token limit
+        marker: Appended to a truncated text
+
+    Returns:
+        The text, truncated if it exceeds the limit
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max(0, max_tokens * CHARS_PER_TOKEN - len(marker))] + marker
+
+
+class ContextBudgeter:
+    """
+    Fits executor context sections into per-section token limits.
+
+    Items of a section have a priority (lower is more important); within a priority, items of
+    more recent nodes win. Items that do not fit are dropped and reported in self.dropped.
+    A section without a limit keeps everything.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Optional[int]]] = None, excerpt_tokens: Optional[int] = None):
+        """
+        Args:
+            limits: Token limit per section name, None for unlimited (defaults to executor.context_budget.sections)
+            excerpt_tokens: Token limit of a single conversation excerpt (defaults to executor.context_budget.excerpt_tokens)
+        """
+        budget_config = config.get_section("executor.context_budget")
+        enabled = budget_config.get("enabled", True)
+
+        self.limits = limits if limits is not None else (budget_config.get("sections", {}) if enabled else {})
+        self.excerpt_tokens = excerpt_tokens if excerpt_tokens is not None else (
+            budget_config.get("excerpt_tokens") if enabled else None
+        )
+        self.dropped = []
+
+    def fit_text(self, section: str, text: str) -> str:
+        """Truncate a single-text section (e.g. the TSG document) to its limit"""
+        limit = self.limits.get(section)
+        if limit is None or estimate_tokens(text) <= limit:
+            return text
+
+        self.dropped.append({
+            "section": section,
+            "item": section,
+            "tokens": estimate_tokens(text) - limit,
+            "truncated": True
+        })
+        return truncate_to_tokens(text, limit, marker="\n... [truncated to fit the context budget]")
+
+    def excerpt(self, text: str) -> str:
+        """Shorten a conversation message to the excerpt limit"""
+        if self.excerpt_tokens is None:
+            return text
+        return truncate_to_tokens(text, self.excerpt_tokens)
+
+    def select(self, section: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Select the items of a section that fit into its limit
+
+        Args:
+            section: Section name
+            items: Items with "id", "text", "priority" and "recency" (higher is more recent) keys
+
+        Returns:
+            The selected items, in their original order
+        """
+        limit = self.limits.get(section)
+        if limit is None:
+            return list(items)
+
+        ranked = sorted(range(len(items)), key=lambda i: (items[i]["priority"], -items[i]["recency"], i))
+        used = 0
+        selected = set()
+        for i in ranked:
+            tokens = estimate_tokens(items[i]["text"])
+            if used + tokens <= limit:
+                used += tokens
+                selected.add(i)
+            else:
+                self.dropped.append({"section": section, "item": items[i]["id"], "tokens": tokens, "truncated": False})
+
+        return [item for i, item in enumerate(items) if i in selected]
+
+    def dropped_summary(self, section: Optional[str] = None) -> str:
+        """Human-readable summary of the dropped items, optionally of a single section"""
+        dropped = [item for item in self.dropped if section is None or item["section"] == section]
+        if not dropped:
+            return ""
+        total_tokens = sum(item["tokens"] for item in dropped)
+        return f"{len(dropped)} items (~{total_tokens} tokens) omitted: " + ", ".join(item["item"] for item in dropped)
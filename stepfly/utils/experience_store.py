@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+from typing import Dict, Any, List, Optional
+
+EXPERIENCE_FILE = "summarized_experiences.json"
+STEP_KEY_PREFIX = "step-"
+
+
+class _TSGExperiences:
+    """Parsed experiences of one TSG with a per-step index"""
+
+    def __init__(self, experiences: List[Dict[str, Any]], stat_key: Optional[tuple]):
+        self.stat_key = stat_key
+        # step key -> texts in ascending timestamp order; experiences with equal timestamps are
+        # kept in reverse file order so that the newest-first view lists them in file order
+        self.texts: Dict[str, List[str]] = {}
+        for experience in sorted(reversed(experiences), key=lambda item: item.get("timestamp", "")):
+            for key, text in experience.items():
+                if key.startswith(STEP_KEY_PREFIX):
+                    self.texts.setdefault(key, []).append(text)
+
+    def latest(self, step_key: str, topk: int) -> List[str]:
+        texts = self.texts.get(step_key, [])
+        return texts[:-topk - 1:-1] if topk > 0 else []
+
+
+class ExperienceStore:
+    """
+    Summarized step experiences of TSGs (experience/<tsg>/summarized_experiences.json).
+
+    Each file is parsed once per process and again only when its modification time or size
+    changes. Experiences are indexed by step and kept sorted by timestamp, so the most recent
+    experiences of a step are read without scanning or sorting the file.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        """
+        Args:
+            base_dir: Directory holding one subdirectory per TSG, experience/ under the working directory by default
+        """
+        self.base_dir = base_dir
+        self._entries: Dict[str, _TSGExperiences] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, tsg_dir_name: str) -> str:
+        base_dir = self.base_dir or os.path.join(os.getcwd(), "experience")
+        return os.path.join(base_dir, tsg_dir_name, EXPERIENCE_FILE)
+
+    @staticmethod
+    def _stat_key(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, tsg_dir_name: str) -> _TSGExperiences:
+        """Return the cached experiences of a TSG, parsing the file when it changed. Caller holds the lock."""
+        path = self._path(tsg_dir_name)
+        stat_key = self._stat_key(path)
+        entry = self._entries.get(tsg_dir_name)
+        if entry is not None and entry.stat_key == stat_key:
+            return entry
+
+        experiences = []
+        if stat_key is not None:
+            with open(path, 'r', encoding='utf-8') as f:
+                experiences = json.load(f)
+            if not isinstance(experiences, list):
+                experiences = [experiences]
+        entry = _TSGExperiences(experiences, stat_key)
+        self._entries[tsg_dir_name] = entry
+        return entry
+
+    def get_step_experiences(self, tsg_dir_name: str, step: int, topk: int) -> List[str]:
+        """
+        Get the most recent experiences of a step
+
+        Args:
+            tsg_dir_name: Sanitized TSG name, the directory under experience/
+            step: Step number
+            topk: Maximum number of experiences
+
+        Returns:
+            Experience texts, most recent first
+        """
+        with self._lock:
+            return self._load(tsg_dir_name).latest(f"{STEP_KEY_PREFIX}{step}", topk)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_experience_store() -> ExperienceStore:
+    """Get the experience store of this process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ExperienceStore()
+        return _store
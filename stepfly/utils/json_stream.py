@@ -0,0 +1,214 @@
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+_NUMBER = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+_LITERALS = ("true", "false", "null")
+_LITERAL_START = set("-0123456789tfn")
+_WHITESPACE = " \t\r\n"
+_FENCE_PREFIXES = ("```json", "```")
+
+
+class StreamingActionParser:
+    """
+    Incremental validator of a streamed agent action.
+
+    Accepts a JSON object, optionally inside a ```json fence, of the form
+    {"thought": ..., "action": "<tool>", "parameters": {...}} or
+    {"thought": ..., "actions": [{"action": "<tool>", "parameters": {...}}, ...]}.
+
+    Text is fed as it streams in. The parser reports an error as soon as the text can no longer
+    become such an object, and completion as soon as the closing brace arrives, so that the
+    caller can stop the stream early. Tool names are reported once their string is complete.
+    """
+
+    def __init__(self, on_action: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            on_action: Called with each action name as soon as it is known
+        """
+        self.text = ""
+        self.start = None  # Index of the opening brace
+        self.end = None  # Index after the closing brace
+        self.error = None
+        self.actions: List[str] = []
+        self._on_action = on_action
+        self._preamble = ""
+        # Open containers: {"type": "{" or "[", "key": last key of an object, "keys": keys of an object}
+        self._stack: List[Dict[str, Any]] = []
+        self._state = "value"
+        self._string = None  # Raw content of the string being read
+        self._string_role = None  # "key" or "value"
+        self._escape = False
+        self._literal = None
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    @property
+    def done(self) -> bool:
+        """Whether the stream can be stopped: the object is complete or invalid"""
+        return self.complete or self.error is not None
+
+    def feed(self, chunk: str) -> None:
+        """Validate the next chunk of streamed text"""
+        for char in chunk:
+            if self.done:
+                return
+            self._feed_char(char)
+            if self.error is None:
+                # The text stops before the offending character, so it never decodes as JSON
+                self.text += char
+
+    def json_text(self) -> Optional[str]:
+        """The complete JSON object without fences, or None if it is not complete"""
+        return self.text[self.start:self.end] if self.complete else None
+
+    def _fail(self, message: str) -> None:
+        self.error = f"{message} at character {len(self.text)}"
+
+    def _feed_char(self, char: str) -> None:
+        if self.start is None:
+            self._feed_preamble(char)
+        elif self._string is not None:
+            self._feed_string(char)
+        elif self._literal is not None:
+            if char in _WHITESPACE or char in ",}]":
+                self._end_literal()
+                if self.error is None:
+                    self._feed_structure(char)
+            else:
+                self._literal += char
+        else:
+            self._feed_structure(char)
+
+    def _feed_preamble(self, char: str) -> None:
+        if char == "{":
+            if self._preamble.strip().lower() not in ("",) + _FENCE_PREFIXES:
+                self._fail("Unexpected text before the JSON object")
+                return
+            self.start = len(self.text)
+            self._open("{")
+            return
+        self._preamble += char
+        stripped = self._preamble.lstrip().lower()
+        if stripped and not any(prefix.startswith(stripped) or stripped.rstrip() == prefix for prefix in _FENCE_PREFIXES):
+            self._fail("Response does not start with a JSON object")
+
+    def _feed_string(self, char: str) -> None:
+        if self._escape:
+            self._escape = False
+            self._string += char
+        elif char == "\\":
+            self._escape = True
+            self._string += char
+        elif char == '"':
+            self._end_string()
+        elif ord(char) < 0x20:
+            self._fail("Unescaped control character in a string")
+        else:
+            self._string += char
+
+    def _feed_structure(self, char: str) -> None:
+        if char in _WHITESPACE:
+            return
+        state = self._state
+        if state in ("value", "value_or_close"):
+            if state == "value_or_close" and char == "]":
+                self._close("]")
+            else:
+                self._start_value(char)
+        elif state in ("key", "key_or_close"):
+            if state == "key_or_close" and char == "}":
+                self._close("}")
+            elif char == '"':
+                self._string, self._string_role = "", "key"
+            else:
+                self._fail("Expected an object key")
+        elif state == "colon":
+            if char == ":":
+                self._state = "value"
+            else:
+                self._fail("Expected ':' after an object key")
+        elif state == "comma_or_close":
+            container = self._stack[-1]["type"]
+            if char == ",":
+                self._state = "key" if container == "{" else "value"
+            elif (char == "}" and container == "{") or (char == "]" and container == "["):
+                self._close(char)
+            else:
+                self._fail("Expected ',' or the end of the container")
+
+    def _value_context(self) -> Optional[str]:
+        """Role of the value about to start in the action structure"""
+        depth = len(self._stack)
+        parent = self._stack[-1]
+        if depth == 1:
+            return f"top:{parent['key']}"
+        if depth == 2 and parent["type"] == "[" and self._stack[0]["key"] == "actions":
+            return "actions_item"
+        if depth == 3 and parent["type"] == "{" and self._stack[1]["type"] == "[" and self._stack[0]["key"] == "actions":
+            return f"item:{parent['key']}"
+        return None
+
+    def _start_value(self, char: str) -> None:
+        context = self._value_context()
+        expected = {
+            "top:action": '"', "top:parameters": "{", "top:actions": "[",
+            "actions_item": "{", "item:action": '"', "item:parameters": "{"
+        }.get(context)
+        if expected is not None and char != expected:
+            kind = {'"': "a string", "{": "an object", "[": "a list"}[expected]
+            subject = "Each entry of actions" if context == "actions_item" else context.split(":")[-1]
+            self._fail(f"{subject} must be {kind}")
+            return
+
+        if char in "{[":
+            self._open(char)
+        elif char == '"':
+            self._string, self._string_role = "", "value"
+        elif char in _LITERAL_START:
+            self._literal = char
+        else:
+            self._fail(f"Unexpected character {char!r}")
+
+    def _end_string(self) -> None:
+        try:
+            value = json.loads(f'"{self._string}"')
+        except json.JSONDecodeError:
+            self._fail("Invalid string escape")
+            return
+        role, self._string, self._string_role = self._string_role, None, None
+        if role == "key":
+            self._stack[-1]["key"] = value
+            self._stack[-1]["keys"].add(value)
+            self._state = "colon"
+            return
+
+        if self._value_context() in ("top:action", "item:action"):
+            self.actions.append(value)
+            if self._on_action and value:
+                self._on_action(value)
+        self._state = "comma_or_close"
+
+    def _end_literal(self) -> None:
+        literal, self._literal = self._literal, None
+        if literal not in _LITERALS and not _NUMBER.fullmatch(literal):
+            self._fail(f"Invalid literal {literal!r}")
+            return
+        self._state = "comma_or_close"
+
+    def _open(self, container: str) -> None:
+        self._stack.append({"type": container, "key": None, "keys": set()})
+        self._state = "key_or_close" if container == "{" else "value_or_close"
+
+    def _close(self, char: str) -> None:
+        closed = self._stack.pop()
+        if not self._stack:
+            if "action" not in closed["keys"] and "actions" not in closed["keys"]:
+                self._fail("The response has neither \"action\" nor \"actions\"")
+                return
+            self.end = len(self.text) + 1
+            return
+        self._state = "comma_or_close"
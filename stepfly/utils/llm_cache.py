@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from stepfly.utils.config_loader import config
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """
+    Build the cache key of an LLM request
+
+    Unlike cassette keys, nothing is masked: responses refer to the data IDs in the messages.
+
+    Args:
+        model: Model name
+        messages: List of message dictionaries
+        params: Sampling parameters
+
+    Returns:
+        Hex digest identifying the request
+    """
+    key_material = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Size-bounded LRU cache of LLM responses on disk.
+
+    Entries live in a SQLite database, so all agent processes of a host share the cache.
+    When the total size exceeds max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            path: Path of the cache database (defaults to llm.response_cache.path)
+            max_bytes: Maximum total size of cached responses (defaults to llm.response_cache.max_megabytes)
+        """
+        cache_config = config.get_section("llm.response_cache")
+        self.path = path or cache_config.get("path", "./.cache/llm_responses.sqlite")
+        self.max_bytes = max_bytes or int(cache_config.get("max_megabytes", 512) * 1024 * 1024)
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, chunks TEXT, usage TEXT, size INTEGER, "
+                "created_at REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response
+
+        Returns:
+            Dictionary with "chunks" (list of streamed text pieces) and "usage", or None on a miss
+        """
+        with self._connection() as conn:
+            row = conn.execute("SELECT chunks, usage FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return {"chunks": json.loads(row[0]), "usage": json.loads(row[1])}
+
+    def put(self, key: str, model: str, chunks: List[str], usage: Dict[str, Any]) -> None:
+        """
+        Store a response and evict least recently used entries beyond the size limit
+
+        Args:
+            key: Key from cache_key()
+            model: Model name
+            chunks: Streamed text pieces of the response
+            usage: Token usage of the original call
+        """
+        chunks_json = json.dumps(chunks, ensure_ascii=False)
+        usage_json = json.dumps(usage)
+        size = len(chunks_json.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, chunks, usage, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, chunks_json, usage_json, size, now, now)
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(conn, total - self.max_bytes)
+
+    @staticmethod
+    def _evict(conn: sqlite3.Connection, bytes_to_free: int) -> None:
+        freed = 0
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if freed >= bytes_to_free:
+                break
+            evicted.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def clear(self) -> None:
+        """Remove all cached responses"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM responses")
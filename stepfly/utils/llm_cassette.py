@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, appends are then unlocked
+    fcntl = None
+
+# IDs generated at runtime (memory data IDs, snippet IDs, and the variable names derived from them)
+# differ between a recorded and a replayed run, so they are masked before building request keys
+_UUID_PATTERN = re.compile(r"[0-9a-fA-F]{8}[-_][0-9a-fA-F]{4}[-_][0-9a-fA-F]{4}[-_][0-9a-fA-F]{4}[-_][0-9a-fA-F]{12}")
+
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when the cassette has no response for a request"""
+
+
+def request_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """
+    Build a deterministic key for an LLM request
+
+    Args:
+        model: Model name
+        messages: List of message dictionaries
+        params: Sampling parameters
+
+    Returns:
+        Hex digest identifying the request
+    """
+    key_material = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    key_material = _UUID_PATTERN.sub("<id>", key_material)
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class LLMCassette:
+    """
+    JSONL recording of LLM request/response pairs with token usage and timing.
+
+    In record mode every streamed completion is appended to the cassette. In replay mode
+    responses are served from the cassette by request key; repeated identical requests are
+    replayed in recorded order.
+    """
+
+    def __init__(self, path: str, mode: str, replay_latency: str = "zero"):
+        """
+        Args:
+            path: Path of the cassette file
+            mode: "record" or "replay"
+            replay_latency: "recorded" to reproduce recorded timing, "zero" to return immediately
+        """
+        if mode not in ["record", "replay"]:
+            raise ValueError(f"Invalid cassette mode: {mode}. Must be 'record' or 'replay'.")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._entries = None
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, model: str, messages: List[Dict[str, str]], params: Dict[str, Any],
+               chunks: List[Tuple[float, str]], usage: Dict[str, Any],
+               time_to_first_token: Optional[float], duration: float) -> None:
+        """
+        Append a request/response pair to the cassette
+
+        Args:
+            key: Request key from request_key()
+            model: Model name
+            messages: Request messages
+            params: Sampling parameters
+            chunks: List of (offset in seconds since request start, content) stream chunks
+            usage: Token usage of the call
+            time_to_first_token: Seconds until the first content chunk
+            duration: Seconds until the stream completed
+        """
+        entry = {
+            "key": key,
+            "timestamp": datetime.now().isoformat(),
+            "request": {"model": model, "params": params, "messages": messages},
+            "response": "".join(content for _, content in chunks),
+            "chunks": chunks,
+            "usage": usage,
+            "time_to_first_token": time_to_first_token,
+            "duration_seconds": duration
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Several executor processes append to the same cassette
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.write(line)
+                f.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        self._entries = {}
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"LLM cassette not found at {self.path}")
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._entries.setdefault(entry["key"], []).append(entry)
+
+    def replay(self, key: str, callback: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Serve a recorded response
+
+        Args:
+            key: Request key from request_key()
+            callback: Function to call for each chunk
+
+        Returns:
+            Tuple of (full generated text, token usage info)
+        """
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(f"No recorded LLM response for request {key[:12]} in cassette {self.path}")
+            # Identical requests are replayed in recorded order, the last one is reused when exhausted
+            position = self._positions.get(key, 0)
+            entry = entries[min(position, len(entries) - 1)]
+            self._positions[key] = position + 1
+
+        start = time.monotonic()
+        for offset, content in entry["chunks"]:
+            if self.replay_latency == "recorded":
+                delay = offset - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            if callback:
+                callback(content)
+
+        usage = dict(entry["usage"])
+        usage["replayed"] = True
+        usage["llm_seconds"] = time.monotonic() - start
+        return entry["response"], usage
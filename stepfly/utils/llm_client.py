@@ -1,13 +1,26 @@
+import asyncio
+import itertools
+import json
 import os
-from typing import List, Dict, Any, Optional, Tuple
-from openai import OpenAI
+import queue
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple, Iterator, AsyncIterator, Callable
+from openai import AsyncOpenAI
 from stepfly.utils.config_loader import config
+from stepfly.utils.context_budget import estimate_tokens
+from stepfly.utils.openai_clients import get_openai_client, get_async_openai_client
+from stepfly.utils.llm_cache import LLMResponseCache, cache_key
+from stepfly.utils.llm_cassette import LLMCassette, request_key
+from stepfly.utils.llm_hedging import get_ttft_tracker
+from stepfly.utils.rate_limiter import RetryPolicy, get_rate_limiter
 
 class LLMClient:
     def __init__(self, 
                  model: Optional[str] = None, 
                  api_base: Optional[str] = None,
-                 api_key: Optional[str] = None):
+                 api_key: Optional[str] = None,
+                 session_id: Optional[str] = None):
         """
         Initialize LLM client for OpenAI API
         
@@ -15,6 +28,7 @@ class LLMClient:
             model: Model name to use (overrides config)
             api_base: Base URL for OpenAI API (overrides config)
             api_key: API key for OpenAI API (overrides config)
+            session_id: Session ID, used for the default cassette location when recording
         """
         # Set model from parameter or config
         self.model = model or config.get("llm.model", "gpt-4o-mini")
@@ -22,15 +36,52 @@ class LLMClient:
         # Set API base and key (priority: parameter > env var > config)
         self.api_base = api_base or os.environ.get("API_BASE") or config.get("llm.api_base", "https://api.openai.com/v1")
         self.api_key = api_key or os.environ.get("API_KEY") or config.get("llm.api_key")
+
+        # Record/replay cassette (priority: env var > config)
+        self.cassette = self._init_cassette(session_id)
+        # Only created when the asyncio runtime is used
+        self._async_openai_client = None
+        # Opt-in on-disk cache of deterministic (temperature 0) responses
+        self.response_cache = LLMResponseCache() if config.get("llm.response_cache.enabled", False) else None
+        # Requests/tokens per minute shared by all processes of the host, None when unlimited
+        self.rate_limiter = get_rate_limiter()
+        self.retry_policy = RetryPolicy()
+        # Recent time-to-first-token for hedging slow requests, None when hedging is off
+        self.ttft_tracker = get_ttft_tracker()
         
+        if self.cassette and self.cassette.mode == "replay":
+            # Replayed sessions never reach the API
+            self._openai_client = None
+            return
+
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Please set it in config or pass as parameter.")
         
-        # Initialize OpenAI client
-        self._openai_client = OpenAI(
-            base_url=self.api_base,
-            api_key=self.api_key
-        )
+        # Agents of a process share one OpenAI client and its keep-alive connection pool.
+        # Retries are done by the retry policy, which also goes through the rate limiter.
+        self._openai_client = get_openai_client(self.api_base, self.api_key, max_retries=0)
+
+    def _init_cassette(self, session_id: Optional[str]) -> Optional[LLMCassette]:
+        """
+        Create the record/replay cassette if enabled
+
+        Returns:
+            LLMCassette instance or None when recording and replay are off
+        """
+        cassette_config = config.get_section("llm.cassette")
+        mode = os.environ.get("STEPFLY_LLM_MODE") or cassette_config.get("mode", "off")
+        if mode == "off":
+            return None
+
+        path = os.environ.get("STEPFLY_LLM_CASSETTE") or cassette_config.get("path")
+        if not path:
+            if mode == "replay" or not session_id:
+                raise ValueError("A cassette path is required for LLM replay. Set llm.cassette.path or STEPFLY_LLM_CASSETTE.")
+            # Record to a per-session cassette next to the session trace
+            path = os.path.join(os.getcwd(), "trace", session_id, "llm_cassette.jsonl")
+
+        replay_latency = os.environ.get("STEPFLY_LLM_REPLAY_LATENCY") or cassette_config.get("replay_latency", "zero")
+        return LLMCassette(path=path, mode=mode, replay_latency=replay_latency)
     
     def _extract_token_usage(self, response: Any) -> Dict[str, int]:
         """
@@ -82,6 +133,19 @@ class LLMClient:
         Returns:
             Completion object or generator for streaming
         """
+        params = self._build_params(messages, temperature, max_tokens, top_p, stream, json_response)
+        return self._openai_client.chat.completions.create(**params)
+
+    def _build_params(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        top_p: float,
+        stream: bool,
+        json_response: bool
+    ) -> Dict[str, Any]:
+        """Build the chat completion request parameters"""
         # Prepare common parameters
         params = {
             "model": self.model,
@@ -100,7 +164,7 @@ class LLMClient:
         if stream:
             params["stream_options"] = {"include_usage": True}
         
-        return self._openai_client.chat.completions.create(**params)
+        return params
     
     def stream_completion(
         self,
@@ -109,7 +173,8 @@ class LLMClient:
         max_tokens: int = 4096,
         top_p: float = 0.95,
         callback: Optional[callable] = None,
-        json_response: bool = False
+        json_response: bool = False,
+        should_stop: Optional[Callable[[], bool]] = None
     ) -> Tuple[str, Dict[str, int]]:
         """
         Stream completion content from OpenAI API, calling the callback for each chunk
@@ -121,32 +186,412 @@ class LLMClient:
             top_p: Top-p sampling parameter
             callback: Function to call for each chunk
             json_response: Whether to request JSON format response
+            should_stop: Checked after each chunk; when it returns True the stream is closed
+                and the text received so far is returned
             
         Returns:
             Tuple of (full generated text, token usage info)
         """
-        # Get streaming response with stream_options to include token usage
-        response_stream = self.get_completion(
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=top_p,
-            stream=True,
-            json_response=json_response
-        )
-        
-        full_response = ""
-        final_usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
-        
-        for chunk in response_stream:
-            if chunk.choices and len(chunk.choices) > 0 and chunk.choices[0].delta.content:
-                content = chunk.choices[0].delta.content
-                full_response += content
-                if callback:
-                    callback(content)
-            
-            # Extract usage information from chunks that contain it
-            if hasattr(chunk, 'usage') and chunk.usage:
-                final_usage = self._extract_token_usage(chunk)
+        cassette_key, cassette_params = self._cassette_key(messages, temperature, max_tokens, top_p, json_response)
+        if cassette_key and self.cassette.mode == "replay":
+            return self.cassette.replay(cassette_key, callback)
+
+        response_cache_key = self._response_cache_key(messages, temperature, max_tokens, top_p, json_response)
+        if response_cache_key:
+            cached = self.response_cache.get(response_cache_key)
+            if cached:
+                return self._replay_cached(cached, callback, messages, cassette_key, cassette_params)
+
+        params = self._build_params(messages, temperature, max_tokens, top_p, stream=True, json_response=json_response)
+        estimated_tokens = self._estimate_request_tokens(messages)
+        hedge_delay = self.ttft_tracker.hedge_delay() if self.ttft_tracker else None
+        if hedge_delay is None:
+            stream_state = self._new_stream_state()
+            chunks = stream_state["stream"] = self._open_stream(params, stream_state, estimated_tokens)
+        else:
+            stream_state, chunks = self._open_hedged_stream(params, estimated_tokens, hedge_delay)
+
+        for chunk in chunks:
+            self._consume_chunk(stream_state, chunk, callback)
+            if should_stop and should_stop():
+                # Stop generating tokens nobody reads
+                stream_state["stream"].close()
+                self._mark_stopped(stream_state, estimated_tokens)
+                break
+
+        if self.ttft_tracker:
+            self.ttft_tracker.record(stream_state["time_to_first_token"])
+        result = self._finish_stream(stream_state, messages, cassette_key, cassette_params)
+        if self.rate_limiter and stream_state["usage"]["total_tokens"]:
+            self.rate_limiter.adjust(stream_state["usage"]["total_tokens"] - estimated_tokens)
+        if response_cache_key:
+            self._store_cached(response_cache_key, stream_state, json_response)
+        return result
+
+    async def astream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0,
+        max_tokens: int = 4096,
+        top_p: float = 0.95,
+        callback: Optional[callable] = None,
+        json_response: bool = False,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        """
+        Asyncio variant of stream_completion using AsyncOpenAI
+
+        Parameters:
+            messages: List of message dictionaries
+            temperature: Sampling temperature
+            max_tokens: Maximum number of tokens to generate
+            top_p: Top-p sampling parameter
+            callback: Function to call for each chunk
+            json_response: Whether to request JSON format response
+            should_stop: Checked after each chunk; when it returns True the stream is closed
+                and the text received so far is returned
+
+        Returns:
+            Tuple of (full generated text, token usage info)
+        """
+        cassette_key, cassette_params = self._cassette_key(messages, temperature, max_tokens, top_p, json_response)
+        if cassette_key and self.cassette.mode == "replay":
+            # Replay may sleep to reproduce recorded latency, keep it off the event loop
+            return await asyncio.to_thread(self.cassette.replay, cassette_key, callback)
+
+        response_cache_key = self._response_cache_key(messages, temperature, max_tokens, top_p, json_response)
+        if response_cache_key:
+            cached = await asyncio.to_thread(self.response_cache.get, response_cache_key)
+            if cached:
+                return self._replay_cached(cached, callback, messages, cassette_key, cassette_params)
+
+        params = self._build_params(messages, temperature, max_tokens, top_p, stream=True, json_response=json_response)
+        estimated_tokens = self._estimate_request_tokens(messages)
+        hedge_delay = self.ttft_tracker.hedge_delay() if self.ttft_tracker else None
+        if hedge_delay is None:
+            stream_state = self._new_stream_state()
+            chunks = stream_state["stream"] = await self._aopen_stream(params, stream_state, estimated_tokens)
+        else:
+            stream_state, chunks = await self._aopen_hedged_stream(params, estimated_tokens, hedge_delay)
+
+        async for chunk in chunks:
+            self._consume_chunk(stream_state, chunk, callback)
+            if should_stop and should_stop():
+                await stream_state["stream"].close()
+                self._mark_stopped(stream_state, estimated_tokens)
+                break
+
+        if self.ttft_tracker:
+            self.ttft_tracker.record(stream_state["time_to_first_token"])
+        result = self._finish_stream(stream_state, messages, cassette_key, cassette_params)
+        if self.rate_limiter and stream_state["usage"]["total_tokens"]:
+            await asyncio.to_thread(self.rate_limiter.adjust, stream_state["usage"]["total_tokens"] - estimated_tokens)
+        if response_cache_key:
+            await asyncio.to_thread(self._store_cached, response_cache_key, stream_state, json_response)
+        return result
+
+    def _open_stream(self, params: Dict[str, Any], stream_state: Dict[str, Any], estimated_tokens: int) -> Any:
+        """
+        Send a streaming request through the rate limiter, retrying failures according to the retry policy
+
+        Returns:
+            Response stream
+        """
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                stream_state["rate_limit_wait_seconds"] += self.rate_limiter.acquire(estimated_tokens)
+            stream_state["start"] = time.monotonic()
+            try:
+                return self._openai_client.chat.completions.create(**params)
+            except Exception as e:
+                delay = self.retry_policy.delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                stream_state["retries"] = attempt
+                time.sleep(delay)
+
+    async def _aopen_stream(self, params: Dict[str, Any], stream_state: Dict[str, Any], estimated_tokens: int) -> Any:
+        """Asyncio variant of _open_stream"""
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                # The limiter blocks on a file lock or MongoDB, keep it off the event loop
+                stream_state["rate_limit_wait_seconds"] += await asyncio.to_thread(self.rate_limiter.acquire, estimated_tokens)
+            stream_state["start"] = time.monotonic()
+            try:
+                return await self._get_async_openai_client().chat.completions.create(**params)
+            except Exception as e:
+                delay = self.retry_policy.delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                stream_state["retries"] = attempt
+                await asyncio.sleep(delay)
+
+    def _open_hedged_stream(self, params: Dict[str, Any], estimated_tokens: int,
+                            hedge_delay: float) -> Tuple[Dict[str, Any], Iterator[Any]]:
+        """
+        Send the request, and an identical hedge request if no chunk arrived within hedge_delay.
+        Whichever request streams first is used, the other one is closed.
+
+        Returns:
+            Tuple of (stream state of the used request, iterator over its chunks)
+        """
+        request_start = time.monotonic()
+        results = queue.Queue()
+        self._start_stream_attempt(params, estimated_tokens, results)
+        attempts = 1
+        try:
+            outcome = results.get(timeout=hedge_delay)
+        except queue.Empty:
+            self._start_stream_attempt(params, estimated_tokens, results)
+            attempts = 2
+            outcome = results.get()
+
+        received = 1
+        if outcome["error"] is not None and received < attempts:
+            # The other request may still succeed
+            outcome = results.get()
+            received += 1
+        if received < attempts:
+            threading.Thread(target=self._discard_stream_attempts, args=(results, attempts - received), daemon=True).start()
+
+        if outcome["error"] is not None:
+            raise outcome["error"]
+        if attempts > 1:
+            self._mark_hedged(outcome["state"], estimated_tokens, request_start)
+        return outcome["state"], outcome["chunks"]
+
+    def _start_stream_attempt(self, params: Dict[str, Any], estimated_tokens: int, results: queue.Queue) -> None:
+        """Open a stream in a background thread and report it to results once its first chunk arrived"""
+        def run():
+            stream_state = self._new_stream_state()
+            try:
+                stream = stream_state["stream"] = self._open_stream(params, stream_state, estimated_tokens)
+                iterator = iter(stream)
+                first = next(iterator, None)
+                chunks = itertools.chain([first], iterator) if first is not None else iterator
+                results.put({"state": stream_state, "stream": stream, "chunks": chunks, "error": None})
+            except Exception as e:
+                results.put({"state": stream_state, "stream": None, "chunks": None, "error": e})
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def _discard_stream_attempts(results: queue.Queue, count: int) -> None:
+        """Close the streams of requests that lost the hedge race as soon as they are opened"""
+        for _ in range(count):
+            outcome = results.get()
+            if outcome["stream"] is not None:
+                outcome["stream"].close()
+
+    async def _aopen_hedged_stream(self, params: Dict[str, Any], estimated_tokens: int,
+                                   hedge_delay: float) -> Tuple[Dict[str, Any], AsyncIterator[Any]]:
+        """Asyncio variant of _open_hedged_stream, the losing request is cancelled"""
+        request_start = time.monotonic()
+        primary = asyncio.ensure_future(self._aopen_first_chunk(params, estimated_tokens))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            stream_state, _, chunks = primary.result()
+            return stream_state, chunks
+
+        pending = {primary, asyncio.ensure_future(self._aopen_first_chunk(params, estimated_tokens))}
+        winner = None
+        error = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif winner is None:
+                    winner = task.result()
+                else:
+                    await task.result()[1].close()
+        for task in pending:
+            task.cancel()
+
+        if winner is None:
+            raise error
+        stream_state, _, chunks = winner
+        self._mark_hedged(stream_state, estimated_tokens, request_start)
+        return stream_state, chunks
+
+    async def _aopen_first_chunk(self, params: Dict[str, Any], estimated_tokens: int) -> Tuple[Dict[str, Any], Any, AsyncIterator[Any]]:
+        """Open a stream and wait for its first chunk"""
+        stream_state = self._new_stream_state()
+        stream = stream_state["stream"] = await self._aopen_stream(params, stream_state, estimated_tokens)
+        iterator = stream.__aiter__()
+        try:
+            first = await iterator.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except asyncio.CancelledError:
+            # Lost the hedge race
+            await stream.close()
+            raise
+
+        async def chunks():
+            if first is not None:
+                yield first
+            async for chunk in iterator:
+                yield chunk
+
+        return stream_state, stream, chunks()
+
+    @staticmethod
+    def _mark_stopped(stream_state: Dict[str, Any], estimated_tokens: int) -> None:
+        # A closed stream never delivers its usage chunk, count the prompt estimate and the text received
+        if not stream_state["usage"]["total_tokens"]:
+            output_tokens = estimate_tokens(stream_state["text"])
+            stream_state["usage"] = {
+                "input_tokens": estimated_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": estimated_tokens + output_tokens
+            }
+        stream_state["stopped_early"] = True
+
+    @staticmethod
+    def _mark_hedged(stream_state: Dict[str, Any], estimated_tokens: int, request_start: float) -> None:
+        # The discarded request is billed for its prompt at least, count it with the prompt estimate
+        stream_state["hedges"] = 1
+        stream_state["hedge_estimated_tokens"] = estimated_tokens
+        # Time the caller waited, from the first request on; the first chunk is not consumed yet,
+        # so time to first token and chunk offsets are measured from here. Measured from the
+        # start of the hedge instead, it would lower the hedging percentile with every hedge.
+        stream_state["start"] = request_start
+
+    def _get_async_openai_client(self) -> AsyncOpenAI:
+        """Get the shared AsyncOpenAI client on first use, from within the event loop that uses it"""
+        if self._async_openai_client is None:
+            self._async_openai_client = get_async_openai_client(self.api_base, self.api_key, max_retries=0)
+        return self._async_openai_client
+
+    @staticmethod
+    def _estimate_request_tokens(messages: List[Dict[str, str]]) -> int:
+        """Prompt token estimate charged to the rate limiter before the request, corrected by the actual usage after it"""
+        return sum(estimate_tokens(message.get("content") or "") for message in messages)
+
+    def _cassette_key(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                      top_p: float, json_response: bool) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Request key and parameters for the cassette, (None, None) when the cassette is off"""
+        if not self.cassette:
+            return None, None
+        params = {
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+            "json_response": json_response
+        }
+        return request_key(self.model, messages, params), params
+
+    def _response_cache_key(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                            top_p: float, json_response: bool) -> Optional[str]:
+        """Response cache key, None if the cache is off or the request is not deterministic"""
+        if not self.response_cache or temperature != 0:
+            return None
+        params = {
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p,
+            "json_response": json_response
+        }
+        return cache_key(self.model, messages, params)
+
+    def _replay_cached(self, cached: Dict[str, Any], callback: Optional[callable], messages: List[Dict[str, str]],
+                       cassette_key: Optional[str], cassette_params: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """Serve a cached response through the stream callback, without token cost"""
+        stream_state = self._new_stream_state()
+        for content in cached["chunks"]:
+            self._append_content(stream_state, content, callback)
+        stream_state["usage"] = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "total_tokens": 0,
+            "cache_hit": True,
+            "cache_saved_tokens": cached["usage"].get("total_tokens", 0)
+        }
+        return self._finish_stream(stream_state, messages, cassette_key, cassette_params)
+
+    def _store_cached(self, response_cache_key: str, stream_state: Dict[str, Any], json_response: bool) -> None:
+        """Cache a streamed response, unless it is empty or invalid JSON where JSON was requested"""
+        stream_state["usage"]["cache_hit"] = False
+        text = stream_state["text"]
+        if not text:
+            return
+        if json_response:
+            # Agents retry on malformed JSON, a cached malformed response would make every retry fail
+            stripped = text.strip()
+            if stripped.startswith("```json"):
+                stripped = stripped[7:]
+            if stripped.endswith("```"):
+                stripped = stripped[:-3]
+            try:
+                json.loads(stripped)
+            except json.JSONDecodeError:
+                return
+        usage = {key: value for key, value in stream_state["usage"].items() if key.endswith("_tokens")}
+        self.response_cache.put(response_cache_key, self.model, [content for _, content in stream_state["chunks"]], usage)
+
+    @staticmethod
+    def _new_stream_state() -> Dict[str, Any]:
+        return {
+            "start": time.monotonic(),
+            "time_to_first_token": None,
+            "chunks": [],
+            "text": "",
+            "usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+            "retries": 0,
+            "rate_limit_wait_seconds": 0.0,
+            "hedges": 0,
+            "hedge_estimated_tokens": 0,
+            "stream": None,
+            "stopped_early": False
+        }
+
+    def _consume_chunk(self, stream_state: Dict[str, Any], chunk: Any, callback: Optional[callable]) -> None:
+        if chunk.choices and len(chunk.choices) > 0 and chunk.choices[0].delta.content:
+            self._append_content(stream_state, chunk.choices[0].delta.content, callback)
+
+        # Extract usage information from chunks that contain it
+        if hasattr(chunk, 'usage') and chunk.usage:
+            stream_state["usage"] = self._extract_token_usage(chunk)
+
+    @staticmethod
+    def _append_content(stream_state: Dict[str, Any], content: str, callback: Optional[callable]) -> None:
+        offset = time.monotonic() - stream_state["start"]
+        if stream_state["time_to_first_token"] is None:
+            stream_state["time_to_first_token"] = offset
+        stream_state["chunks"].append((offset, content))
+        stream_state["text"] += content
+        if callback:
+            callback(content)
+
+    def _finish_stream(self, stream_state: Dict[str, Any], messages: List[Dict[str, str]],
+                       cassette_key: Optional[str], cassette_params: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        duration = time.monotonic() - stream_state["start"]
+        final_usage = stream_state["usage"]
+        final_usage["llm_seconds"] = duration
+        if stream_state["retries"] or stream_state["rate_limit_wait_seconds"]:
+            final_usage["llm_retries"] = stream_state["retries"]
+            final_usage["rate_limit_wait_seconds"] = stream_state["rate_limit_wait_seconds"]
+        if stream_state["hedges"]:
+            final_usage["hedges"] = stream_state["hedges"]
+            final_usage["hedge_estimated_tokens"] = stream_state["hedge_estimated_tokens"]
+        if stream_state["stopped_early"]:
+            final_usage["stopped_early"] = True
+
+        if self.cassette and self.cassette.mode == "record":
+            self.cassette.record(
+                key=cassette_key,
+                model=self.model,
+                messages=messages,
+                params=cassette_params,
+                chunks=stream_state["chunks"],
+                usage=final_usage,
+                time_to_first_token=stream_state["time_to_first_token"],
+                duration=duration
+            )
         
-        return full_response, final_usage
+        return stream_state["text"], final_usage
@@ -0,0 +1,75 @@
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+from stepfly.utils.config_loader import config
+
+
+class TTFTTracker:
+    """
+    Recent time-to-first-token samples of a process, used to decide when to hedge an LLM request.
+
+    A request is hedged when its first token takes longer than the configured percentile of recent calls.
+    """
+
+    def __init__(self, percentile: float = 95, window: int = 200, min_samples: int = 20, min_delay: float = 0.5):
+        """
+        Args:
+            percentile: Percentile of recent time-to-first-token after which a request is hedged
+            window: Number of recent samples kept
+            min_samples: Samples required before hedging starts
+            min_delay: Lower bound of the hedge delay in seconds
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, time_to_first_token: Optional[float]) -> None:
+        """Record the time to first token seen by the caller, from the first request of a hedged call on"""
+        if time_to_first_token is not None:
+            with self._lock:
+                self._samples.append(time_to_first_token)
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Seconds to wait for the first token before sending a hedge request
+
+        Returns:
+            Delay in seconds, or None while there are too few samples
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1))
+        return max(self.min_delay, ordered[index])
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_ttft_tracker() -> Optional[TTFTTracker]:
+    """
+    Get the time-to-first-token tracker of this process
+
+    Returns:
+        TTFTTracker, or None when hedging is disabled
+    """
+    global _tracker
+    hedging_config = config.get_section("llm.hedging")
+    if not hedging_config.get("enabled", False):
+        return None
+
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = TTFTTracker(
+                percentile=hedging_config.get("percentile", 95),
+                window=hedging_config.get("window", 200),
+                min_samples=hedging_config.get("min_samples", 20),
+                min_delay=hedging_config.get("min_delay", 0.5)
+            )
+        return _tracker
@@ -1,14 +1,76 @@
+import atexit
+import concurrent.futures
 import logging
+import pickle
+import sys
 import threading
 import uuid
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, TYPE_CHECKING
 
-import pandas as pd
 import pymongo
-from pymongoarrow.api import write, find_pandas_all
 
 from stepfly.utils.config_loader import config
+from stepfly.utils.perf_stats import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def is_dataframe(data: Any) -> bool:
+    """
+    Whether data is a pandas DataFrame, without importing pandas
+
+    pandas (and pymongoarrow) are only imported once DataFrames are stored or read,
+    which keeps them out of the startup of agents that never handle one.
+    """
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(data, pandas.DataFrame)
+
+
+_background_writer = None
+_pending_writes = set()
+_pending_writes_by_id = {}  # ID of the written document -> future
+_background_lock = threading.Lock()
+
+
+def _submit_background_write(func, *args, document_id: Optional[str] = None, **kwargs) -> None:
+    global _background_writer
+    with _background_lock:
+        if _background_writer is None:
+            _background_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="stepfly-memory")
+        future = _background_writer.submit(func, *args, **kwargs)
+        _pending_writes.add(future)
+        if document_id:
+            _pending_writes_by_id[document_id] = future
+    future.add_done_callback(_finish_background_write)
+
+
+def _finish_background_write(future: concurrent.futures.Future) -> None:
+    with _background_lock:
+        _pending_writes.discard(future)
+        for document_id in [key for key, pending in _pending_writes_by_id.items() if pending is future]:
+            del _pending_writes_by_id[document_id]
+    if future.exception() is not None:
+        logging.warning(f"Background memory write failed: {future.exception()}")
+
+
+def flush_memory_writes() -> None:
+    """Wait until the background memory writes of this process are done"""
+    with _background_lock:
+        pending = list(_pending_writes)
+    concurrent.futures.wait(pending)
+
+
+def _wait_for_write(document_id: str) -> None:
+    """Wait until a pending background write of a document is done, so that it can be read"""
+    with _background_lock:
+        future = _pending_writes_by_id.get(document_id)
+    if future is not None:
+        concurrent.futures.wait([future])
+
+
+atexit.register(flush_memory_writes)
 
 
 class Memory:
@@ -61,6 +123,7 @@ class Memory:
                 client.drop_database(db_name)
                 logging.info(f"Dropped database: {db_name}")
     
+    @timed("memory")
     def register_agent(self, agent_name: str, agent_id: Optional[str] = None) -> str:
         if agent_id is None:
             agent_id = str(uuid.uuid4())
@@ -76,6 +139,7 @@ class Memory:
         logging.info(f"Agent registered: {agent_name} with ID {agent_id}")
         return agent_id
     
+    @timed("memory")
     def add_agent_context(self, agent_id: str, key: str, value: Any, 
                    description: str = None) -> None:
         # Check if agent exists
@@ -98,6 +162,7 @@ class Memory:
         )
         logging.debug(f"Added context for agent {agent_id}: {key}")
     
+    @timed("memory")
     def get_agent_context(self, agent_id: str, 
                         limit: int = None, message_only: bool = False) -> List[Dict[str, Any]]:
 
@@ -125,12 +190,13 @@ class Memory:
                 return history[-limit:]
             return history
     
+    @timed("memory")
     def add_data(self, data: Any, data_type: str, 
                  agent_id: str = None, metadata: Dict[str, Any] = None,
                  description: str = None) -> str:
 
         # Handle DataFrame data type using PyMongoArrow
-        if isinstance(data, pd.DataFrame):
+        if is_dataframe(data):
             return self._add_dataframe(data, data_type, agent_id, metadata, description)
 
         # For non-DataFrame data
@@ -172,7 +238,7 @@ class Memory:
         logging.info(f"Stored data with ID: {data_id}, type: {data_type}")
         return data_id
     
-    def _add_dataframe(self, df: pd.DataFrame, data_type: str, 
+    def _add_dataframe(self, df: "pd.DataFrame", data_type: str, 
                       agent_id: str = None, metadata: Dict[str, Any] = None,
                       description: str = None) -> str:
         # Generate unique ID
@@ -202,6 +268,7 @@ class Memory:
         df_with_id_to_mongo = df_with_id.reset_index().rename(columns={'index': '_original_index'})
         
         # Use PyMongoArrow to write DataFrame to MongoDB
+        from pymongoarrow.api import write
         write(self.dataframes_collection, df_with_id_to_mongo)
         
         # Add reference to agent if provided
@@ -221,6 +288,7 @@ class Memory:
         logging.info(f"Stored DataFrame with ID: {data_id}, type: {data_type}")
         return data_id
     
+    @timed("memory")
     def get_data(self, data_id: str) -> Any:
         data_doc = self.data_collection.find_one({"_id": data_id})
         if not data_doc:
@@ -233,10 +301,11 @@ class Memory:
 
         return data_doc.get("data")
     
-    def _get_dataframe(self, data_id: str) -> pd.DataFrame:
+    def _get_dataframe(self, data_id: str) -> "pd.DataFrame":
         # Query the dataframe collection
         try:
             # Get DataFrame from MongoDB using PyMongoArrow
+            from pymongoarrow.api import find_pandas_all
             df = find_pandas_all(self.dataframes_collection, {"_memory_id": data_id})
             
             # Check if DataFrame exists
@@ -257,6 +326,7 @@ class Memory:
             logging.error(f"Error retrieving DataFrame: {str(e)}")
             return None
     
+    @timed("memory")
     def get_data_summary(self, data_id: str) -> str:
         data_doc = self.data_collection.find_one({"_id": data_id})
         if not data_doc:
@@ -285,7 +355,7 @@ class Memory:
         # For non-string data, return a simple description
         return f"Data of type {data_doc.get('data_type')} (no detailed summary available)"
     
-    def _generate_dataframe_summary(self, df: pd.DataFrame, data_doc: Dict[str, Any]) -> str:
+    def _generate_dataframe_summary(self, df: "pd.DataFrame", data_doc: Dict[str, Any]) -> str:
         shape = data_doc.get("shape", list(df.shape))
         columns = data_doc.get("columns", list(df.columns))
         
@@ -314,6 +384,7 @@ class Memory:
         
         return summary
     
+    @timed("memory")
     def get_data_section(self, data_id: str, start_line: int = 0, num_lines: int = 20) -> str:
         data_doc = self.data_collection.find_one({"_id": data_id})
         if not data_doc:
@@ -354,6 +425,7 @@ class Memory:
         return (f"Lines {start_line+1}-{end_line} of {total_lines} from data {data_id}:\n\n" 
                f"{section}")
     
+    @timed("memory")
     def search_data(self, data_id: str, search_term: str) -> str:
         data_doc = self.data_collection.find_one({"_id": data_id})
         if not data_doc:
@@ -364,6 +436,8 @@ class Memory:
             try:
                 df = self._get_dataframe(data_id)
                 if df is not None:
+                    import pandas as pd
+
                     # Convert all columns to string for searching
                     result_df = None
                     for col in df.columns:
@@ -419,6 +493,7 @@ class Memory:
 
         return result
     
+    @timed("memory")
     def list_data(self, data_type: str = None, agent_id: str = None) -> str:
         # Build query filter
         query = {}
@@ -467,13 +542,15 @@ class Memory:
 
         return output
     
+    @timed("memory")
     def store_code_snippet(self, code: str, 
                           plugin_id: str = None,
                           tsg_name: str = None,
                           parameters: Dict[str, Any] = None,
-                          description: str = None) -> str:
+                          description: str = None,
+                          snippet_id: str = None) -> str:
 
-        snippet_id = str(uuid.uuid4())
+        snippet_id = snippet_id or str(uuid.uuid4())
         timestamp = datetime.now().isoformat()
 
         snippet_doc = {
@@ -490,12 +567,90 @@ class Memory:
 
         return snippet_id
     
+    def store_code_snippet_async(self, code: str,
+                                plugin_id: str = None,
+                                tsg_name: str = None,
+                                parameters: Dict[str, Any] = None,
+                                description: str = None) -> str:
+        """
+        Store a code snippet in a background thread; get_code_snippet() waits for the write
+
+        Returns:
+            ID the snippet is stored under
+        """
+        snippet_id = str(uuid.uuid4())
+        _submit_background_write(
+            self.store_code_snippet,
+            code, plugin_id=plugin_id, tsg_name=tsg_name, parameters=parameters,
+            description=description, snippet_id=snippet_id, document_id=snippet_id
+        )
+        return snippet_id
+
+    @timed("memory")
     def get_code_snippet(self, snippet_id: str) -> Optional[str]:
+        # The snippet may have been returned by store_code_snippet_async before it was written
+        _wait_for_write(snippet_id)
         snippet = self.code_snippets_collection.find_one({"_id": snippet_id})
         if snippet:
             return snippet.get("code")
         return None
     
+    def export_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Export a data item or code snippet of this session, so that it can be imported into another session
+
+        Args:
+            document_id: Data ID or snippet ID
+
+        Returns:
+            Exported document with its "kind" (data, dataframe or code_snippet), or None if
+            the ID is neither a data item nor a code snippet of this session
+        """
+        _wait_for_write(document_id)
+        snippet = self.code_snippets_collection.find_one({"_id": document_id})
+        if snippet:
+            return {"kind": "code_snippet", "document": {key: value for key, value in snippet.items() if key != "_id"}}
+
+        data_doc = self.data_collection.find_one({"_id": document_id})
+        if not data_doc:
+            return None
+        document = {key: value for key, value in data_doc.items() if key not in ("_id", "summary")}
+        if data_doc.get("is_df", False):
+            df = self._get_dataframe(document_id)
+            if df is None:
+                return None
+            return {"kind": "dataframe", "document": document, "dataframe": pickle.dumps(df)}
+        return {"kind": "data", "document": document}
+
+    def import_document(self, exported: Dict[str, Any], agent_id: str = None) -> str:
+        """
+        Store a document exported by export_document() under a new ID
+
+        Args:
+            exported: Exported document
+            agent_id: Agent the imported data is attributed to
+
+        Returns:
+            ID of the imported document
+        """
+        document = exported["document"]
+        if exported["kind"] == "code_snippet":
+            return self.store_code_snippet(
+                code=document.get("code"),
+                plugin_id=document.get("plugin_id"),
+                tsg_name=document.get("tsg_name"),
+                parameters=document.get("parameters"),
+                description=document.get("description")
+            )
+        data = pickle.loads(exported["dataframe"]) if exported["kind"] == "dataframe" else document.get("data")
+        return self.add_data(
+            data=data,
+            data_type=document.get("data_type"),
+            agent_id=agent_id,
+            metadata=document.get("metadata"),
+            description=document.get("description")
+        )
+
     def _generate_summary(self, text: Any) -> str:
         # Handle string-type data
         if isinstance(text, str):
@@ -529,6 +684,7 @@ class Memory:
         # Handle other type data
         return f"Data type: {type(text).__name__}, Summary not available"
     
+    @timed("memory")
     def get_data_by_key(self, key: str) -> Any:
 
         data_doc = self.data_collection.find_one({"metadata.key": key})
@@ -539,6 +695,7 @@ class Memory:
             return data_doc.get("data")
         return None
     
+    @timed("memory")
     def update_data_by_key(self, key: str, data: Any, data_type: str = None, description: str = None) -> str:
         # Find existing data by key
         existing_doc = self.data_collection.find_one({"metadata.key": key})
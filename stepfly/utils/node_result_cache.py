@@ -0,0 +1,229 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+import pymongo
+
+from stepfly.utils.config_loader import config
+
+
+# Data and snippet IDs of a session's memory
+_DOCUMENT_ID_PATTERN = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b")
+
+
+def referenced_ids(value: Any) -> List[str]:
+    """IDs mentioned anywhere in a JSON-serializable value, in order of first mention"""
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    return list(dict.fromkeys(_DOCUMENT_ID_PATTERN.findall(text)))
+
+
+def replace_ids(value: Any, mapping: Dict[str, str]) -> Any:
+    """Replace IDs mentioned anywhere in a JSON-serializable value"""
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    return json.loads(_DOCUMENT_ID_PATTERN.sub(lambda match: mapping.get(match.group(0), match.group(0)), text))
+
+
+# Parameters a TSG asks to collect, listed as "- `name`: description"
+_TSG_PARAMETER_PATTERN = re.compile(r"^\s*[-*]\s*`(\w+)`\s*:", re.MULTILINE)
+
+
+def tsg_parameter_names(tsg_content: str) -> List[str]:
+    """Names of the parameters listed in a TSG"""
+    return sorted(set(_TSG_PARAMETER_PATTERN.findall(tsg_content)))
+
+
+def _normalize_parameter_value(value: Any) -> str:
+    # A stated value ends at the end of the sentence or at a parenthetical remark
+    text = re.split(r"\.\s|\s\(", str(value))[0].strip().strip("*.").strip()
+    # ISO and SQL timestamps of the same time are the same parameter
+    return re.sub(r"(\d)T(\d)", r"\1 \2", text).rstrip("Z")
+
+
+def extract_incident_parameters(names: List[str], results: List[str],
+                                plugin_calls: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Extract the values of incident parameters from finished steps
+
+    Values passed to plugins are used as they are. Parameters no plugin received yet are
+    read from step results that state them as "name: value" or "name = value".
+
+    Args:
+        names: Parameter names used by the TSG and its plugins
+        results: Result texts of finished steps
+        plugin_calls: Parameters of the plugin calls of finished steps
+
+    Returns:
+        Sorted distinct values of each parameter that was found
+    """
+    parameters = {}
+    for name in names:
+        values = {_normalize_parameter_value(call[name]) for call in plugin_calls if call.get(name) not in (None, "")}
+        if not values:
+            pattern = re.compile(rf"\b{re.escape(name)}\b[`\"'*]*\s*(?:[:=]|\bis\b)\s*[`\"'*]*([^`\"'*\n,;|]+)")
+            values = {_normalize_parameter_value(match) for text in results for match in pattern.findall(text)}
+        values.discard("")
+        if values:
+            parameters[name] = sorted(values)
+    return parameters
+
+
+def fingerprint_data_source(path: str) -> Dict[str, Any]:
+    """
+    Fingerprint a file-based data source (e.g. a SQLite database) by its size and modification time
+
+    Args:
+        path: Path to the data source
+
+    Returns:
+        Fingerprint dictionary
+    """
+    abs_path = os.path.abspath(path)
+    if not os.path.exists(abs_path):
+        return {"path": abs_path, "missing": True}
+
+    stat = os.stat(abs_path)
+    return {"path": abs_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class NodeResultCache:
+    """
+    Cross-session cache of finished node results stored in MongoDB.
+
+    An entry is keyed by the TSG version, the node name and the node's input parameters.
+    It also records fingerprints of the data sources the node touched; an entry whose data
+    sources changed since it was stored is treated as a miss and dropped. Memory is separate
+    per session, so an entry carries copies of the data items and code snippets its result
+    and conversation refer to, to be imported into the session that uses it.
+    """
+
+    def __init__(self):
+        memory_config = config.get_section("memory_database")
+        cache_config = config.get_section("scheduler.node_cache")
+
+        host = memory_config.get("host", "localhost")
+        port = memory_config.get("port", 27017)
+
+        self.client = pymongo.MongoClient(f"mongodb://{host}:{port}/")
+        # Not prefixed with "tsg_agent_db" so that Memory.reset_database() keeps the cache
+        self.db = self.client[cache_config.get("database", "stepfly_cache")]
+        self.results_collection = self.db["node_results"]
+
+    @staticmethod
+    def tsg_version(tsg_content: str) -> str:
+        """Version of a TSG, derived from its loaded content"""
+        return hashlib.sha256(tsg_content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def build_key(tsg_version: str, node_name: str, parameters: Dict[str, Any]) -> str:
+        """Build the cache key of a node"""
+        key_material = json.dumps(
+            {"tsg_version": tsg_version, "node": node_name, "parameters": parameters},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached node result
+
+        Returns:
+            The cache entry, or None on a miss or when the data sources changed
+        """
+        entry = self.results_collection.find_one({"_id": key})
+        if not entry:
+            return None
+        if "documents" not in entry:
+            # Stored without the memory documents it refers to, which only exist in the original session
+            self.results_collection.delete_one({"_id": key})
+            return None
+
+        for fingerprint in entry.get("data_fingerprint", []):
+            if fingerprint_data_source(fingerprint["path"]) != fingerprint:
+                logging.info(f"Data source {fingerprint['path']} changed, dropping cached result for {entry['node']}")
+                self.results_collection.delete_one({"_id": key})
+                return None
+
+        self.results_collection.update_one(
+            {"_id": key},
+            {"$inc": {"hit_count": 1}, "$set": {"last_hit_at": datetime.now().isoformat()}}
+        )
+        return entry
+
+    def store(self, key: str, tsg_name: str, tsg_version: str, node_name: str,
+              parameters: Dict[str, Any], result: Dict[str, Any],
+              conversation: List[Dict[str, Any]], data_sources: List[str],
+              documents: List[Dict[str, Any]]) -> None:
+        """
+        Store a finished node result
+
+        Args:
+            key: Cache key from build_key()
+            tsg_name: Name of the TSG, used for invalidation
+            tsg_version: Version of the TSG
+            node_name: Name of the node
+            parameters: Parameters the key was built from
+            result: Executor result (result, status, set_edge_status)
+            conversation: Executor conversation messages
+            data_sources: Paths of the data sources the node touched
+            documents: Memory documents referred to by the result and conversation, from
+                Memory.export_document() with their original "id"
+        """
+        self.results_collection.replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "tsg_name": tsg_name,
+                "tsg_version": tsg_version,
+                "node": node_name,
+                "parameters": parameters,
+                "result": result,
+                "conversation": conversation,
+                "documents": documents,
+                "data_fingerprint": [fingerprint_data_source(path) for path in sorted(set(data_sources))],
+                "created_at": datetime.now().isoformat(),
+                "hit_count": 0
+            },
+            upsert=True
+        )
+
+    def invalidate(self, tsg_name: Optional[str] = None, node_name: Optional[str] = None) -> int:
+        """
+        Remove cached results, optionally restricted to a TSG and/or a node
+
+        Returns:
+            Number of removed entries
+        """
+        query = {}
+        if tsg_name:
+            query["tsg_name"] = tsg_name
+        if node_name:
+            query["node"] = node_name
+        return self.results_collection.delete_many(query).deleted_count
+
+
+def main():
+    """Command line entry point for explicit cache invalidation"""
+    parser = argparse.ArgumentParser(description='StepFly node result cache')
+    parser.add_argument('--clear', action='store_true', help='Remove cached node results')
+    parser.add_argument('--tsg', type=str, help='Only remove results of this TSG')
+    parser.add_argument('--node', type=str, help='Only remove results of this node')
+
+    args = parser.parse_args()
+
+    if not args.clear:
+        parser.print_help()
+        return
+
+    removed = NodeResultCache().invalidate(tsg_name=args.tsg, node_name=args.node)
+    print(f"Removed {removed} cached node results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+from typing import Dict, Any, Tuple
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from stepfly.utils.config_loader import config
+
+# Process-wide clients: every agent of a process shares one connection pool per endpoint.
+# Keys include the PID so that a forked child never reuses its parent's connections.
+_clients: Dict[Tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _http_settings() -> Dict[str, Any]:
+    return config.get_section("llm.http")
+
+
+def _use_http2() -> bool:
+    """HTTP/2 if enabled and the h2 package is installed; httpx negotiates it via ALPN and falls back to HTTP/1.1"""
+    setting = _http_settings().get("http2", "auto")
+    if setting is False:
+        return False
+    available = importlib.util.find_spec("h2") is not None
+    if setting is True and not available:
+        logging.warning("llm.http.http2 is enabled but the h2 package is not installed, using HTTP/1.1")
+    return available
+
+
+def _httpx_options() -> Dict[str, Any]:
+    settings = _http_settings()
+    return {
+        "http2": _use_http2(),
+        "limits": httpx.Limits(
+            max_connections=settings.get("max_connections", 20),
+            max_keepalive_connections=settings.get("max_keepalive_connections", 10),
+            keepalive_expiry=settings.get("keepalive_expiry", 60)
+        ),
+        "timeout": httpx.Timeout(
+            settings.get("timeout", 600),
+            connect=settings.get("connect_timeout", 10)
+        )
+    }
+
+
+def _warm_up(http_client: httpx.Client, api_base: str, api_key: str) -> None:
+    """Open a keep-alive connection (DNS, TCP and TLS) ahead of the first completion request"""
+    try:
+        http_client.get(f"{api_base.rstrip('/')}/models", headers={"Authorization": f"Bearer {api_key}"})
+    except Exception as e:
+        logging.debug(f"LLM connection warm-up failed: {str(e)}")
+
+
+def get_openai_client(api_base: str, api_key: str, max_retries: int = 2) -> OpenAI:
+    """
+    Get the shared OpenAI client of this process for an endpoint
+
+    Args:
+        api_base: Base URL of the API
+        api_key: API key
+        max_retries: Retries of the OpenAI SDK
+
+    Returns:
+        OpenAI client backed by a shared keep-alive connection pool
+    """
+    key = ("sync", api_base, api_key, max_retries, os.getpid())
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+
+        http_client = httpx.Client(**_httpx_options())
+        client = OpenAI(base_url=api_base, api_key=api_key, max_retries=max_retries, http_client=http_client)
+        _clients[key] = client
+
+    if _http_settings().get("warm_up", True):
+        threading.Thread(target=_warm_up, args=(http_client, api_base, api_key), daemon=True).start()
+    return client
+
+
+def get_async_openai_client(api_base: str, api_key: str, max_retries: int = 2) -> AsyncOpenAI:
+    """
+    Get the shared AsyncOpenAI client of this process for an endpoint and the running event loop
+
+    Async connection pools are bound to the event loop they were created in, so each loop gets its own client.
+
+    Returns:
+        AsyncOpenAI client backed by a shared keep-alive connection pool
+    """
+    loop = asyncio.get_running_loop()
+    key = ("async", api_base, api_key, max_retries, os.getpid(), id(loop))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                base_url=api_base,
+                api_key=api_key,
+                max_retries=max_retries,
+                http_client=httpx.AsyncClient(**_httpx_options())
+            )
+            _clients[key] = client
+        return client
@@ -0,0 +1,114 @@
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable
+
+# Per-process timing statistics: {category: {operation: {"count", "total_seconds", "max_seconds"}}}
+_stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+_stats_lock = threading.Lock()
+# Nested calls within the same category (e.g. update_data_by_key -> add_data) are only counted once
+_active = threading.local()
+
+
+def _record(category: str, operation: str, elapsed: float) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(category, {}).setdefault(
+            operation, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        entry["count"] += 1
+        entry["total_seconds"] += elapsed
+        entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+
+def timed(category: str) -> Callable:
+    """
+    Decorator that accumulates call counts and wall time of a function under a category
+
+    Args:
+        category: Category the timing is accounted to (e.g. "memory", "sql")
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        operation = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            depth = getattr(_active, category, 0)
+            if depth:
+                return func(*args, **kwargs)
+
+            setattr(_active, category, 1)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(category, operation, time.perf_counter() - start)
+                setattr(_active, category, 0)
+
+        return wrapper
+
+    return decorator
+
+
+def get_perf_stats() -> Dict[str, Any]:
+    """Return a copy of the statistics collected in this process"""
+    with _stats_lock:
+        return {
+            category: {operation: dict(entry) for operation, entry in operations.items()}
+            for category, operations in _stats.items()
+        }
+
+
+def flush_perf_stats(session_id: str, agent_name: str) -> str:
+    """
+    Write the statistics collected in this process to the session trace and reset them
+
+    Args:
+        session_id: Session the statistics belong to
+        agent_name: Name of the agent that ran in this process
+
+    Returns:
+        Path of the written file, or an empty string if nothing was collected
+    """
+    with _stats_lock:
+        stats = {
+            category: {operation: dict(entry) for operation, entry in operations.items()}
+            for category, operations in _stats.items()
+        }
+        _stats.clear()
+
+    if not stats:
+        return ""
+
+    stats_dir = os.path.join(os.getcwd(), "trace", session_id, "perf_stats")
+    os.makedirs(stats_dir, exist_ok=True)
+
+    file_path = os.path.join(stats_dir, f"{agent_name}_{os.getpid()}.json")
+
+    # An agent may flush several times from the same process, so merge with earlier flushes
+    if os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f).get("stats", {})
+        for category, operations in previous.items():
+            for operation, entry in operations.items():
+                merged = stats.setdefault(category, {}).setdefault(
+                    operation, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+                )
+                merged["count"] += entry["count"]
+                merged["total_seconds"] += entry["total_seconds"]
+                merged["max_seconds"] = max(merged["max_seconds"], entry["max_seconds"])
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "agent": agent_name,
+            "pid": os.getpid(),
+            "updated_at": datetime.now().isoformat(),
+            "stats": stats
+        }, f, indent=2)
+
+    return file_path
@@ -0,0 +1,237 @@
+import datetime
+import importlib
+import json
+import re
+import sys
+import types
+from typing import Any, Dict, List, Optional, Set, Tuple, TextIO
+
+MEGABYTE = 1024 * 1024
+
+# Names of the environment that are not taken from the allowed modules
+_ENVIRONMENT_NAMES = ["pd", "np", "scipy", "re", "datetime", "json", "pymongo", "pma"]
+
+
+def execution_environment(memory: Any, stdout: TextIO, allowed_modules: List[str]) -> Dict[str, Any]:
+    """
+    Modules and helpers provided to generated code
+
+    Args:
+        memory: Memory of the session, available to the code as `memory`
+        stdout: Stream receiving the output of print()
+        allowed_modules: Further modules available to the code by their name
+
+    Returns:
+        Globals to execute the code with
+    """
+    # The data libraries are imported on first execution rather than when the tool is loaded
+    import numpy as np
+    import pandas as pd
+    import pymongo
+    import pymongoarrow as pma
+    import scipy
+
+    environment = {
+        "pd": pd,
+        "np": np,
+        "scipy": scipy,
+        "re": re,
+        "datetime": datetime,
+        "json": json,
+        "pymongo": pymongo,
+        "pma": pma,  # PyMongoArrow
+        "memory": memory,  # Provide access to the memory system
+        "__builtins__": __builtins__,
+        "print": lambda *args, **kwargs: print(*args, **kwargs, file=stdout)
+    }
+    for module_name in allowed_modules:
+        if module_name not in _ENVIRONMENT_NAMES:  # Already imported
+            environment[module_name] = importlib.import_module(module_name)
+    return environment
+
+
+def environment_names(allowed_modules: List[str]) -> Set[str]:
+    """Names provided to generated code by execution_environment()"""
+    return set(_ENVIRONMENT_NAMES) | {"memory", "print"} | set(allowed_modules)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory held by a kernel variable
+
+    DataFrames and Series report their deep memory usage, arrays their buffer size; containers
+    count their direct elements. Modules, functions and classes are shared and count as 0.
+
+    Returns:
+        Estimated size in bytes
+    """
+    if isinstance(value, (types.ModuleType, types.FunctionType, type)):
+        return 0
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(deep=True)
+            return int(usage.sum() if hasattr(usage, "sum") else usage)
+        except Exception:
+            pass
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(key) + sys.getsizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+def referenced_names(code: types.CodeType) -> Set[str]:
+    """Global names used by compiled code, including nested functions and comprehensions"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= referenced_names(const)
+    return names
+
+
+def describe_value(value: Any) -> str:
+    """Short type description of a kernel variable for prompts"""
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple):
+        columns = getattr(value, "columns", None)
+        description = f"{type(value).__name__} with shape {shape}"
+        if columns is not None:
+            description += f", columns {list(columns)[:20]}"
+        return description
+    if isinstance(value, (list, tuple, dict, set)):
+        return f"{type(value).__name__} of {len(value)} items"
+    if isinstance(value, (str, int, float, bool)):
+        text = repr(value)
+        return f"{type(value).__name__} {text[:80] + '...' if len(text) > 80 else text}"
+    return type(value).__name__
+
+
+class PythonKernel:
+    """
+    Python namespace of the code interpreter kept between executions of one executor step.
+
+    Variables and functions defined by earlier code, and data loaded from memory, stay available
+    to later code of the same step, so that it neither reloads data nor recomputes intermediate
+    results. The kernel is bounded: a variable larger than max_variable_bytes is not kept, and
+    when the kernel exceeds max_bytes the least recently used variables are evicted.
+    """
+
+    def __init__(self, max_bytes: int, max_variable_bytes: int):
+        """
+        Args:
+            max_bytes: Memory budget of all kept variables
+            max_variable_bytes: Largest variable that is kept
+        """
+        self.max_bytes = max_bytes
+        self.max_variable_bytes = max_variable_bytes
+        # Executions share one globals dictionary, so functions defined earlier see later state
+        self.namespace: Dict[str, Any] = {}
+        self.last_evicted: List[Tuple[str, int]] = []
+        self._reserved: Set[str] = set()
+        self._sizes: Dict[str, int] = {}
+        self._last_used: Dict[str, int] = {}
+        self._clock = 0
+
+    @property
+    def variables(self) -> Dict[str, Any]:
+        """Variables kept by the kernel, without the environment provided to every execution"""
+        return {
+            name: value for name, value in self.namespace.items()
+            if not name.startswith("_") and name not in self._reserved and not isinstance(value, types.ModuleType)
+        }
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.variables
+
+    def get(self, name: str) -> Optional[Any]:
+        return self.variables.get(name)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def describe(self) -> Dict[str, str]:
+        """
+        Describe the kept variables for the code generator
+
+        Returns:
+            Dictionary mapping variable names to short type descriptions
+        """
+        return {name: describe_value(value) for name, value in self.variables.items()}
+
+    def run(self, code: str, environment: Dict[str, Any], data: Optional[Dict[str, Any]] = None) -> List[Tuple[str, int]]:
+        """
+        Execute code in the kernel
+
+        Exceptions of the code are raised after the memory limits were enforced; variables
+        assigned before the exception are kept.
+
+        Args:
+            code: Python code
+            environment: Modules and helpers provided to every execution, never counted as variables
+            data: Data loaded for this execution, kept like variables
+
+        Returns:
+            Variables evicted to stay within the memory limits, as (name, estimated bytes)
+        """
+        compiled = compile(code, "<code_interpreter>", "exec")
+        self._reserved = set(environment)
+        self.namespace.update(environment)
+        if data:
+            self.namespace.update(data)
+
+        self._clock += 1
+        for name in referenced_names(compiled) | set(data or ()):
+            self._last_used[name] = self._clock
+        try:
+            exec(compiled, self.namespace)
+        finally:
+            self.last_evicted = self._enforce_limits()
+        return self.last_evicted
+
+    def _enforce_limits(self) -> List[Tuple[str, int]]:
+        variables = self.variables
+        for name in [name for name in self._last_used if name not in variables]:
+            # Deleted by the code, or not a variable
+            self._forget(name)
+
+        evicted = []
+        for name, value in variables.items():
+            # Objects used by this execution may have grown in place, others are sized once
+            if name in self._sizes and self._last_used[name] != self._clock:
+                continue
+            self._last_used.setdefault(name, self._clock)
+            size = estimate_size(value)
+            if size > self.max_variable_bytes:
+                self._evict(name)
+                evicted.append((name, size))
+                continue
+            self._sizes[name] = size
+
+        while self.total_bytes > self.max_bytes:
+            name = min(self._sizes, key=lambda item: (self._last_used[item], -self._sizes[item]))
+            evicted.append((name, self._sizes[name]))
+            self._evict(name)
+        return evicted
+
+    def _evict(self, name: str) -> None:
+        self.namespace.pop(name, None)
+        self._forget(name)
+
+    def _forget(self, name: str) -> None:
+        self._sizes.pop(name, None)
+        self._last_used.pop(name, None)
+
+    def reset(self) -> None:
+        """Drop all variables"""
+        self.namespace.clear()
+        self.last_evicted = []
+        self._reserved = set()
+        self._sizes.clear()
+        self._last_used.clear()
+        self._clock = 0
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import openai
+
+from stepfly.utils.config_loader import config
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, the file bucket then only coordinates threads
+    fcntl = None
+
+
+def _take(state: Dict[str, Any], limits: Dict[str, Optional[float]], cost: Dict[str, float],
+          now: float) -> Tuple[Dict[str, Any], float]:
+    """
+    Refill the buckets and take the cost if every bucket holds enough
+
+    Args:
+        state: Bucket levels {"requests": float, "tokens": float, "updated": float}
+        limits: Per-minute limit of each bucket, None for unlimited
+        cost: Amount to take from each bucket
+
+    Returns:
+        Tuple of (new state, seconds to wait before retrying; 0 if the cost was taken)
+    """
+    elapsed = max(0.0, now - state.get("updated", now))
+    new_state = {"updated": now}
+    wait = 0.0
+    for bucket, limit in limits.items():
+        if not limit:
+            continue
+        level = min(limit, state.get(bucket, limit) + elapsed * limit / 60)
+        new_state[bucket] = level
+        # A single request larger than the bucket only waits for a full bucket
+        needed = min(cost.get(bucket, 0), limit)
+        if level < needed:
+            wait = max(wait, (needed - level) * 60 / limit)
+
+    if wait == 0:
+        for bucket, limit in limits.items():
+            if limit:
+                new_state[bucket] -= cost.get(bucket, 0)
+    return new_state, wait
+
+
+class FileTokenBucket:
+    """Request and token buckets shared by all processes of a host through a locked state file"""
+
+    def __init__(self, limits: Dict[str, Optional[float]], state_path: str):
+        self.limits = limits
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _update(self, cost: Dict[str, float], force: bool = False) -> float:
+        with self._lock, open(self.state_path, "a+", encoding="utf-8") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                state = json.loads(content) if content.strip() else {}
+                new_state, wait = _take(state, self.limits, cost, time.time())
+                if wait and force:
+                    # Adjustments always apply, the bucket may go negative
+                    for bucket, limit in self.limits.items():
+                        if limit:
+                            new_state[bucket] -= cost.get(bucket, 0)
+                    wait = 0
+                if not wait:
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(new_state, f)
+                    f.flush()
+                return wait
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def try_acquire(self, cost: Dict[str, float]) -> float:
+        return self._update(cost)
+
+    def adjust(self, cost: Dict[str, float]) -> None:
+        self._update(cost, force=True)
+
+
+class MongoTokenBucket:
+    """Request and token buckets shared by all hosts through an optimistically locked MongoDB document"""
+
+    def __init__(self, limits: Dict[str, Optional[float]], database: str):
+        import pymongo
+
+        memory_config = config.get_section("memory_database")
+        host = memory_config.get("host", "localhost")
+        port = memory_config.get("port", 27017)
+        self.collection = pymongo.MongoClient(f"mongodb://{host}:{port}/")[database]["llm_rate_limit"]
+        self.limits = limits
+
+    def _update(self, cost: Dict[str, float], force: bool = False) -> float:
+        while True:
+            document = self.collection.find_one({"_id": "llm"}) or {"_id": "llm", "version": 0}
+            new_state, wait = _take(document, self.limits, cost, time.time())
+            if wait and force:
+                for bucket, limit in self.limits.items():
+                    if limit:
+                        new_state[bucket] -= cost.get(bucket, 0)
+                wait = 0
+            if wait:
+                return wait
+
+            version = document.get("version", 0)
+            result = self.collection.update_one(
+                {"_id": "llm", "version": version},
+                {"$set": {**new_state, "version": version + 1}},
+                upsert=version == 0
+            )
+            if result.modified_count or result.upserted_id is not None:
+                return 0
+            # Another process updated the bucket in the meantime, retry with fresh state
+
+    def try_acquire(self, cost: Dict[str, float]) -> float:
+        try:
+            return self._update(cost)
+        except Exception as e:
+            # A duplicate key on the initial upsert means another process created the document first
+            logging.debug(f"Rate limit update conflict: {str(e)}")
+            return 0.05
+
+    def adjust(self, cost: Dict[str, float]) -> None:
+        try:
+            self._update(cost, force=True)
+        except Exception as e:
+            logging.debug(f"Rate limit adjustment failed: {str(e)}")
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter for LLM calls.
+
+    Token cost is taken from an estimate before the request and corrected with the actual usage afterwards.
+    """
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """
+        Block until the request fits into the limits
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        cost = {"requests": 1, "tokens": estimated_tokens}
+        while True:
+            wait = self.bucket.try_acquire(cost)
+            if not wait:
+                return time.monotonic() - start
+            time.sleep(min(wait, 1.0) + random.uniform(0, 0.05))
+
+    def adjust(self, token_delta: int) -> None:
+        """Correct the token bucket once the actual usage of a request is known"""
+        if token_delta:
+            self.bucket.adjust({"tokens": token_delta})
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """
+    Get the rate limiter of this process
+
+    Returns:
+        RateLimiter, or None when no limits are configured
+    """
+    global _rate_limiter
+    rate_config = config.get_section("llm.rate_limit")
+    limits = {
+        "requests": rate_config.get("requests_per_minute"),
+        "tokens": rate_config.get("tokens_per_minute")
+    }
+    if not any(limits.values()):
+        return None
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            if rate_config.get("backend", "file") == "mongo":
+                bucket = MongoTokenBucket(limits, rate_config.get("database", "stepfly_rate_limit"))
+            else:
+                bucket = FileTokenBucket(limits, rate_config.get("state_path", "./.cache/llm_rate_limit.json"))
+            _rate_limiter = RateLimiter(bucket)
+        return _rate_limiter
+
+
+class RetryPolicy:
+    """Retry of failed LLM requests with jittered exponential backoff, honoring Retry-After"""
+
+    RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+    def __init__(self):
+        retry_config = config.get_section("llm.retry")
+        self.max_retries = retry_config.get("max_retries", 5)
+        self.base_delay = retry_config.get("base_delay", 1.0)
+        self.max_delay = retry_config.get("max_delay", 60.0)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        headers = response.headers
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except ValueError:
+            # HTTP-date form of Retry-After, fall back to backoff
+            return None
+        return None
+
+    def delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Delay before retrying a failed request
+
+        Args:
+            attempt: Number of retries already made
+            error: Error of the failed request
+
+        Returns:
+            Seconds to wait, or None if the request should not be retried
+        """
+        if attempt >= self.max_retries or not isinstance(error, self.RETRYABLE_ERRORS):
+            return None
+
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return backoff
@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from stepfly.utils.memory import Memory
+from stepfly.utils.perf_stats import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Default database queried by plugins and SQL queries without an explicit database_path
+DEFAULT_DATABASE_PATH = "./demo_data/distributed_system.db"
+
+
+class SQLEngine:
+    """
+    SQL execution shared by sql_query_tool and plugin tools.
+
+    Connections are pooled per database and reused for later queries, instead of connecting
+    for every query. A query holds its connection until it finishes, so queries of different
+    threads never share a connection, and a connection warmed in one thread is used by the next.
+    """
+
+    def __init__(self):
+        self._idle: Dict[str, List[sqlite3.Connection]] = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, db_path: str) -> Tuple[str, sqlite3.Connection]:
+        key = os.path.abspath(db_path)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return key, idle.pop()
+        if not os.path.exists(key):
+            raise FileNotFoundError(f"Database file not found at path: {db_path}")
+        return key, sqlite3.connect(key, check_same_thread=False)
+
+    def _release(self, key: str, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._idle.setdefault(key, []).append(conn)
+
+    def warm(self, db_path: str) -> None:
+        """
+        Prepare a query on a database: import pandas and open a pooled connection
+
+        Args:
+            db_path: Path of the SQLite database
+        """
+        import pandas  # noqa: F401
+
+        try:
+            key, conn = self._acquire(db_path)
+        except FileNotFoundError:
+            # Reported by the query itself
+            return
+        try:
+            # Reads the schema, which the first query would otherwise do
+            conn.execute("SELECT name FROM sqlite_master LIMIT 1").fetchall()
+        finally:
+            self._release(key, conn)
+
+    @timed("sql")
+    def execute(self, query: str, db_path: str) -> Optional["pd.DataFrame"]:
+        """
+        Execute a SQL query
+
+        Args:
+            query: SQL query
+            db_path: Path of the SQLite database
+
+        Returns:
+            DataFrame for SELECT/PRAGMA/WITH queries, None for other statements
+        """
+        key, conn = self._acquire(db_path)
+        try:
+            # For SELECT queries, return DataFrame
+            if (query.strip().upper().startswith('SELECT') or
+                    query.strip().upper().startswith('PRAGMA') or
+                    query.strip().upper().startswith('WITH')):
+                import pandas as pd
+                return pd.read_sql_query(query, conn)
+
+            # For other queries (INSERT, UPDATE, DELETE, etc.), execute and return None
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+            return None
+        finally:
+            self._release(key, conn)
+
+    def run_and_store(self, memory: Memory, query: str, database_path: Optional[str] = None,
+                      result_description: Optional[str] = None) -> str:
+        """
+        Execute a SQL query and store its result in memory
+
+        Args:
+            memory: Memory the result is stored in
+            query: SQL query
+            database_path: Path of the SQLite database, the demo database by default
+            result_description: Description of the stored result
+
+        Returns:
+            Observation with the memory ID and a summary of the result
+        """
+        db_path = database_path or DEFAULT_DATABASE_PATH
+        result_df = self.execute(query, db_path)
+
+        if result_df is None:
+            return "Query executed successfully (no results returned)."
+
+        if len(result_df) == 0:
+            return "Query executed successfully but returned no rows."
+
+        # Always store results in memory for analysis
+        result_id = memory.add_data(
+            data=result_df,
+            data_type="sql_result",
+            metadata={
+                "query": query,
+                "database": db_path,
+                "row_count": len(result_df),
+                "column_count": len(result_df.columns),
+                "columns": list(result_df.columns)
+            },
+            description=result_description or "SQL query result"
+        )
+
+        # Get data summary for context
+        summary = memory.get_data_summary(result_id)
+
+        # Return summary with memory reference
+        return (f"Query has been successfully executed. The query results are stored in memory with ID: {result_id}\n"
+                "The description of the result is as follows:\n"
+                f"Summary:\n{summary}\n\n")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_sql_engine() -> SQLEngine:
+    """Get the SQL engine of this process"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SQLEngine()
+        return _engine
@@ -0,0 +1,171 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+from typing import Dict, Any
+
+# Per-call usage fields -> per-agent totals
+_AGENT_SUMS = {
+    "input_tokens": "total_input_tokens",
+    "output_tokens": "total_output_tokens",
+    "total_tokens": "total_tokens",
+    "llm_seconds": "llm_seconds",
+    "cache_saved_tokens": "llm_cache_saved_tokens",
+    "hedges": "llm_hedges",
+    "hedge_estimated_tokens": "llm_hedge_estimated_tokens"
+}
+
+# Per-agent totals -> session totals
+_SESSION_SUMS = {
+    "total_input_tokens": "session_total_input_tokens",
+    "total_output_tokens": "session_total_output_tokens",
+    "total_tokens": "session_total_tokens",
+    "llm_calls_count": "session_total_llm_calls",
+    "llm_seconds": "session_total_llm_seconds",
+    "llm_cache_hits": "session_total_llm_cache_hits",
+    "llm_cache_misses": "session_total_llm_cache_misses",
+    "llm_cache_saved_tokens": "session_total_llm_cache_saved_tokens",
+    "llm_hedges": "session_total_llm_hedges",
+    "llm_hedge_estimated_tokens": "session_total_llm_hedge_estimated_tokens"
+}
+
+
+def _usage_dir(session_id: str) -> str:
+    return os.path.join(os.getcwd(), "trace", session_id, "token_usage")
+
+
+def append_usage_event(session_id: str, agent_key: str, agent_start_time: str, usage_info: Dict[str, Any]) -> None:
+    """
+    Append the usage of one LLM call to the agent's usage log
+
+    Each event is a single write to a file opened in append mode, so concurrent
+    writers never lose or interleave events and no read or fsync is needed.
+
+    Args:
+        session_id: Session ID
+        agent_key: Agent identifier, e.g. "Executor_<id>" or "code_generator"
+        agent_start_time: ISO start time of the agent
+        usage_info: Usage returned by the LLM client
+    """
+    usage_dir = _usage_dir(session_id)
+    os.makedirs(usage_dir, exist_ok=True)
+    event = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "agent": agent_key,
+        "agent_start_time": agent_start_time,
+        "usage": usage_info
+    }
+    with open(os.path.join(usage_dir, f"{agent_key}.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def aggregate_token_usage(session_id: str) -> Dict[str, Any]:
+    """
+    Aggregate the usage events of a session
+
+    Args:
+        session_id: Session ID
+
+    Returns:
+        Dictionary with "session_totals" and per-agent totals, in the format of token_time_usage.json
+    """
+    agents = {}
+    for usage_file in sorted(glob.glob(os.path.join(_usage_dir(session_id), "*.jsonl"))):
+        with open(usage_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partially written last line of a running agent
+                    continue
+                agent = agents.setdefault(event["agent"], {
+                    "total_input_tokens": 0,
+                    "total_output_tokens": 0,
+                    "total_tokens": 0,
+                    "llm_calls_count": 0,
+                    "llm_seconds": 0,
+                    "llm_cache_hits": 0,
+                    "llm_cache_misses": 0,
+                    "llm_cache_saved_tokens": 0,
+                    "llm_hedges": 0,
+                    "llm_hedge_estimated_tokens": 0,
+                    "start_time": event.get("agent_start_time"),
+                    "end_time": None,
+                    "duration_seconds": 0
+                })
+                usage = event.get("usage", {})
+                for usage_field, agent_field in _AGENT_SUMS.items():
+                    agent[agent_field] += usage.get(usage_field, 0)
+                agent["llm_calls_count"] += 1
+                if "cache_hit" in usage:
+                    agent["llm_cache_hits" if usage["cache_hit"] else "llm_cache_misses"] += 1
+                if event.get("agent_start_time") and (not agent["start_time"] or event["agent_start_time"] < agent["start_time"]):
+                    agent["start_time"] = event["agent_start_time"]
+                if not agent["end_time"] or event["timestamp"] > agent["end_time"]:
+                    agent["end_time"] = event["timestamp"]
+
+    for agent in agents.values():
+        agent["last_updated"] = agent["end_time"]
+        if agent["start_time"] and agent["end_time"]:
+            start = datetime.datetime.fromisoformat(agent["start_time"])
+            end = datetime.datetime.fromisoformat(agent["end_time"])
+            agent["duration_seconds"] = (end - start).total_seconds()
+
+    session_totals = {
+        session_field: sum(agent.get(agent_field, 0) for agent in agents.values())
+        for agent_field, session_field in _SESSION_SUMS.items()
+    }
+    session_totals["last_updated"] = datetime.datetime.now().isoformat()
+
+    # Simple metrics for all executors and code_generator (excluding scheduler)
+    executor_agents = [agent for key, agent in agents.items() if key.startswith("Executor_") or key == "code_generator"]
+    if executor_agents:
+        session_totals["total_executor_input_tokens"] = sum(agent["total_input_tokens"] for agent in executor_agents)
+        session_totals["total_executor_output_tokens"] = sum(agent["total_output_tokens"] for agent in executor_agents)
+        session_totals["total_executor_total_tokens"] = sum(agent["total_tokens"] for agent in executor_agents)
+        session_totals["total_executor_llm_calls"] = sum(agent["llm_calls_count"] for agent in executor_agents)
+
+        # Total executor duration, from the earliest start to the latest end
+        start_times = [agent["start_time"] for agent in executor_agents if agent["start_time"]]
+        end_times = [agent["end_time"] for agent in executor_agents if agent["end_time"]]
+        if start_times and end_times:
+            duration = (datetime.datetime.fromisoformat(max(end_times)) -
+                        datetime.datetime.fromisoformat(min(start_times))).total_seconds()
+            session_totals["total_executor_duration_seconds"] = duration
+            session_totals["total_executor_duration_formatted"] = f"{int(duration//60)}m {int(duration%60)}s"
+
+    # session_totals first, then agents in sorted order
+    aggregated = {"session_totals": session_totals}
+    for key in sorted(agents):
+        aggregated[key] = agents[key]
+    return aggregated
+
+
+def write_token_usage_summary(session_id: str) -> Dict[str, Any]:
+    """
+    Aggregate the usage events of a session into trace/<session_id>/token_time_usage.json
+
+    Returns:
+        The aggregated usage
+    """
+    aggregated = aggregate_token_usage(session_id)
+    trace_dir = os.path.join(os.getcwd(), "trace", session_id)
+    os.makedirs(trace_dir, exist_ok=True)
+    with open(os.path.join(trace_dir, "token_time_usage.json"), "w", encoding="utf-8") as f:
+        json.dump(aggregated, f, indent=2, ensure_ascii=False)
+    return aggregated
+
+
+def main():
+    """Write token_time_usage.json of a session and print its totals"""
+    parser = argparse.ArgumentParser(description="Aggregate the token usage events of a StepFly session")
+    parser.add_argument("session_id", help="Session ID")
+    args = parser.parse_args()
+
+    aggregated = write_token_usage_summary(args.session_id)
+    print(json.dumps(aggregated["session_totals"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,286 @@
+import argparse
+import atexit
+import glob
+import hashlib
 import os
 import json
 import datetime
-from typing import List, Dict, Any, Optional
+import queue
+import threading
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from stepfly.utils.config_loader import config
+
+try:
+    import zstandard
+except ImportError:  # Optional, traces are written uncompressed without it
+    zstandard = None
+
+TRACE_LOG_SUFFIX = ".trace.jsonl"
+# Lists that only grow between saves are logged as appended items
+APPEND_ONLY_KEYS = ["conversation_history"]
+
+
+def _trace_settings() -> Dict[str, Any]:
+    return config.get_section("trace")
+
+
+def _use_zstd() -> bool:
+    return _trace_settings().get("compression") == "zstd" and zstandard is not None
+
+
+def _agent_path(session_id: str, agent_type: str, agent_id: str) -> str:
+    agent_dir = os.path.join(os.getcwd(), "trace", session_id, agent_type)
+    os.makedirs(agent_dir, exist_ok=True)
+    return os.path.join(agent_dir, agent_id)
+
+
+class _TraceWriter:
+    """
+    Background writer of the trace event logs of this process.
+
+    save_agent_trace diffs the data against the previous save of the same agent in the caller's
+    thread and queues the resulting event line; this thread appends queued lines in batches.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._snapshots = {}  # log path -> {key: fingerprint of the last saved value}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def save(self, path: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            event = self._diff(path, data)
+            if event is None:
+                return
+            self._queue.put((path, json.dumps(event, ensure_ascii=False) + "\n"))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _diff(self, path: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        previous = self._snapshots.get(path)
+        if previous is None:
+            previous = self._snapshots[path] = {}
+            # Continue an existing log, e.g. of a resumed session, from its current state
+            if os.path.exists(path + self._suffix()):
+                for key, value in load_trace_log(path + self._suffix()).items():
+                    previous[key] = self._fingerprint(key, value)
+
+        event = {"timestamp": datetime.datetime.now().isoformat()}
+        for key, value in data.items():
+            fingerprint = self._fingerprint(key, value)
+            if previous.get(key) == fingerprint:
+                continue
+            if key in APPEND_ONLY_KEYS and key in previous and self._extends(previous[key], value):
+                event.setdefault("append", {})[key] = value[previous[key][0]:]
+            else:
+                event.setdefault("set", {})[key] = value
+            previous[key] = fingerprint
+
+        removed = [key for key in previous if key not in data]
+        for key in removed:
+            del previous[key]
+        if removed:
+            event["unset"] = removed
+        return event if len(event) > 1 else None
+
+    @staticmethod
+    def _digest(value: Any) -> str:
+        return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _fingerprint(cls, key: str, value: Any) -> Tuple:
+        if key in APPEND_ONLY_KEYS and isinstance(value, list) and value:
+            # Length and digests of the first and last items, so that the whole history
+            # is not serialized on every save
+            return len(value), cls._digest(value[0]), cls._digest(value[-1])
+        return (cls._digest(value),)
+
+    @classmethod
+    def _extends(cls, previous: Tuple, value: Any) -> bool:
+        """Whether value is the previously saved list with items appended"""
+        if len(previous) != 3 or not isinstance(value, list) or len(value) <= previous[0]:
+            return False
+        return cls._digest(value[0]) == previous[1] and cls._digest(value[previous[0] - 1]) == previous[2]
+
+    @staticmethod
+    def _suffix() -> str:
+        return TRACE_LOG_SUFFIX + (".zst" if _use_zstd() else "")
+
+    def _run(self) -> None:
+        while True:
+            path, line = self._queue.get()
+            batch = {path: [line]}
+            count = 1
+            # Write everything queued in the meantime with one append per file
+            while True:
+                try:
+                    path, line = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.setdefault(path, []).append(line)
+                count += 1
+            try:
+                for path, lines in batch.items():
+                    self._append(path, "".join(lines))
+            except Exception as e:
+                print(f"Failed to write agent trace: {str(e)}")
+            finally:
+                for _ in range(count):
+                    self._queue.task_done()
+
+    def _append(self, path: str, content: str) -> None:
+        if _use_zstd():
+            # Concatenated zstd frames form a valid zstd stream
+            with open(path + TRACE_LOG_SUFFIX + ".zst", "ab") as f:
+                f.write(zstandard.ZstdCompressor().compress(content.encode("utf-8")))
+        else:
+            with open(path + TRACE_LOG_SUFFIX, "a", encoding="utf-8") as f:
+                f.write(content)
+
+    def flush(self) -> None:
+        self._queue.join()
+
+
+_writer = _TraceWriter()
+
 
 def save_agent_trace(agent_type: str, agent_id: str, data: Dict[str, Any], session_id: str) -> str:
+    """
+    Save the current trace data of an agent
+
+    By default only the changes since the previous save are appended to the agent's event log
+    (trace/<session_id>/<agent_type>/<agent_id>.trace.jsonl, optionally zstd-compressed) by a background
+    writer. With trace.format "json" the whole data is rewritten to <agent_id>.json instead.
+
+    Args:
+        agent_type: Agent type, the subdirectory of the trace
+        agent_id: Agent identifier, the file name of the trace
+        data: Current trace data
+        session_id: Session ID
+
+    Returns:
+        Path of the trace file
+    """
+    path = _agent_path(session_id, agent_type, agent_id)
+
+    if _trace_settings().get("format", "jsonl") == "json":
+        file_path = path + ".json"
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        print(f"Agent trace updated in: {file_path}")
+        return file_path
+
+    _writer.save(path, data)
+    return path + _TraceWriter._suffix()
+
+
+def flush_traces() -> None:
+    """Wait until all queued trace events of this process are written"""
+    _writer.flush()
+
+
+atexit.register(flush_traces)
+
+
+def _read_lines(log_path: str) -> Iterator[str]:
+    if log_path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError(f"The zstandard package is required to read {log_path}")
+        with open(log_path, "rb") as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            content = reader.read().decode("utf-8")
+        yield from content.splitlines()
+    else:
+        with open(log_path, "r", encoding="utf-8") as f:
+            yield from f
+
+
+def load_trace_log(log_path: str) -> Dict[str, Any]:
+    """
+    Rebuild the current trace data of an agent from its event log
+
+    Args:
+        log_path: Path of a .trace.jsonl or .trace.jsonl.zst file
+
+    Returns:
+        Trace data as of the last saved event
+    """
+    data = {}
+    for line in _read_lines(log_path):
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            # Partially written last line of a running agent
+            continue
+        for key, value in event.get("set", {}).items():
+            data[key] = value
+        for key, items in event.get("append", {}).items():
+            data.setdefault(key, []).extend(items)
+        for key in event.get("unset", []):
+            data.pop(key, None)
+    return data
+
+
+def load_agent_traces(session_id: str, agent_type: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Load the traces of all agents of a type
+
+    Event logs are rebuilt; JSON traces (trace.format "json" or compacted) are read when there is no log.
+
+    Returns:
+        List of (agent_id, trace data)
+    """
+    agent_dir = os.path.join(os.getcwd(), "trace", session_id, agent_type)
+    traces = {}
+    for log_path in sorted(glob.glob(os.path.join(agent_dir, f"*{TRACE_LOG_SUFFIX}*"))):
+        agent_id = os.path.basename(log_path).split(TRACE_LOG_SUFFIX)[0]
+        traces[agent_id] = load_trace_log(log_path)
+    for json_path in sorted(glob.glob(os.path.join(agent_dir, "*.json"))):
+        agent_id = os.path.basename(json_path)[:-len(".json")]
+        if agent_id not in traces:
+            with open(json_path, "r", encoding="utf-8") as f:
+                traces[agent_id] = json.load(f)
+    return sorted(traces.items())
+
+
+def compact_session_traces(session_id: str) -> List[str]:
+    """
+    Write the current JSON view (<agent_id>.json) of every agent event log of a session
+
+    Returns:
+        Paths of the written JSON files
+    """
+    written = []
     trace_dir = os.path.join(os.getcwd(), "trace", session_id)
-    os.makedirs(trace_dir, exist_ok=True)
+    for log_path in sorted(glob.glob(os.path.join(trace_dir, "*", f"*{TRACE_LOG_SUFFIX}*"))):
+        json_path = log_path.split(TRACE_LOG_SUFFIX)[0] + ".json"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(load_trace_log(log_path), f, indent=2, ensure_ascii=False)
+        written.append(json_path)
+    return written
 
-    # Create agent-specific subdirectory
-    agent_dir = os.path.join(trace_dir, agent_type)
-    os.makedirs(agent_dir, exist_ok=True)
-    
-    # Create file path for this agent
-    file_path = os.path.join(agent_dir, f"{agent_id}.json")
-    
-    # Save data to file
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    
-    print(f"Agent trace updated in: {file_path}")
-    return file_path
+
+def main():
+    """Rebuild the JSON view of agent traces from their event logs"""
+    parser = argparse.ArgumentParser(description="StepFly agent trace reader")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compact_parser = subparsers.add_parser("compact", help="Write <agent_id>.json for every event log of a session")
+    compact_parser.add_argument("session_id", help="Session ID")
+    show_parser = subparsers.add_parser("show", help="Print the current trace data of one event log")
+    show_parser.add_argument("log_path", help="Path of a .trace.jsonl or .trace.jsonl.zst file")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        for path in compact_session_traces(args.session_id):
+            print(path)
+    else:
+        print(json.dumps(load_trace_log(args.log_path), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
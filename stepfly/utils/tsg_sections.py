@@ -0,0 +1,118 @@
+import re
+from typing import Dict, Any, Optional
+
+# "## Step 3 - Check Feature Flag Impact" -> PlanDAG node "Step3"
+_STEP_HEADING_PATTERN = re.compile(r"^##\s+Step\s+(\d+)\b")
+_PLUGIN_APPENDIX_HEADING = "## SQL Query Preparation plugins in this TSG:"
+_PLUGIN_MARKER_PATTERN = re.compile(r"<!-- TSG_PLUGINS:[^\s]+ -->")
+_PLUGIN_USAGE_PATTERN = re.compile(r"Use `(plugin_\d+)_tool` directly")
+_PLUGIN_REFERENCE_PATTERN = re.compile(r"\bplugin_(\d+)\b|<PLUGIN_(\d+)>")
+
+
+def parse_tsg_sections(tsg_content: str) -> Dict[str, Any]:
+    """
+    Split a loaded TSG document into its preamble, step sections and plugin documentation
+
+    Headings inside fenced code blocks are ignored. Step sections are keyed by the PlanDAG
+    node name ("## Step 3 ..." -> "Step3").
+
+    Args:
+        tsg_content: Processed TSG content as stored by the TSG loader
+
+    Returns:
+        Dictionary with "preamble", "steps" (node name -> section), "step_plugins"
+        (node name -> referenced plugin IDs), "plugins" (plugin ID -> documentation) and "marker"
+    """
+    marker_match = _PLUGIN_MARKER_PATTERN.search(tsg_content)
+    marker = marker_match.group(0) if marker_match else ""
+    body = _PLUGIN_MARKER_PATTERN.sub("", tsg_content)
+
+    # Split off the plugin documentation appended by the loader
+    plugin_appendix = ""
+    appendix_index = body.find(_PLUGIN_APPENDIX_HEADING)
+    if appendix_index != -1:
+        plugin_appendix = body[appendix_index:]
+        body = body[:appendix_index]
+
+    preamble_lines = []
+    steps = {}
+    current_step = None
+    in_code_block = False
+    for line in body.split("\n"):
+        if line.lstrip().startswith("```"):
+            in_code_block = not in_code_block
+
+        heading = None if in_code_block else _STEP_HEADING_PATTERN.match(line)
+        if heading:
+            current_step = f"Step{heading.group(1)}"
+            steps[current_step] = []
+
+        if current_step:
+            steps[current_step].append(line)
+        else:
+            preamble_lines.append(line)
+
+    steps = {name: "\n".join(lines).strip() for name, lines in steps.items()}
+
+    plugins = {}
+    for plugin_doc in re.split(r"\n(?=### )", plugin_appendix)[1:]:
+        usage = _PLUGIN_USAGE_PATTERN.search(plugin_doc)
+        if usage:
+            plugins[usage.group(1)] = plugin_doc.strip()
+
+    step_plugins = {}
+    for name, section in steps.items():
+        plugin_ids = []
+        for match in _PLUGIN_REFERENCE_PATTERN.finditer(section):
+            plugin_id = f"plugin_{match.group(1) or match.group(2)}"
+            if plugin_id not in plugin_ids:
+                plugin_ids.append(plugin_id)
+        step_plugins[name] = plugin_ids
+
+    return {
+        "preamble": "\n".join(preamble_lines).strip(),
+        "steps": steps,
+        "step_plugins": step_plugins,
+        "plugins": plugins,
+        "marker": marker
+    }
+
+
+def get_step_section(sections: Optional[Dict[str, Any]], node_name: str) -> Optional[str]:
+    """
+    Get the TSG section of a single step
+
+    Returns:
+        The step section, or None if the TSG has no section for the node
+    """
+    if not sections or not node_name:
+        return None
+    return sections.get("steps", {}).get(node_name)
+
+
+def build_step_tsg(sections: Optional[Dict[str, Any]], node_name: str) -> Optional[str]:
+    """
+    Build the part of the TSG an executor needs for a step: the shared preamble,
+    the step section and the documentation of the plugins the step references
+
+    Returns:
+        The step TSG, or None if the TSG has no section for the node
+    """
+    step_section = get_step_section(sections, node_name)
+    if step_section is None:
+        return None
+
+    parts = []
+    if sections.get("preamble"):
+        parts.append(sections["preamble"])
+    parts.append(step_section)
+
+    plugin_docs = [sections["plugins"][plugin_id] for plugin_id in sections.get("step_plugins", {}).get(node_name, [])
+                   if plugin_id in sections.get("plugins", {})]
+    if plugin_docs:
+        parts.append(_PLUGIN_APPENDIX_HEADING + "\n\n" + "\n\n".join(plugin_docs))
+
+    if sections.get("marker"):
+        parts.append(sections["marker"])
+
+    return "\n\n".join(parts)
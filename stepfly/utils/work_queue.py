@@ -0,0 +1,227 @@
+import logging
+import socket
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+import pymongo
+from pymongo import ReturnDocument
+
+from stepfly.utils.config_loader import config
+
+
+class WorkQueue:
+    """
+    Durable MongoDB-backed work queue used to dispatch executor assignments to
+    worker daemons that may run on other hosts.
+
+    Each task is claimed under a lease. A worker must keep extending the lease while
+    it is working on the task; if it stops (crash, network partition) the lease
+    expires and the task becomes visible to other workers again, until the maximum
+    number of delivery attempts is reached.
+    """
+
+    def __init__(self, queue_name: str = "executor_tasks"):
+        # Load memory database configuration, the queue lives next to the session databases
+        memory_config = config.get_section("memory_database")
+        queue_config = config.get_section("scheduler.work_queue")
+
+        host = memory_config.get("host", "localhost")
+        port = memory_config.get("port", 27017)
+
+        self.client = pymongo.MongoClient(f"mongodb://{host}:{port}/")
+        # Note: the database name must not start with "tsg_agent_db", otherwise
+        # Memory.reset_database() would drop in-flight tasks of other sessions
+        self.db = self.client[queue_config.get("database", "stepfly_work_queue")]
+        self.tasks_collection = self.db[queue_name]
+
+        self.lease_seconds = queue_config.get("lease_seconds", 60)
+        self.max_attempts = queue_config.get("max_attempts", 2)
+
+        self.tasks_collection.create_index([("status", pymongo.ASCENDING), ("enqueued_at", pymongo.ASCENDING)])
+        self.tasks_collection.create_index([("session_id", pymongo.ASCENDING)])
+
+    def enqueue(self, payload: Dict[str, Any], session_id: str, task_id: Optional[str] = None) -> str:
+        """
+        Add a task to the queue
+
+        Args:
+            payload: Task arguments, must be BSON serializable
+            session_id: Session that owns the task
+            task_id: Optional task ID (defaults to a new UUID)
+
+        Returns:
+            ID of the enqueued task
+        """
+        task_id = task_id or str(uuid.uuid4())
+        self.tasks_collection.insert_one({
+            "_id": task_id,
+            "session_id": session_id,
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "enqueued_at": datetime.now(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None
+        })
+        logging.info(f"Enqueued task {task_id} for session {session_id}")
+        return task_id
+
+    def claim(self, worker_id: str, lease_seconds: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest visible task: either pending, or leased with an expired lease
+
+        Args:
+            worker_id: ID of the claiming worker
+            lease_seconds: Lease duration (defaults to the configured visibility timeout)
+
+        Returns:
+            The claimed task document, or None if no task is available
+        """
+        now = datetime.now()
+        lease = lease_seconds or self.lease_seconds
+        return self.tasks_collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending"},
+                    {"status": "leased", "lease_expires_at": {"$lt": now}}
+                ],
+                "$expr": {"$lt": ["$attempts", "$max_attempts"]}
+            },
+            {
+                "$set": {
+                    "status": "leased",
+                    "lease_owner": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=lease),
+                    "started_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("enqueued_at", pymongo.ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def extend_lease(self, task_id: str, worker_id: str, lease_seconds: Optional[int] = None) -> bool:
+        """
+        Extend the lease of a task held by the worker
+
+        Returns:
+            False if the worker no longer holds the lease (expired and re-claimed, or cancelled)
+        """
+        lease = lease_seconds or self.lease_seconds
+        result = self.tasks_collection.update_one(
+            {"_id": task_id, "status": "leased", "lease_owner": worker_id},
+            {"$set": {"lease_expires_at": datetime.now() + timedelta(seconds=lease)}}
+        )
+        return result.modified_count == 1
+
+    def ack(self, task_id: str, worker_id: str) -> bool:
+        """
+        Acknowledge successful completion of a task
+
+        Returns:
+            False if the worker no longer holds the lease, i.e. the result must be ignored
+        """
+        result = self.tasks_collection.update_one(
+            {"_id": task_id, "status": "leased", "lease_owner": worker_id},
+            {"$set": {"status": "done", "finished_at": datetime.now(), "lease_expires_at": None}}
+        )
+        return result.modified_count == 1
+
+    def fail(self, task_id: str, worker_id: str, error: str) -> None:
+        """
+        Report a failed attempt. The task is made visible again unless it ran out of attempts.
+        """
+        task = self.tasks_collection.find_one({"_id": task_id, "status": "leased", "lease_owner": worker_id})
+        if not task:
+            return
+
+        retry = task.get("attempts", 0) < task.get("max_attempts", self.max_attempts)
+        self.tasks_collection.update_one(
+            {"_id": task_id, "status": "leased", "lease_owner": worker_id},
+            {"$set": {
+                "status": "pending" if retry else "failed",
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "finished_at": None if retry else datetime.now(),
+                "error": error
+            }}
+        )
+
+    def cancel(self, task_id: str) -> None:
+        """Cancel a task that has not finished yet; its worker stops at the next lease extension"""
+        self.tasks_collection.update_one(
+            {"_id": task_id, "status": {"$in": ["pending", "leased"]}},
+            {"$set": {"status": "cancelled", "finished_at": datetime.now(), "lease_expires_at": None}}
+        )
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a task document, marking it failed if its lease expired and no attempts are left
+        """
+        task = self.tasks_collection.find_one({"_id": task_id})
+        if not task:
+            return None
+
+        lease_expired = task["status"] == "leased" and task.get("lease_expires_at") and task["lease_expires_at"] < datetime.now()
+        if lease_expired and task.get("attempts", 0) >= task.get("max_attempts", self.max_attempts):
+            self.tasks_collection.update_one(
+                {"_id": task_id, "status": "leased"},
+                {"$set": {
+                    "status": "failed",
+                    "finished_at": datetime.now(),
+                    "error": f"Lease expired after {task.get('attempts')} attempts"
+                }}
+            )
+            task = self.tasks_collection.find_one({"_id": task_id})
+
+        return task
+
+
+def default_worker_id() -> str:
+    """Build a worker ID that identifies the host and process"""
+    return f"{socket.gethostname()}-{os.getpid()}-{str(uuid.uuid4())[0:8]}"
+
+
+class QueuedExecutorHandle:
+    """
+    Process-like handle for an executor dispatched through the work queue.
+    Mirrors the subset of the multiprocessing.Process API used by the schedule tool.
+    """
+
+    def __init__(self, work_queue: WorkQueue, task_id: str):
+        self.work_queue = work_queue
+        self.task_id = task_id
+        self._task = None
+
+    def _refresh(self) -> Dict[str, Any]:
+        self._task = self.work_queue.get_task(self.task_id) or {"status": "failed", "error": "Task not found"}
+        return self._task
+
+    def is_alive(self) -> bool:
+        return self._refresh()["status"] in ["pending", "leased"]
+
+    @property
+    def started_at(self) -> Optional[datetime]:
+        """Time the task was last claimed by a worker, None while still queued"""
+        task = self._task or self._refresh()
+        return task.get("started_at") if task["status"] == "leased" else None
+
+    @property
+    def exitcode(self) -> Optional[int]:
+        task = self._task or self._refresh()
+        if task["status"] in ["pending", "leased"]:
+            return None
+        return 0 if task["status"] == "done" else 1
+
+    def terminate(self) -> None:
+        self.work_queue.cancel(self.task_id)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        # Nothing to reap locally, the worker owns the executor process
+        return None
@@ -0,0 +1,374 @@
+import argparse
+import glob
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+# Add project root path to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from stepfly.utils.config_loader import config
+from stepfly.utils.token_usage import aggregate_token_usage
+from stepfly.utils.trace_logger import load_agent_traces
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def _run_session(incident_id: str, session_id: str, use_node_cache: Optional[bool]) -> None:
+    """Run one troubleshooting session in a batch child process"""
+    trace_dir = os.path.join(os.getcwd(), "trace", session_id)
+    os.makedirs(trace_dir, exist_ok=True)
+
+    # Sessions run in parallel, keep their console output apart
+    log_file = open(os.path.join(trace_dir, "console.log"), "w", encoding="utf-8", buffering=1)
+    sys.stdout = log_file
+    sys.stderr = log_file
+
+    from stepfly.agents.scheduler import Scheduler
+    from stepfly.utils.memory import Memory
+    from stepfly.utils.perf_stats import flush_perf_stats
+    from stepfly.utils.trace_logger import flush_traces
+
+    start = time.monotonic()
+    session_result = {"incident_id": incident_id, "session_id": session_id}
+    try:
+        memory = Memory(session_id=session_id)
+        scheduler = Scheduler(session_id=session_id, memory=memory, use_node_cache=use_node_cache)
+        scheduler.start_session(incident_id=incident_id)
+        session_result["complete"] = scheduler.session_state.get("complete", False)
+        session_result["execution_status"] = scheduler.session_state.get("execution_status")
+    except Exception as e:
+        session_result["complete"] = False
+        session_result["error"] = str(e)
+        raise
+    finally:
+        session_result["wall_seconds"] = time.monotonic() - start
+        flush_perf_stats(session_id, "scheduler")
+        flush_traces()
+        with open(os.path.join(trace_dir, "batch_session.json"), "w", encoding="utf-8") as f:
+            json.dump(session_result, f, indent=2)
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """
+    Nearest-rank percentile
+
+    Args:
+        values: Sample values
+        p: Percentile in [0, 100]
+
+    Returns:
+        The percentile, or None for an empty sample
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    """Count, mean, percentiles and max of a sample"""
+    summary = {"count": len(values)}
+    if not values:
+        return summary
+    summary["mean"] = sum(values) / len(values)
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(values, p)
+    summary["max"] = max(values)
+    return summary
+
+
+def collect_session_metrics(session_id: str) -> Dict[str, Any]:
+    """
+    Collect metrics of a finished session from its trace directory
+
+    Args:
+        session_id: Session ID
+
+    Returns:
+        Dictionary with node durations, LLM usage and memory/SQL time
+    """
+    trace_dir = os.path.join(os.getcwd(), "trace", session_id)
+    metrics = {"nodes": [], "llm_calls": 0, "input_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+               "llm_seconds": 0.0, "llm_cache_hits": 0, "llm_hedges": 0, "memory_seconds": 0.0, "memory_calls": 0, "sql_seconds": 0.0, "sql_calls": 0}
+
+    # Per-node durations from the executor traces
+    for _, trace in load_agent_traces(session_id, "Executor"):
+        execution_state = trace.get("execution_state", {})
+        if not execution_state.get("start_time") or not execution_state.get("end_time"):
+            continue
+        start = datetime.fromisoformat(execution_state["start_time"])
+        end = datetime.fromisoformat(execution_state["end_time"])
+        metrics["nodes"].append({
+            "node": execution_state.get("step_name"),
+            "status": execution_state.get("status"),
+            "duration_seconds": (end - start).total_seconds()
+        })
+
+    # Sessions that did not finish have no token_time_usage.json, aggregate their usage logs directly
+    session_totals = aggregate_token_usage(session_id)["session_totals"]
+    metrics["llm_calls"] = session_totals.get("session_total_llm_calls", 0)
+    metrics["input_tokens"] = session_totals.get("session_total_input_tokens", 0)
+    metrics["output_tokens"] = session_totals.get("session_total_output_tokens", 0)
+    metrics["total_tokens"] = session_totals.get("session_total_tokens", 0)
+    metrics["llm_seconds"] = session_totals.get("session_total_llm_seconds", 0.0)
+    metrics["llm_cache_hits"] = session_totals.get("session_total_llm_cache_hits", 0)
+    metrics["llm_hedges"] = session_totals.get("session_total_llm_hedges", 0)
+
+    for stats_file in glob.glob(os.path.join(trace_dir, "perf_stats", "*.json")):
+        with open(stats_file, "r", encoding="utf-8") as f:
+            stats = json.load(f).get("stats", {})
+        for category in ["memory", "sql"]:
+            for entry in stats.get(category, {}).values():
+                metrics[f"{category}_seconds"] += entry["total_seconds"]
+                metrics[f"{category}_calls"] += entry["count"]
+
+    return metrics
+
+
+class BatchRunner:
+    """
+    Runs a set of incidents through the scheduler with bounded parallelism
+    and reports throughput and latency statistics.
+    """
+
+    def __init__(self, parallelism: int = 2, timeout: Optional[float] = None,
+                 use_node_cache: Optional[bool] = None, poll_interval: float = 1.0):
+        self.console = Console()
+        self.parallelism = max(1, parallelism)
+        self.timeout = timeout
+        self.use_node_cache = use_node_cache
+        self.poll_interval = poll_interval
+
+    def run(self, incident_ids: List[str], output_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run the incidents and write the summary report
+
+        Args:
+            incident_ids: Incidents to run
+            output_path: Path of the JSON report (defaults to trace/batch-<timestamp>/report.json)
+
+        Returns:
+            The report
+        """
+        batch_id = f"batch-{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[0:8]}"
+        output_path = output_path or os.path.join(os.getcwd(), "trace", batch_id, "report.json")
+
+        pending = list(incident_ids)
+        running = {}  # session_id -> (process, incident_id, start_time)
+        sessions = []
+
+        self.console.print(f"[bold cyan]Running {len(pending)} incidents with parallelism {self.parallelism}[/bold cyan]")
+        batch_start = time.monotonic()
+
+        while pending or running:
+            while pending and len(running) < self.parallelism:
+                incident_id = pending.pop(0)
+                _timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                session_id = f"{incident_id}_session-{_timestamp}_{str(uuid.uuid4())[0:8]}"
+                # Not a daemon: the scheduler starts executor processes of its own
+                process = multiprocessing.Process(
+                    target=_run_session,
+                    args=(incident_id, session_id, self.use_node_cache)
+                )
+                process.start()
+                running[session_id] = (process, incident_id, time.monotonic())
+                self.console.print(f"[blue]Started incident {incident_id}:[/blue] {session_id}")
+
+            time.sleep(self.poll_interval)
+
+            for session_id, (process, incident_id, start) in list(running.items()):
+                elapsed = time.monotonic() - start
+                timed_out = False
+                if process.is_alive():
+                    if self.timeout is None or elapsed < self.timeout:
+                        continue
+                    self.console.print(f"[red]Incident {incident_id} timed out after {elapsed:.0f}s, terminating[/red]")
+                    process.terminate()
+                    timed_out = True
+                process.join()
+                del running[session_id]
+
+                sessions.append(self._session_record(incident_id, session_id, process.exitcode, elapsed, timed_out))
+                style = "green" if sessions[-1]["complete"] else "red"
+                self.console.print(f"[{style}]Finished incident {incident_id} in {elapsed:.1f}s[/{style}]")
+
+        batch_seconds = time.monotonic() - batch_start
+        report = self._build_report(batch_id, sessions, batch_seconds)
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+        self._display_report(report)
+        self.console.print(f"[green]Report written to {output_path}[/green]")
+        return report
+
+    def _session_record(self, incident_id: str, session_id: str, exitcode: Optional[int],
+                        elapsed: float, timed_out: bool) -> Dict[str, Any]:
+        record = {
+            "incident_id": incident_id,
+            "session_id": session_id,
+            "exitcode": exitcode,
+            "timed_out": timed_out,
+            "wall_seconds": elapsed,
+            "complete": False
+        }
+
+        result_file = os.path.join(os.getcwd(), "trace", session_id, "batch_session.json")
+        if os.path.exists(result_file):
+            with open(result_file, "r", encoding="utf-8") as f:
+                session_result = json.load(f)
+            record["complete"] = session_result.get("complete", False) and exitcode == 0
+            if session_result.get("error"):
+                record["error"] = session_result["error"]
+
+        record.update(collect_session_metrics(session_id))
+        return record
+
+    def _build_report(self, batch_id: str, sessions: List[Dict[str, Any]], batch_seconds: float) -> Dict[str, Any]:
+        node_durations = [node["duration_seconds"] for session in sessions for node in session["nodes"]]
+
+        # Per-node-name latency, to spot the expensive steps of a TSG
+        durations_by_node = {}
+        for session in sessions:
+            for node in session["nodes"]:
+                durations_by_node.setdefault(node["node"], []).append(node["duration_seconds"])
+
+        return {
+            "batch_id": batch_id,
+            "created_at": datetime.now().isoformat(),
+            "parallelism": self.parallelism,
+            "sessions_total": len(sessions),
+            "sessions_completed": sum(1 for session in sessions if session["complete"]),
+            "batch_wall_seconds": batch_seconds,
+            "throughput_sessions_per_hour": len(sessions) / batch_seconds * 3600 if batch_seconds > 0 else None,
+            "session_wall_seconds": summarize([session["wall_seconds"] for session in sessions]),
+            "node_duration_seconds": summarize(node_durations),
+            "node_duration_seconds_by_node": {name: summarize(values) for name, values in sorted(durations_by_node.items())},
+            "llm_calls_per_session": summarize([session["llm_calls"] for session in sessions]),
+            "tokens_per_session": summarize([session["total_tokens"] for session in sessions]),
+            "llm_seconds_per_session": summarize([session["llm_seconds"] for session in sessions]),
+            "memory_seconds_per_session": summarize([session["memory_seconds"] for session in sessions]),
+            "sql_seconds_per_session": summarize([session["sql_seconds"] for session in sessions]),
+            "totals": {
+                "llm_calls": sum(session["llm_calls"] for session in sessions),
+                "llm_cache_hits": sum(session["llm_cache_hits"] for session in sessions),
+                "llm_hedges": sum(session["llm_hedges"] for session in sessions),
+                "input_tokens": sum(session["input_tokens"] for session in sessions),
+                "output_tokens": sum(session["output_tokens"] for session in sessions),
+                "total_tokens": sum(session["total_tokens"] for session in sessions),
+                "memory_calls": sum(session["memory_calls"] for session in sessions),
+                "sql_calls": sum(session["sql_calls"] for session in sessions)
+            },
+            "sessions": sessions
+        }
+
+    def _display_report(self, report: Dict[str, Any]) -> None:
+        table = Table(title=f"Batch {report['batch_id']}")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Mean")
+        for p in PERCENTILES:
+            table.add_column(f"p{p}")
+        table.add_column("Max")
+
+        for label, key in [
+            ("Session wall time (s)", "session_wall_seconds"),
+            ("Node duration (s)", "node_duration_seconds"),
+            ("LLM calls / session", "llm_calls_per_session"),
+            ("Tokens / session", "tokens_per_session"),
+            ("LLM time / session (s)", "llm_seconds_per_session"),
+            ("Memory time / session (s)", "memory_seconds_per_session"),
+            ("SQL time / session (s)", "sql_seconds_per_session"),
+        ]:
+            summary = report[key]
+            if not summary.get("count"):
+                continue
+            table.add_row(label, *[f"{summary[column]:.2f}" for column in ["mean"] + [f"p{p}" for p in PERCENTILES] + ["max"]])
+
+        self.console.print(table)
+        throughput = report["throughput_sessions_per_hour"]
+        self.console.print(
+            f"Completed {report['sessions_completed']}/{report['sessions_total']} sessions in "
+            f"{report['batch_wall_seconds']:.1f}s"
+            + (f" ({throughput:.1f} sessions/hour)" if throughput else "")
+        )
+
+
+def list_incidents(incidents_dir: str) -> List[str]:
+    """List the incident IDs of the incident files in a directory"""
+    incident_ids = []
+    for file_name in sorted(os.listdir(incidents_dir)):
+        if os.path.isfile(os.path.join(incidents_dir, file_name)) and not file_name.startswith("."):
+            incident_ids.append(os.path.splitext(file_name)[0])
+    return incident_ids
+
+
+def main():
+    """
+    StepFly Batch Runner
+    Runs a set of incidents unattended and reports throughput and latency
+    """
+    parser = argparse.ArgumentParser(description='StepFly Batch Incident Runner')
+    parser.add_argument(
+        'incident_ids',
+        nargs='*',
+        help='Incident IDs to run (defaults to every incident in --incidents-dir)'
+    )
+    parser.add_argument(
+        '--incidents-dir',
+        type=str,
+        default='incidents',
+        help='Directory with incident files (default: incidents)'
+    )
+    parser.add_argument(
+        '--parallelism',
+        type=int,
+        default=config.get("batch.parallelism", 2),
+        help='Number of sessions running at the same time'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=config.get("batch.session_timeout", None),
+        help='Terminate sessions running longer than this many seconds'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not reuse cached node results from earlier sessions'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        help='Path of the JSON report (default: trace/batch-<timestamp>/report.json)'
+    )
+
+    args = parser.parse_args()
+
+    incident_ids = args.incident_ids or list_incidents(args.incidents_dir)
+    if not incident_ids:
+        parser.error(f"No incidents found in {args.incidents_dir}")
+
+    runner = BatchRunner(
+        parallelism=args.parallelism,
+        timeout=args.timeout,
+        use_node_cache=False if args.no_cache else None
+    )
+    runner.run(incident_ids, output_path=args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+StepFly Executor Worker
+Claims executor assignments from the durable work queue and runs them on this host
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any
+
+from rich.console import Console
+from rich.panel import Panel
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from stepfly.tools.schedule_tool import _run_executor
+from stepfly.utils.async_runtime import AsyncExecutorRuntime
+from stepfly.utils.work_queue import WorkQueue, default_worker_id
+
+
+class ExecutorWorker:
+    """
+    Worker daemon for the queue dispatch mode.
+    Each claimed task runs in its own child process so that it can be stopped when
+    the scheduler cancels the task or the lease is lost. With use_async, tasks run as
+    coroutines of the asyncio executor runtime in the worker process instead.
+    """
+
+    def __init__(self, concurrency: int = 3, poll_interval: float = 1.0, worker_id: str = None,
+                 use_async: bool = False):
+        self.console = Console()
+        self.work_queue = WorkQueue()
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or default_worker_id()
+        self.use_async = use_async
+        self.running_tasks = {}  # task_id -> {"process", "last_heartbeat"}
+        self.running = False
+
+    def run(self) -> None:
+        """Claim and run tasks until interrupted"""
+        self.running = True
+        heartbeat_interval = max(1, self.work_queue.lease_seconds / 3)
+        self.console.print(f"[green]Executor worker {self.worker_id} started with concurrency {self.concurrency}[/green]")
+
+        try:
+            while self.running:
+                self._reap_and_heartbeat(heartbeat_interval)
+
+                # Claim new tasks while there are free slots
+                while len(self.running_tasks) < self.concurrency:
+                    task = self.work_queue.claim(self.worker_id)
+                    if not task:
+                        break
+                    self._start_task(task)
+
+                time.sleep(self.poll_interval)
+        finally:
+            self._shutdown()
+
+    def _start_task(self, task: Dict[str, Any]) -> None:
+        payload = task["payload"]
+        self.console.print(f"[blue]Claimed task {task['_id']} for node {payload['node']['node']} "
+                           f"(session {task['session_id']}, attempt {task['attempts']})[/blue]")
+
+        if self.use_async:
+            process = AsyncExecutorRuntime.get().submit(
+                payload["node"],
+                payload["executor_id"],
+                payload["session_id"],
+                payload["node_context"],
+                payload.get("max_retry_number", 3),
+            )
+        else:
+            process = multiprocessing.Process(
+                target=_run_executor,
+                args=(
+                    payload["node"],
+                    payload["executor_id"],
+                    payload["session_id"],
+                    payload["node_context"],
+                    payload.get("max_retry_number", 3),
+                )
+            )
+            process.daemon = True
+            process.start()
+
+        self.running_tasks[task["_id"]] = {
+            "process": process,
+            "last_heartbeat": datetime.now()
+        }
+
+    def _reap_and_heartbeat(self, heartbeat_interval: float) -> None:
+        finished = []
+        for task_id, task_info in self.running_tasks.items():
+            process = task_info["process"]
+
+            if not process.is_alive():
+                process.join(timeout=1)
+                if process.exitcode == 0:
+                    if not self.work_queue.ack(task_id, self.worker_id):
+                        self.console.print(f"[yellow]Lease for task {task_id} was lost before acknowledgment[/yellow]")
+                    else:
+                        self.console.print(f"[green]Task {task_id} completed[/green]")
+                else:
+                    self.work_queue.fail(task_id, self.worker_id, f"Executor process exited with code {process.exitcode}")
+                    self.console.print(f"[red]Task {task_id} failed with exit code {process.exitcode}[/red]")
+                finished.append(task_id)
+                continue
+
+            # Keep the lease alive while the executor is working
+            if (datetime.now() - task_info["last_heartbeat"]).total_seconds() >= heartbeat_interval:
+                if self.work_queue.extend_lease(task_id, self.worker_id):
+                    task_info["last_heartbeat"] = datetime.now()
+                else:
+                    # Cancelled by the scheduler or re-claimed by another worker
+                    self.console.print(f"[yellow]Lost lease for task {task_id}, terminating executor[/yellow]")
+                    process.terminate()
+                    process.join(timeout=1)
+                    finished.append(task_id)
+
+        for task_id in finished:
+            del self.running_tasks[task_id]
+
+    def _shutdown(self) -> None:
+        for task_id, task_info in self.running_tasks.items():
+            process = task_info["process"]
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=1)
+            # Make the task visible again for other workers
+            self.work_queue.fail(task_id, self.worker_id, "Worker shut down")
+        self.running_tasks = {}
+        self.console.print(f"[yellow]Executor worker {self.worker_id} stopped[/yellow]")
+
+
+def main():
+    """
+    StepFly Executor Worker
+    Runs executors dispatched by schedulers in queue mode
+    """
+    parser = argparse.ArgumentParser(
+        description='StepFly Executor Worker',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=3,
+        help='Maximum number of executors run concurrently by this worker (default: 3)'
+    )
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=1.0,
+        help='Seconds between queue polls (default: 1.0)'
+    )
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Run executors as coroutines in this process instead of one child process each'
+    )
+
+    args = parser.parse_args()
+
+    console = Console()
+    console.print(
+        Panel.fit(
+            "[bold blue]StepFly Executor Worker[/bold blue]\n"
+            "Claims executor tasks from the work queue",
+            title="Worker",
+            border_style="blue",
+        )
+    )
+
+    worker = ExecutorWorker(concurrency=args.concurrency, poll_interval=args.poll_interval, use_async=args.use_async)
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        console.print("[yellow]Interrupted[/yellow]")
+
+
+if __name__ == "__main__":
+    main()
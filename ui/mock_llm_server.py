@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+StepFly Mock LLM Server
+OpenAI-compatible streaming chat completions endpoint for load and soak testing without a real model
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional
+
+from rich.console import Console
+from rich.panel import Panel
+
+# Add project root path to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from stepfly.utils.config_loader import config
+from stepfly.utils.context_budget import estimate_tokens
+from stepfly.utils.llm_cassette import LLMCassette, CassetteMissError, request_key
+
+
+def _parse_json_response(content: str) -> Optional[Dict[str, Any]]:
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    if content.endswith("```"):
+        content = content[:-3]
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+class ScriptedPolicy:
+    """
+    Deterministic ReAct responses for the StepFly agents, derived from their prompts.
+
+    The scheduler loads the incident, runs schedule_tool and finishes; executors call the plugins
+    referenced by their step in one turn (each plugin runs its query) and finish the step enabling
+    unconditional edges and the first conditional edge; the code generator returns a short script.
+    """
+
+    def __init__(self, plugin_parameters: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            plugin_parameters: Values passed to plugin tools, by parameter name
+        """
+        self.plugin_parameters = plugin_parameters or {}
+
+    def respond(self, messages: List[Dict[str, str]]) -> str:
+        system_prompt = messages[0].get("content", "") if messages else ""
+        if "TSG Scheduler Agent" in system_prompt:
+            return json.dumps(self._scheduler_action(messages))
+        if "Step Executor agent" in system_prompt:
+            return json.dumps(self._executor_action(messages))
+        if "Python code generator" in system_prompt:
+            return "```python\nprint('Mock analysis completed: no anomalies found in the provided data')\n```"
+        return "Mock response"
+
+    @staticmethod
+    def _previous_actions(messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        actions = []
+        for message in messages:
+            if message.get("role") == "assistant":
+                data = _parse_json_response(message.get("content", ""))
+                if data and isinstance(data.get("actions"), list):
+                    actions.extend(item for item in data["actions"] if isinstance(item, dict) and item.get("action"))
+                elif data and data.get("action"):
+                    actions.append(data)
+        return actions
+
+    @staticmethod
+    def _last_observation(messages: List[Dict[str, str]]) -> str:
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                return message.get("content", "")
+        return ""
+
+    def _scheduler_action(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        actions = [action["action"] for action in self._previous_actions(messages)]
+        user_messages = [message.get("content", "") for message in messages if message.get("role") == "user"]
+
+        if "schedule_tool" in actions:
+            return {
+                "thought": "All steps have been executed, I will summarize the session.",
+                "action": "finish",
+                "parameters": {"troubleshooting_conclusion": "The troubleshooting process has been completed in status: success."}
+            }
+
+        incident_id = None
+        for content in user_messages:
+            match = re.search(r"incident ID: (\S+)", content)
+            if match:
+                incident_id = match.group(1)
+        if incident_id is None and "user_interaction" in actions:
+            # The user's answer to the incident question
+            words = self._last_observation(messages).split()
+            incident_id = words[-1] if words else None
+
+        if "incident_tsg_loader" in actions:
+            tsg_match = re.search(r"TSG Document Loaded: (\S+)", self._last_observation(messages))
+            return {
+                "thought": "The incident, TSG and PlanDAG are loaded, I will start the step execution.",
+                "action": "schedule_tool",
+                "parameters": {"incident_id": incident_id, "tsg_path": tsg_match.group(1) if tsg_match else ""}
+            }
+
+        if incident_id:
+            return {
+                "thought": "I will load the incident information, TSG and PlanDAG.",
+                "action": "incident_tsg_loader",
+                "parameters": {"incident_id": incident_id}
+            }
+        return {
+            "thought": "I need the incident ID to start troubleshooting.",
+            "action": "user_interaction",
+            "parameters": {"message": "Please provide the incident ID.", "type": "question"}
+        }
+
+    def _executor_action(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        system_prompt = messages[0].get("content", "")
+        context = next((message.get("content", "") for message in messages if message.get("role") == "user"), "")
+        step_match = re.search(r"# Step: (\S+)", context)
+        step_name = step_match.group(1) if step_match else "step"
+
+        plugin_tools = dict(re.findall(r"^(plugin_\d+_tool): (.*)$", system_prompt, re.MULTILINE))
+        called = {action["action"] for action in self._previous_actions(messages)}
+        pending = [
+            f"{plugin_id}_tool" for plugin_id in dict.fromkeys(re.findall(r"\bplugin_\d+\b", context))
+            if f"{plugin_id}_tool" in plugin_tools and f"{plugin_id}_tool" not in called
+        ]
+        if len(pending) == 1:
+            return {
+                "thought": f"I will run {pending[0][:-len('_tool')]} referenced by {step_name}.",
+                "action": pending[0],
+                "parameters": self._plugin_parameters(plugin_tools[pending[0]])
+            }
+        if pending:
+            return {
+                "thought": f"I will run the plugins referenced by {step_name} together.",
+                "actions": [
+                    {"action": tool_name, "parameters": self._plugin_parameters(plugin_tools[tool_name])}
+                    for tool_name in pending
+                ]
+            }
+
+        set_edge_status = {}
+        conditional_enabled = False
+        for edge_name, description in re.findall(r"^- (edge_\S+): (.*)$", context, re.MULTILINE):
+            if description.startswith("Enable if"):
+                set_edge_status[edge_name] = "disabled" if conditional_enabled else "enabled"
+                conditional_enabled = True
+            else:
+                set_edge_status[edge_name] = "enabled"
+        return {
+            "thought": f"{step_name} is complete, I will report the result and set the output edges.",
+            "action": "finish_step",
+            "parameters": {
+                "result": f"Mock result for {step_name} after {len(called)} tool calls.",
+                "status": "completed",
+                "set_edge_status": set_edge_status
+            }
+        }
+
+    def _plugin_parameters(self, description: str) -> Dict[str, str]:
+        parameters = {}
+        if "Parameters:" in description:
+            parameter_text = description.split("Parameters:", 1)[1].split("[Language:")[0]
+            for name in re.findall(r"(\w+): ", parameter_text):
+                parameters[name] = self.plugin_parameters.get(name, "mock")
+        return parameters
+
+
+class MockLLMServer:
+    """
+    OpenAI-compatible /chat/completions and /models endpoints.
+
+    Responses come from the scripted policy or, in replay mode, from an LLM cassette (falling back to
+    the policy for unrecorded requests). Time to first token, streaming speed, a concurrency limit and
+    rate-limit/server error rates are configurable.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.console = Console()
+        self.policy = ScriptedPolicy(settings.get("plugin_parameters"))
+        self.cassette = None
+        if settings.get("mode", "script") == "replay":
+            if not settings.get("cassette"):
+                raise ValueError("A cassette path is required for the replay mode of the mock LLM server.")
+            # Recorded responses are streamed with the configured latency
+            self.cassette = LLMCassette(path=settings["cassette"], mode="replay")
+        self._active = 0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "server_errors": 0, "replayed": 0}
+
+    def serve(self) -> None:
+        host = self.settings.get("host", "127.0.0.1")
+        port = self.settings.get("port", 8765)
+        server = ThreadingHTTPServer((host, port), self._handler_class())
+        server.daemon_threads = True
+        # Hundreds of executors connect at once
+        server.request_queue_size = 1024
+        self.console.print(f"[green]Mock LLM server listening on http://{host}:{port}/v1[/green]")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            self.console.print(f"[yellow]Mock LLM server stopped: {self.stats}[/yellow]")
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "Not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+                mock.handle_completion(self, body)
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def handle_completion(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            max_concurrent = self.settings.get("max_concurrent_requests")
+            overloaded = bool(max_concurrent) and self._active >= max_concurrent
+            if not overloaded:
+                self._active += 1
+
+        if overloaded or random.random() < self.settings.get("rate_limit_error_rate", 0.0):
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            handler._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                {"Retry-After": str(self.settings.get("retry_after", 1))}
+            )
+            if not overloaded:
+                with self._lock:
+                    self._active -= 1
+            return
+
+        try:
+            if random.random() < self.settings.get("server_error_rate", 0.0):
+                with self._lock:
+                    self.stats["server_errors"] += 1
+                handler._send_json(500, {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+                return
+            self._respond(handler, body)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _respond(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        messages = body.get("messages", [])
+        model = body.get("model", "mock")
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex}"
+        prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in messages)
+
+        recorded = self._replay(body) if self.cassette else None
+        text = recorded if recorded is not None else self.policy.respond(messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(text),
+            "total_tokens": prompt_tokens + estimate_tokens(text)
+        }
+
+        if not body.get("stream"):
+            self._sleep_ttft()
+            time.sleep(usage["completion_tokens"] / self.settings.get("tokens_per_second", 200))
+            handler._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def send_event(payload: str) -> None:
+            data = f"data: {payload}\n\n".encode("utf-8")
+            handler.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            handler.wfile.flush()
+
+        def send_chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> None:
+            send_event(json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }))
+
+        try:
+            self._sleep_ttft()
+            send_chunk({"role": "assistant", "content": ""})
+            chunk_chars = self.settings.get("chunk_tokens", 4) * 4
+            seconds_per_chunk = self.settings.get("chunk_tokens", 4) / self.settings.get("tokens_per_second", 200)
+            for start in range(0, len(text), chunk_chars):
+                send_chunk({"content": text[start:start + chunk_chars]})
+                time.sleep(seconds_per_chunk)
+            send_chunk({}, finish_reason="stop")
+            if body.get("stream_options", {}).get("include_usage"):
+                send_event(json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [],
+                    "usage": usage
+                }))
+            send_event("[DONE]")
+            handler.wfile.write(b"0\r\n\r\n")
+            handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream, e.g. a hedged request that lost
+            handler.close_connection = True
+
+    def _sleep_ttft(self) -> None:
+        ttft = self.settings.get("time_to_first_token", 0.5)
+        jitter = self.settings.get("time_to_first_token_jitter", 0.0)
+        time.sleep(max(0.0, ttft + random.uniform(-jitter, jitter)))
+
+    def _replay(self, body: Dict[str, Any]) -> Optional[str]:
+        """Recorded response for the request, None when the cassette has none"""
+        params = {
+            "temperature": body.get("temperature", 0),
+            "max_tokens": body.get("max_tokens", 4096),
+            "top_p": body.get("top_p", 0.95),
+            "json_response": body.get("response_format", {}).get("type") == "json_object"
+        }
+        try:
+            text, _ = self.cassette.replay(request_key(body.get("model", ""), body.get("messages", []), params))
+        except CassetteMissError:
+            return None
+        with self._lock:
+            self.stats["replayed"] += 1
+        return text
+
+
+def main():
+    """
+    StepFly Mock LLM Server
+    Serves scripted or recorded ReAct responses for load testing
+    """
+    settings = dict(config.get_section("mock_llm"))
+    parser = argparse.ArgumentParser(description='StepFly Mock LLM Server')
+    parser.add_argument('--host', type=str, default=settings.get("host", "127.0.0.1"), help='Host to bind')
+    parser.add_argument('--port', type=int, default=settings.get("port", 8765), help='Port to listen on')
+    parser.add_argument(
+        '--cassette',
+        type=str,
+        default=settings.get("cassette"),
+        help='Replay responses from this LLM cassette, falling back to the scripted policy'
+    )
+    parser.add_argument('--ttft', type=float, default=settings.get("time_to_first_token", 0.5),
+                        help='Seconds until the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=settings.get("tokens_per_second", 200),
+                        help='Streaming speed of each response')
+    parser.add_argument('--max-concurrent', type=int, default=settings.get("max_concurrent_requests"),
+                        help='Requests beyond this number are rejected with 429')
+    parser.add_argument('--rate-limit-error-rate', type=float, default=settings.get("rate_limit_error_rate", 0.0),
+                        help='Fraction of requests rejected with 429')
+    parser.add_argument('--server-error-rate', type=float, default=settings.get("server_error_rate", 0.0),
+                        help='Fraction of requests failing with 500')
+
+    args = parser.parse_args()
+    settings.update({
+        "host": args.host,
+        "port": args.port,
+        "time_to_first_token": args.ttft,
+        "tokens_per_second": args.tokens_per_second,
+        "max_concurrent_requests": args.max_concurrent,
+        "rate_limit_error_rate": args.rate_limit_error_rate,
+        "server_error_rate": args.server_error_rate
+    })
+    if args.cassette:
+        settings["mode"] = "replay"
+        settings["cassette"] = args.cassette
+
+    console = Console()
+    console.print(
+        Panel.fit(
+            "[bold blue]StepFly Mock LLM Server[/bold blue]\n"
+            f"Point API_BASE at http://{args.host}:{args.port}/v1",
+            title="Mock LLM",
+            border_style="blue",
+        )
+    )
+    try:
+        MockLLMServer(settings).serve()
+    except KeyboardInterrupt:
+        console.print("[yellow]Interrupted[/yellow]")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,7 +28,7 @@ class TerminalUI:
     
 
 
-    def start_online_mode(self, incident_id:str = None) -> str:
+    def start_online_mode(self, incident_id:str = None, use_node_cache: bool = None) -> str:
         """Start the online mode interface"""
         
         self.console.print(
@@ -47,18 +47,39 @@ class TerminalUI:
         if incident_id is not None:
             session_id = f"{incident_id}_session-{_timestamp}_{str(uuid.uuid4())[0:8]}"
             memory = Memory(session_id=session_id)
-            scheduler = Scheduler(session_id=session_id, memory=memory)
+            scheduler = Scheduler(session_id=session_id, memory=memory, use_node_cache=use_node_cache)
 
             scheduler.start_session(incident_id=incident_id)
         else:
             session_id = f"session-{_timestamp}_{str(uuid.uuid4())[0:8]}"
             memory = Memory(session_id=session_id)
-            scheduler = Scheduler(session_id=session_id, memory=memory)
+            scheduler = Scheduler(session_id=session_id, memory=memory, use_node_cache=use_node_cache)
 
             scheduler.start_session()
         
         return session_id
 
+    def resume_session(self, session_id: str, rerun_from: str = None, use_node_cache: bool = None) -> str:
+        """Resume an interrupted session, optionally re-running from a chosen node"""
+        self.console.print(
+            Panel.fit(
+                f"[bold cyan]Resume Mode[/bold cyan]\n"
+                f"Continuing session {session_id} from its last checkpoint.",
+                title="TSG Executor",
+                border_style="cyan",
+            )
+        )
+
+        memory = Memory(session_id=session_id)
+        scheduler = Scheduler(session_id=session_id, memory=memory, resume=True, use_node_cache=use_node_cache)
+
+        if rerun_from:
+            scheduler.rerun_from_node(rerun_from)
+        else:
+            scheduler.resume_session()
+
+        return session_id
+
 
 def main():
     """
@@ -74,8 +95,26 @@ def main():
         type=str,
         help='Incident ID to start troubleshooting session with'
     )
+    parser.add_argument(
+        '--resume',
+        type=str,
+        metavar='SESSION_ID',
+        help='Resume an interrupted session from its last checkpoint'
+    )
+    parser.add_argument(
+        '--rerun-from',
+        type=str,
+        metavar='NODE',
+        help='With --resume, re-run the given PlanDAG node and its downstream nodes'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not reuse cached node results from earlier sessions'
+    )
     
     args = parser.parse_args()
+    use_node_cache = False if args.no_cache else None
     
     console = Console()
     
@@ -89,6 +128,14 @@ def main():
         )
     )
     
+    if args.rerun_from and not args.resume:
+        parser.error("--rerun-from requires --resume")
+
+    if args.resume:
+        ui = TerminalUI()
+        ui.resume_session(args.resume, rerun_from=args.rerun_from, use_node_cache=use_node_cache)
+        return
+
     # Get incident ID from args or prompt user
     incident_id = args.incident_id
     if not incident_id:
@@ -103,7 +150,7 @@ def main():
     
     # Start the terminal UI
     ui = TerminalUI()
-    ui.start_online_mode(incident_id)
+    ui.start_online_mode(incident_id, use_node_cache=use_node_cache)
 
 
 if __name__ == "__main__":
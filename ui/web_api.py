@@ -83,6 +83,76 @@ class TSGVisualizationAPI:
                 "error": str(e)
             }
     
+    def resume_session(self, session_id: str) -> Dict[str, Any]:
+        """Resume an interrupted session from its last checkpoint"""
+        try:
+            self.session_id = session_id
+            self.scheduler_conversation = []
+
+            self.memory = Memory(session_id=self.session_id)
+            self.scheduler = Scheduler(session_id=self.session_id, memory=self.memory, resume=True)
+
+            self.scheduler_conversation.append({
+                "role": "system",
+                "content": f"🔁 Resuming StepFly session {session_id}",
+                "timestamp": datetime.now().isoformat()
+            })
+
+            self._setup_message_capture()
+
+            self.scheduler_thread = threading.Thread(
+                target=self._run_scheduler,
+                kwargs={"run": self.scheduler.resume_session},
+                daemon=True
+            )
+            self.scheduler_thread.start()
+
+            return {
+                "success": True,
+                "session_id": self.session_id,
+                "message": "Session resumed successfully"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
+    def rerun_from_node(self, node_id: str) -> Dict[str, Any]:
+        """Re-run a node and its downstream nodes in the current session, reusing upstream results"""
+        try:
+            if self.scheduler_thread and self.scheduler_thread.is_alive():
+                return {
+                    "success": False,
+                    "error": "Scheduler is still running"
+                }
+
+            self.scheduler_conversation.append({
+                "role": "system",
+                "content": f"🔁 Re-running from node {node_id}",
+                "timestamp": datetime.now().isoformat()
+            })
+
+            self.scheduler_thread = threading.Thread(
+                target=self._run_scheduler,
+                kwargs={"run": lambda: self.scheduler.rerun_from_node(node_id)},
+                daemon=True
+            )
+            self.scheduler_thread.start()
+
+            return {
+                "success": True,
+                "session_id": self.session_id,
+                "message": f"Re-run from node {node_id} started"
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
     def _setup_message_capture(self):
         """Setup hooks to capture scheduler messages and user interactions"""
         # Store original methods
@@ -150,11 +220,14 @@ class TSGVisualizationAPI:
             # Replace the execute method of user_interaction tool
             original_tool.execute = wrapped_user_interaction
     
-    def _run_scheduler(self):
+    def _run_scheduler(self, run=None):
         """Run scheduler in background thread"""
         try:
             # Start session - this will trigger user_interaction for incident ID
-            self.scheduler.start_session()
+            if run is None:
+                self.scheduler.start_session()
+            else:
+                run()
             
             # After scheduler finishes, if it produced a final conclusion, surface it explicitly
             try:
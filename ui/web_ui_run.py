@@ -50,6 +50,54 @@ def start_new_session():
         }), 500
 
 
+@app.route('/api/session/resume', methods=['POST'])
+def resume_session():
+    """Resume an interrupted TSG execution session"""
+    try:
+        data = request.get_json()
+        session_id = data.get('session_id', '')
+
+        if not session_id:
+            return jsonify({
+                'success': False,
+                'error': 'No session_id provided'
+            }), 400
+
+        return jsonify(api_instance.resume_session(session_id))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/session/<session_id>/rerun', methods=['POST'])
+def rerun_from_node(session_id):
+    """Re-run a node and its downstream nodes, reusing upstream results"""
+    try:
+        if api_instance.session_id != session_id:
+            return jsonify({
+                'success': False,
+                'error': 'Session not active'
+            }), 404
+
+        data = request.get_json()
+        node_id = data.get('node', '')
+
+        if not node_id:
+            return jsonify({
+                'success': False,
+                'error': 'No node provided'
+            }), 400
+
+        return jsonify(api_instance.rerun_from_node(node_id))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/session/<session_id>/status')
 def get_session_status(session_id):
     """Get real-time session status"""